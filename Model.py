@@ -3,18 +3,39 @@ metamodel_dict = {
     # Define node types
     "nodes": [
         {
-            # Define a node type: Person
-            "type": "Person",
-            # Specify relationships associated with the Person node type
-            "edges": ["Friends With", "Parent of", "Child of", "Sibling of", "Colleague of"],
+            # Define a node type: Product 1
+            "type": "Product 1",
+            # Specify relationships associated with the Product 1 node type
+            "edges": ["Input for", "Outputs"],
         },
         {
-            # Define a node type: Pet
-            "type": "Pet",
-            # Specify relationship associated with the Pet node type
-            "edges": ["Owned by"]
+            # Define a node type: Product 2
+            "type": "Product 2",
+            # Specify relationships associated with the Product 2 node type
+            "edges": ["Input for", "Outputs"],
+        },
+        {
+            # Define a node type: Process
+            "type": "Process",
+            # Specify relationships associated with the Process node type
+            "edges": ["Input for", "Outputs", "Executed by", "Connected to"],
+        },
+        {
+            # Define a node type: Resource
+            "type": "Resource",
+            # Specify relationship associated with the Resource node type
+            "edges": ["Executed by"]
         },
     ],
     # Define edge types
-    "edges": ["Input for", "Outputs", "Executed by", "Connected to",]
+    "edges": ["Input for", "Outputs", "Executed by", "Connected to",],
+    # Define the allowed relations as (source type, edge type, target type)
+    "relations": [
+        ("Product 1", "Input for", "Process"),
+        ("Product 2", "Input for", "Process"),
+        ("Process", "Outputs", "Product 1"),
+        ("Process", "Outputs", "Product 2"),
+        ("Process", "Executed by", "Resource"),
+        ("Process", "Connected to", "Process"),
+    ],
 }
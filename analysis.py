@@ -0,0 +1,150 @@
+# Analyses of a graph without any Streamlit user interface. Every analysis takes a graph dictionary in the
+# layout of the graph JSON file ("nodes", "product 1", "product 2") and returns a JSON serializable result.
+import networkx as nx  # NetworkX for graph analysis and manipulation
+from graph_store import GraphStore, PRODUCT_KEYS, PRODUCT_TYPE  # Indexed graph store
+from graph_algorithms import (recurring_structures, utilisation, k_shortest_paths, node_cost, ROUTE_COSTS,
+                              WeightedRouter, ReachabilityIndex)  # Graph algorithms shared with the user interface
+from metamodel import METAMODEL  # Compiled metamodel for the validation
+
+# Impact matrices computed by the "impact" analysis: name -> (source type, target type), the product type is
+# filled in per product
+IMPACT_MATRICES = {
+    "product_on_resource": (None, "Resource"),
+    "product_on_process": (None, "Process"),
+    "process_on_process": ("Process", "Process"),
+}
+
+
+def store_from_dict(graph_dict):
+    # Build a graph store from a graph dictionary, accepting a store as well
+    if isinstance(graph_dict, GraphStore):
+        return graph_dict
+    return GraphStore(list(graph_dict.get("nodes", [])),
+                      list(graph_dict.get("product 1", [])),
+                      list(graph_dict.get("product 2", [])))
+
+
+def reachability_index(store, key):
+    # Reachability from the product and process nodes to the process and resource nodes of a product graph
+    return store.cached(("reachability", key), lambda: ReachabilityIndex(
+        store.product_graph(key),
+        sources=store.names_of_type(PRODUCT_TYPE[key], "Process"),
+        targets=store.names_of_type("Process", "Resource"),
+    ))
+
+
+def summary(store):
+    # Node and edge counts, density and emptiness of the graph of each product, as in the basic analysis
+    result = {"nodes": len(store.nodes), "types": {node_type: len(names)
+                                                  for node_type, names in store.names_by_type.items()}}
+    for key in PRODUCT_KEYS:
+        graph = store.product_graph(key, all_nodes=True)
+        result[key] = {
+            "nodes": graph.number_of_nodes(),
+            "edges": graph.number_of_edges(),
+            "density": nx.density(graph),
+            "empty": nx.is_empty(graph),
+            "directed": graph.is_directed(),
+        }
+    return result
+
+
+def utilisation_report(store):
+    # Utilisation of every node type in both products
+    names = store.names()
+    edge_ends = {key: ([edge["source"] for edge in edges], [edge["target"] for edge in edges])
+                 for key, edges in store.edges.items()}
+    table = utilisation(names, [store.node_type(name) for name in names], edge_ends)
+    return table.to_dict(orient="records")
+
+
+def impact(store, node=None):
+    # Impact matrices of each product as lists of affected targets per source. With a node only the targets
+    # the node affects and the sources affecting the node are returned.
+    result = {}
+    for key in PRODUCT_KEYS:
+        index = reachability_index(store, key)
+        if node is not None:
+            sources = store.names_of_type(PRODUCT_TYPE[key], "Process")
+            column = index.matrix(sources, [node])[:, 0]
+            result[key] = {
+                "affects": [target for target in index.reachable_targets(node) if target != node],
+                "affected_by": [source for source, hit in zip(sources, column) if hit and source != node],
+            }
+            continue
+
+        result[key] = {}
+        for name, (source_type, target_type) in IMPACT_MATRICES.items():
+            sources = store.names_of_type(source_type or PRODUCT_TYPE[key])
+            targets = store.names_of_type(target_type)
+            matrix = index.matrix(sources, targets)
+            result[key][name] = {source: [target for target, hit in zip(targets, row) if hit]
+                                 for source, row in zip(sources, matrix)}
+    return result
+
+
+def recurring(store, depth=3):
+    # Strongly connected components with more than one node and recurring production structures of each product
+    result = {}
+    for key in PRODUCT_KEYS:
+        graph = store.product_graph(key)
+        result[key] = {
+            "components": [sorted(component) for component in nx.strongly_connected_components(graph)
+                           if len(component) > 1],
+            "structures": [{"roots": structure["roots"], "occurrences": structure["occurrences"],
+                            "nodes": structure["nodes"], "edges": [list(edge) for edge in structure["edges"]]}
+                           for structure in recurring_structures(graph, depth)],
+        }
+    return result
+
+
+def paths(store, source, target, k=1):
+    # Up to k shortest paths between two nodes in the graph of each product
+    return {key: k_shortest_paths(store.product_graph(key, all_nodes=True), source, target, k)
+            for key in PRODUCT_KEYS}
+
+
+def route(store, source, target, cost="Engineering Cost"):
+    # Cheapest route between two nodes in the graph of each product, using a submodel attribute as cost
+    if cost not in ROUTE_COSTS:
+        raise ValueError(f"Unknown cost {cost!r}, expected one of {', '.join(ROUTE_COSTS)}")
+    result = {}
+    for key in PRODUCT_KEYS:
+        graph = store.product_graph(key, all_nodes=True)
+        router = store.cached(("router", key, id(graph), cost), lambda: WeightedRouter(
+            graph, {name: node_cost(store.node(name), cost) for name in graph}))
+        path, total = router.route(source, target)
+        result[key] = {"path": path, "cost": total if path is not None else None}
+    return result
+
+
+def validation(store):
+    # Nodes and relations that break the metamodel
+    report = METAMODEL.validate(store)
+    return {"violations": len(report), "report": report.to_dict(orient="records")}
+
+
+# Analyses by name
+ANALYSES = {
+    "summary": summary,
+    "utilisation": utilisation_report,
+    "impact": impact,
+    "recurring": recurring,
+    "paths": paths,
+    "route": route,
+    "validation": validation,
+}
+
+
+def run_analysis(name, graph_dict, **options):
+    # Run one analysis by name on a graph dictionary or store
+    if name not in ANALYSES:
+        raise ValueError(f"Unknown analysis {name!r}, expected one of {', '.join(ANALYSES)}")
+    return ANALYSES[name](store_from_dict(graph_dict), **options)
+
+
+def analyze(graph_dict, analyses=("summary", "utilisation", "impact"), options=None):
+    # Run several analyses on the same graph, sharing the indexes and cached graphs between them
+    store = store_from_dict(graph_dict)
+    options = options or {}
+    return {name: run_analysis(name, store, **options.get(name, {})) for name in analyses}
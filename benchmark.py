@@ -0,0 +1,255 @@
+# Benchmark suite timing the import, graph construction, analyses, export and views on synthetic graphs, e.g.
+#   python benchmark.py --sizes 100 1000 10000 --output benchmark.json
+# The result is a JSON document with one entry per benchmark and graph size, so runs of different releases can
+# be compared. "cold" is the first run after the graph changed, "warm" a rerun of the unchanged graph.
+# The functions of graph_functions.py are run in a Streamlit test session, one script run per function.
+import argparse  # Import argparse for the command line options
+import io  # Import io for in-memory files
+import json  # Import JSON library for the results
+import platform  # Import platform for the machine description
+import subprocess  # Import subprocess to read the current commit
+import sys  # Import sys for the Python version
+import time  # Import time for the timings
+from datetime import datetime, timezone  # Import datetime for the time stamp of a run
+
+import networkx as nx  # Import NetworkX to report its version
+import numpy as np  # Import NumPy to report its version
+import streamlit as st  # Import Streamlit library for building web applications
+
+from graph_io import read_json_graph, read_parquet_graph, write_parquet_graph, iter_graph_json, write_chunks  # Import the graph file readers and writers
+from graph_store import GraphStore, PRODUCT_KEYS, get_graph_store  # Import the graph store
+from graph_views import VIEWS, view_hash, build_view  # Import the graph views
+from synthetic_graph import synthetic_graph  # Import the synthetic graph generator
+
+# Graph sizes in nodes, from 10^2 to 10^6
+BENCHMARK_SIZES = [100, 1000, 10000, 100000, 1000000]
+
+# A benchmark taking longer than this many seconds is skipped for the larger sizes
+BUDGET = 60
+
+# Script run by the Streamlit test session, calling one function of graph_functions.py per run
+UI_SCRIPT = "import benchmark\nbenchmark.run_ui_function()\n"
+
+
+def basic_graph(store, key):
+    # Graph of a product as built by the basic analysis
+    return store.product_graph(key, all_nodes=True)
+
+
+def advanced_graph(store, key):
+    # Graph of a product as built by the advanced analysis
+    return store.product_graph(key)
+
+
+def ui_functions():
+    # Functions of graph_functions.py with the arguments the analysis tabs pass, for Product 1 where they are
+    # specific to a product
+    import graph_functions as gf
+
+    return {
+        "output_nodes_and_edges": lambda store: gf.output_nodes_and_edges(basic_graph(store, "product 1")),
+        "count_nodes": lambda store: gf.count_nodes(basic_graph(store, "product 1")),
+        "count_edges": lambda store: gf.count_edges(basic_graph(store, "product 1")),
+        "specific_node": lambda store: gf.specific_node(basic_graph(store, "product 1")),
+        "specific_edge": lambda store: gf.specific_edge(basic_graph(store, "product 1")),
+        "density_graph": lambda store: gf.density_graph(basic_graph(store, "product 1")),
+        "is_empty": lambda store: gf.is_empty(basic_graph(store, "product 1")),
+        "is_directed": lambda store: gf.is_directed(basic_graph(store, "product 1")),
+        "check_path": lambda store: gf.check_path(basic_graph(store, "product 1"), "product 1"),
+        "shortest_path": lambda store: gf.shortest_path(basic_graph(store, "product 1"), "product 1"),
+        "shows_shortest_paths": lambda store: gf.shows_shortest_paths(basic_graph(store, "product 1"), "product 1"),
+        "weighted_route": lambda store: gf.weighted_route(basic_graph(store, "product 1"), "product 1"),
+        "product1_visual": lambda store: gf.product1_visual(),
+        "product2_visual": lambda store: gf.product2_visual(),
+        "resource_utilization1": lambda store: gf.resource_utilization1(advanced_graph(store, "product 1")),
+        "resource_utilization2": lambda store: gf.resource_utilization2(advanced_graph(store, "product 2")),
+        "process_on_process1": lambda store: gf.process_on_process1(advanced_graph(store, "product 1")),
+        "process_on_process2": lambda store: gf.process_on_process2(advanced_graph(store, "product 2")),
+        "input_product_on_process1": lambda store: gf.input_product_on_process1(advanced_graph(store, "product 1")),
+        "input_product_on_process2": lambda store: gf.input_product_on_process2(advanced_graph(store, "product 2")),
+        "recurring1": lambda store: gf.recurring1(advanced_graph(store, "product 1")),
+        "recurring2": lambda store: gf.recurring2(advanced_graph(store, "product 2")),
+        "impact_matrix": lambda store: gf.impact_matrix(advanced_graph(store, "product 1"), "product 1",
+                                                        "Product 1", "Resource"),
+        "utilisation_table": lambda store: gf.utilisation_table(),
+    }
+
+
+def run_ui_function():
+    # Run the function named in the session state and store its wall time, called by UI_SCRIPT
+    store = get_graph_store()
+    function = ui_functions()[st.session_state["benchmark_function"]]
+    if st.session_state["benchmark_cold"]:
+        store.touch()
+    start = time.perf_counter()
+    function(store)
+    st.session_state["benchmark_seconds"] = time.perf_counter() - start
+
+
+def time_call(function, repeat=1):
+    # Return the shortest wall time of the given number of calls
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def core_benchmarks(graph_dict):
+    # Import, graph construction, PPR conversion, export and views, timed without a Streamlit session.
+    # Returns (name, cold function, warm function or None) for each benchmark.
+    from tabs import graph_dict_to_ppr_dict
+
+    json_buffer = io.BytesIO()
+    write_chunks(iter_graph_json(graph_dict), json_buffer)
+    json_data = json_buffer.getvalue()
+    store = GraphStore(graph_dict["nodes"], graph_dict["product 1"], graph_dict["product 2"])
+    parquet_buffer = io.BytesIO()
+    write_parquet_graph(store, parquet_buffer)
+    parquet_data = parquet_buffer.getvalue()
+
+    def product_graphs(all_nodes, cold):
+        def build():
+            if cold:
+                store.touch()
+            for key in PRODUCT_KEYS:
+                store.product_graph(key, all_nodes)
+        return build
+
+    def views(view):
+        def render():
+            store.touch()
+            for key in PRODUCT_KEYS:
+                view_hash(store, key, view)
+                build_view(store, key, view).source
+        return render
+
+    return [
+        ("upload_graph.read_json_graph", lambda: read_json_graph(io.BytesIO(json_data), GraphStore()), None),
+        ("upload_graph.read_parquet_graph", lambda: read_parquet_graph(io.BytesIO(parquet_data), GraphStore()), None),
+        ("graph_store.reindex", store.reindex, None),
+        ("basic_analyze_graph.product_graph", product_graphs(True, True), product_graphs(True, False)),
+        ("adv_analyze_graph.product_graph", product_graphs(False, True), product_graphs(False, False)),
+        ("graph_dict_to_ppr_dict", lambda: graph_dict_to_ppr_dict(store.graph_dict()), None),
+        ("export_graph.write_parquet_graph", lambda: write_parquet_graph(store, io.BytesIO()), None),
+        *((f"views.{view}", views(view), None) for view in VIEWS),
+    ]
+
+
+def ui_benchmarks(graph_dict, names):
+    # Functions of graph_functions.py, timed in a Streamlit test session. Yields (name, cold, warm, error).
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_string(UI_SCRIPT, default_timeout=24 * 3600)
+    app.session_state["node_list"] = graph_dict["nodes"]
+    app.session_state["p1_list"] = graph_dict["product 1"]
+    app.session_state["p2_list"] = graph_dict["product 2"]
+    for name in names:
+        timings = []
+        for cold in (True, False):
+            app.session_state["benchmark_function"] = name
+            app.session_state["benchmark_cold"] = cold
+            app.run()
+            if app.exception:
+                break
+            timings.append(app.session_state["benchmark_seconds"])
+        if app.exception:
+            yield name, None, None, app.exception[0].message
+        else:
+            yield name, timings[0], timings[1], None
+
+
+def run_benchmarks(sizes, selected=None, repeat=1, budget=BUDGET, seed=0, on_result=None):
+    # Run the benchmarks on synthetic graphs of the given sizes and return the result entries
+    results = []
+    over_budget = set()
+
+    def wanted(name):
+        return selected is None or any(part in name for part in selected)
+
+    def record(entry):
+        # Benchmarks over budget are skipped for the larger graphs
+        if entry.get("cold_seconds") is not None and entry["cold_seconds"] > budget:
+            over_budget.add(entry["name"])
+        results.append(entry)
+        if on_result is not None:
+            on_result(entry)
+
+    for size in sizes:
+        graph_dict = synthetic_graph(size, seed)
+        graph_size = {"size": size, "nodes": len(graph_dict["nodes"]),
+                      "edges": sum(len(graph_dict[key]) for key in PRODUCT_KEYS)}
+
+        def runnable(name):
+            if not wanted(name):
+                return False
+            if name in over_budget:
+                record({**graph_size, "name": name, "status": "skipped"})
+                return False
+            return True
+
+        for name, cold, warm in core_benchmarks(graph_dict):
+            if runnable(name):
+                entry = {**graph_size, "name": name, "status": "ok", "cold_seconds": time_call(cold, repeat)}
+                if warm is not None:
+                    entry["warm_seconds"] = time_call(warm, repeat)
+                record(entry)
+
+        names = [name for name in ui_functions() if runnable(f"graph_functions.{name}")]
+        for name, cold, warm, error in ui_benchmarks(graph_dict, names):
+            entry = {**graph_size, "name": f"graph_functions.{name}"}
+            if error is None:
+                entry.update(status="ok", cold_seconds=cold, warm_seconds=warm)
+            else:
+                entry.update(status="error", error=error)
+            record(entry)
+    return results
+
+
+def run_metadata():
+    # Description of the machine and the code version of a run
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "networkx": nx.__version__,
+        "numpy": np.__version__,
+        "streamlit": st.__version__,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the graph functions on synthetic PPR graphs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=BENCHMARK_SIZES,
+                        help="graph sizes in nodes (default: 100 to 1000000)")
+    parser.add_argument("--only", nargs="+", help="run only benchmarks whose name contains one of these parts")
+    parser.add_argument("--repeat", type=int, default=1, help="repetitions of the core benchmarks, the fastest counts")
+    parser.add_argument("--budget", type=float, default=BUDGET,
+                        help="seconds after which a benchmark is skipped for larger sizes")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic graphs")
+    parser.add_argument("--output", help="JSON result file, default is stdout")
+    args = parser.parse_args(argv)
+
+    def progress(entry):
+        print(f"{entry['size']:>8} {entry['name']:<45} {entry['status']:<8} "
+              f"{entry.get('cold_seconds') or 0:10.4f} s", file=sys.stderr, flush=True)
+
+    report = {"metadata": run_metadata(),
+              "results": run_benchmarks(sorted(args.sizes), args.only, args.repeat, args.budget, args.seed, progress)}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fileobj:
+            json.dump(report, fileobj, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+# Bulk import of nodes and relations from CSV or Parquet tables, e.g. exports of an ERP system. A table is checked
+# in one vectorized pass, every problem is reported by row and the valid rows are added to the graph as one edit.
+import os  # Import os for the random bytes of the node identifiers
+import uuid  # Import UUID library for generating unique identifiers
+import numpy as np  # Import NumPy for the row masks
+import pandas as pd  # Import pandas for reading and checking the tables
+from graph_io import SUBMODEL_SEPARATOR  # Import the separator of the flattened submodel columns
+from metamodel import METAMODEL  # Import the compiled metamodel
+from node_model import NODE_SUBMODELS, id_key  # Import the submodels of a node and the keys of the node ids
+
+# Submodel of each attribute, so tables may name the attribute columns without their submodel
+ATTRIBUTE_SUBMODEL = {attribute: view for view, attributes in NODE_SUBMODELS.items() for attribute in attributes}
+
+
+def read_table(fileobj, file_name):
+    # Read a CSV or Parquet file into a DataFrame of text columns, empty cells become empty strings
+    if file_name.lower().endswith(".parquet"):
+        frame = pd.read_parquet(fileobj)
+        return frame.astype(object).where(frame.notna(), "").astype(str)
+    return pd.read_csv(fileobj, dtype=str, keep_default_na=False)
+
+
+def _problems(checks):
+    # Collect (mask, column, problem) checks into one table with a line per failing row, rows counted from 1
+    frames = [pd.DataFrame({"Row": np.flatnonzero(mask) + 1, "Column": column, "Problem": problem})
+              for mask, column, problem in checks if mask.any()]
+    if not frames:
+        return pd.DataFrame({"Row": [], "Column": [], "Problem": []})
+    return pd.concat(frames, ignore_index=True).sort_values("Row", kind="stable", ignore_index=True)
+
+
+def _new_ids(count):
+    # Random version 4 UUIDs from one buffer of random bytes
+    random_bytes = os.urandom(16 * count)
+    return [str(uuid.UUID(bytes=random_bytes[start:start + 16], version=4)) for start in range(0, 16 * count, 16)]
+
+
+def node_columns(frame):
+    # Map the attribute columns of a node table to (submodel, attribute) and return the ignored columns
+    attributes = {}
+    ignored = []
+    for column in frame.columns:
+        if column in ("name", "type", "id"):
+            continue
+        if SUBMODEL_SEPARATOR in column:
+            attributes[column] = tuple(column.split(SUBMODEL_SEPARATOR, 1))
+        elif column in ATTRIBUTE_SUBMODEL:
+            attributes[column] = (ATTRIBUTE_SUBMODEL[column], column)
+        else:
+            ignored.append(column)
+    return attributes, ignored
+
+
+def nodes_from_table(frame, store):
+    # Check a node table against the graph and build the nodes of its valid rows.
+    # Returns the nodes and a table of the problems of the invalid rows, which are left out.
+    missing = [column for column in ("name", "type") if column not in frame.columns]
+    if missing:
+        raise ValueError(f"The table has no {' and no '.join(missing)} column")
+
+    names = frame["name"].str.strip()
+    types = frame["type"].str.strip()
+    checks = [
+        (names == "", "name", "The name is empty"),
+        ((names != "") & names.duplicated(keep=False), "name", "The name appears more than once in the table"),
+        (names.isin(list(store.by_name)), "name", "A node with this name exists already"),
+        (~types.isin(METAMODEL.node_types), "type", f"The type has to be one of {', '.join(METAMODEL.node_types)}"),
+    ]
+    ids = frame["id"].str.strip() if "id" in frame.columns else pd.Series("", index=frame.index)
+    given = ids != ""
+    checks += [
+        (given & ids.duplicated(keep=False), "id", "The id appears more than once in the table"),
+        (given & ids.map(id_key).isin(list(store.by_id)), "id", "A node with this id exists already"),
+    ]
+    problems = _problems(checks)
+
+    valid = np.ones(len(frame), dtype=bool)
+    valid[problems["Row"].to_numpy(dtype=int) - 1] = False
+    attributes, _ = node_columns(frame)
+    rows = frame[valid]
+
+    # Identifiers from the table where given, new ones for the other rows
+    node_ids = ids[valid].tolist()
+    new_ids = iter(_new_ids(node_ids.count("")))
+    node_ids = [node_id or next(new_ids) for node_id in node_ids]
+
+    attribute_values = [(attributes[column], rows[column].tolist()) for column in attributes]
+    nodes = []
+    for row, (name, node_type, node_id) in enumerate(zip(names[valid].tolist(), types[valid].tolist(), node_ids)):
+        submodels = {view: dict.fromkeys(view_attributes, "") for view, view_attributes in NODE_SUBMODELS.items()}
+        for (view, attribute), values in attribute_values:
+            submodels.setdefault(view, {})[attribute] = values[row]
+        nodes.append({"name": name, "submodels": submodels, "id": node_id, "type": node_type})
+    return nodes, problems
+
+
+def edges_from_table(frame, store, key):
+    # Check an edge list against the nodes and the metamodel and build the edges of its valid rows for the given
+    # product. The relation type is read from a "type" or a "relation" column.
+    # Returns the edges and a table of the problems of the invalid rows, which are left out.
+    relation_column = "type" if "type" in frame.columns else "relation"
+    missing = [column for column in ("source", relation_column, "target") if column not in frame.columns]
+    if missing:
+        raise ValueError(f"The table has no {' and no '.join(missing)} column")
+
+    sources = frame["source"].str.strip()
+    targets = frame["target"].str.strip()
+    relations = frame[relation_column].str.strip()
+    name_codes = METAMODEL.name_codes(store)
+    metamodel_checks = METAMODEL.edge_checks(METAMODEL.end_codes(name_codes, sources.tolist()),
+                                             METAMODEL.relation_codes(relations.tolist()),
+                                             METAMODEL.end_codes(name_codes, targets.tolist()), key)
+
+    # Relations of the table and of the graph as (source, relation, target)
+    relation_keys = pd.MultiIndex.from_arrays([sources, relations, targets])
+    existing = [(edge["source"], edge["type"], edge["target"]) for edge in store.edges[key]]
+    checks = [
+        (mask, relation_column if column == "relation" else column, problem)
+        for mask, column, problem in metamodel_checks
+    ] + [
+        (relation_keys.duplicated(keep=False), relation_column, "The relation appears more than once in the table"),
+        (relation_keys.isin(existing), relation_column, "The relation exists already"),
+    ]
+    ids = frame["id"].str.strip() if "id" in frame.columns else pd.Series("", index=frame.index)
+    given = ids != ""
+    existing_ids = [edge.get("id") for edges in store.edges.values() for edge in edges]
+    checks += [
+        (given & ids.duplicated(keep=False), "id", "The id appears more than once in the table"),
+        (given & ids.isin(existing_ids), "id", "A relation with this id exists already"),
+    ]
+    problems = _problems(checks)
+
+    valid = np.ones(len(frame), dtype=bool)
+    valid[problems["Row"].to_numpy(dtype=int) - 1] = False
+    edge_ids = ids[valid].tolist()
+    new_ids = iter(_new_ids(edge_ids.count("")))
+    edges = [{"source": source, "target": target, "type": relation, "id": edge_id or next(new_ids)}
+             for source, relation, target, edge_id in zip(sources[valid].tolist(), relations[valid].tolist(),
+                                                          targets[valid].tolist(), edge_ids)]
+    return edges, problems
@@ -0,0 +1,105 @@
+# Command line interface running the analyses on graph files without opening the user interface, e.g.
+#   python cli.py lines/*.json --analysis impact utilisation --output reports --workers 8
+import argparse  # Import argparse for the command line options
+import json  # Import JSON library for the reports
+import os  # Import os for the output paths
+import sys  # Import sys for the exit code
+from concurrent.futures import ProcessPoolExecutor, as_completed  # Import the process pool running the files
+
+from analysis import ANALYSES, analyze  # Import the analyses
+from graph_io import read_json_graph, read_parquet_graph  # Import the graph file readers
+from graph_store import GraphStore  # Import the graph store
+
+
+def load_graph(path):
+    # Read a graph JSON file or a columnar graph archive into a graph store
+    store = GraphStore()
+    with open(path, "rb") as fileobj:
+        if path.endswith(".zip"):
+            read_parquet_graph(fileobj, store)
+        else:
+            read_json_graph(fileobj, store)
+    return store
+
+
+def analyze_file(path, analyses, options):
+    # Load one graph file and run the analyses on it, executed in a worker process
+    return analyze(load_graph(path), analyses, options)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run graph analyses on one or many graph files.")
+    parser.add_argument("files", nargs="+", help="graph JSON files or columnar graph archives (.zip)")
+    parser.add_argument("--analysis", nargs="+", choices=list(ANALYSES), default=["summary", "utilisation", "impact"],
+                        help="analyses to run (default: summary utilisation impact)")
+    parser.add_argument("--node", help="node of the impact analysis, reports only what it affects")
+    parser.add_argument("--source", help="start node of the paths and route analyses")
+    parser.add_argument("--target", help="end node of the paths and route analyses")
+    parser.add_argument("--k", type=int, default=1, help="number of alternative paths")
+    parser.add_argument("--cost", default="Engineering Cost", help="cost attribute of the route analysis")
+    parser.add_argument("--depth", type=int, default=3, help="depth of the recurring structures")
+    parser.add_argument("--output", help="directory for one report per file, default is JSON lines on stdout")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    return parser.parse_args(argv)
+
+
+def analysis_options(args):
+    # Options of each analysis from the command line
+    if any(name in args.analysis for name in ("paths", "route")) and not (args.source and args.target):
+        raise SystemExit("The paths and route analyses need --source and --target")
+    return {
+        "impact": {"node": args.node} if args.node else {},
+        "recurring": {"depth": args.depth},
+        "paths": {"source": args.source, "target": args.target, "k": args.k},
+        "route": {"source": args.source, "target": args.target, "cost": args.cost},
+    }
+
+
+def write_report(path, report, output):
+    # Write the report of a file to the output directory or as one JSON line to stdout
+    if output is None:
+        print(json.dumps({"file": path, **report}), flush=True)
+        return
+    name = os.path.splitext(os.path.basename(path))[0] + ".analysis.json"
+    with open(os.path.join(output, name), "w", encoding="utf-8") as fileobj:
+        json.dump({"file": path, **report}, fileobj, indent=2)
+
+
+def iter_reports(files, analyses, options, workers):
+    # Yield (path, report, error) for every file, in the order the files are finished
+    if workers <= 1 or len(files) == 1:
+        # A single file or worker does not need a process pool
+        for path in files:
+            try:
+                yield path, analyze_file(path, analyses, options), None
+            except Exception as error:
+                yield path, None, error
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(analyze_file, path, analyses, options): path for path in files}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as error:
+                yield futures[future], None, error
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    options = analysis_options(args)
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+
+    failed = 0
+    for path, report, error in iter_reports(args.files, args.analysis, options, args.workers):
+        if error is not None:
+            failed += 1
+            print(f"{path}: {error}", file=sys.stderr)
+        else:
+            write_report(path, report, args.output)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,382 @@
+# Graph algorithms working on plain NetworkX graphs, without any Streamlit user interface
+import heapq  # heapq for the priority queue of Dijkstra's algorithm
+import itertools  # itertools to take the first k paths of a path generator
+import threading  # threading for the background worker filling the shortest path table
+import networkx as nx  # NetworkX for graph analysis and manipulation
+import numpy as np  # NumPy for vectorized bitset operations
+import pandas as pd  # Pandas for hashing node names to integer codes
+from node_model import NodeRecord  # Compact node records holding the attributes as numbers
+
+# Node attributes usable as routing costs: label -> (submodel, attribute)
+ROUTE_COSTS = {
+    "Engineering Cost": ("Engineering", "Cost"),
+    "MTTR": ("Engineering", "MTTR"),
+    "Energy consumption": ("Sustainable", "energy consumption"),
+    "CO2 footprint": ("Sustainable", "CO2 footprint"),
+}
+
+
+def structure_labels(graph: nx.DiGraph, depth=3):
+    # Label every node with the structure downstream of it up to the given depth (Weisfeiler-Lehman refinement).
+    # Two nodes get the same label exactly when their node types, relation types and successors match
+    # level by level. Each round is a single pass over the edges, so the total cost is O(depth * E log d).
+    signatures = {}
+    labels = {node: signatures.setdefault(("type", data.get("type")), len(signatures))
+              for node, data in graph.nodes(data=True)}
+
+    for _ in range(depth):
+        new_labels = {}
+        for node in graph:
+            children = sorted((data.get("type"), labels[successor])
+                              for successor, data in graph.succ[node].items())
+            signature = (labels[node], tuple(children))
+            new_labels[node] = signatures.setdefault(signature, len(signatures))
+        # Stop early once no label is split any further
+        stable = len(set(new_labels.values())) == len(set(labels.values()))
+        labels = new_labels
+        if stable:
+            break
+    return labels
+
+
+def structure_of(graph: nx.DiGraph, root, depth=3):
+    # Return the nodes and edges reachable from the root within the given depth, in breadth first order
+    nodes = [root]
+    seen = {root}
+    edges = []
+    frontier = [root]
+    for _ in range(depth):
+        next_frontier = []
+        for node in frontier:
+            for successor in graph.succ[node]:
+                edges.append((node, successor))
+                if successor not in seen:
+                    seen.add(successor)
+                    nodes.append(successor)
+                    next_frontier.append(successor)
+        frontier = next_frontier
+    return nodes, edges
+
+
+def recurring_structures(graph: nx.DiGraph, depth=3):
+    # Find production structures that occur more than once: groups of nodes whose downstream structure
+    # up to the given depth is identical. Returns one entry per structure, largest and most frequent first.
+    labels = structure_labels(graph, depth)
+
+    groups = {}
+    for node, label in labels.items():
+        # Single nodes without successors are not a structure
+        if graph.succ[node]:
+            groups.setdefault(label, []).append(node)
+
+    structures = []
+    for roots in groups.values():
+        if len(roots) < 2:
+            continue
+        nodes, edges = structure_of(graph, roots[0], depth)
+        structures.append({
+            "roots": roots,
+            "occurrences": len(roots),
+            "size": len(nodes),
+            "nodes": nodes,
+            "edges": edges,
+        })
+
+    # Structures that are part of a larger recurring structure are reported with it
+    structures.sort(key=lambda structure: (structure["size"], structure["occurrences"]), reverse=True)
+    covered = set()
+    result = []
+    for structure in structures:
+        if all(root in covered for root in structure["roots"]):
+            continue
+        result.append(structure)
+        for root in structure["roots"]:
+            covered.update(structure_of(graph, root, depth)[0])
+    return result
+
+
+def k_shortest_paths(graph: nx.DiGraph, source, target, k=1, weight=None):
+    # Return up to k loopless paths from the source to the target, shortest first (Yen's algorithm).
+    # Returns an empty list if the target cannot be reached.
+    if source not in graph or target not in graph:
+        return []
+    try:
+        return list(itertools.islice(nx.shortest_simple_paths(graph, source, target, weight=weight), k))
+    except nx.NetworkXNoPath:
+        return []
+
+
+def path_edges(graph: nx.DiGraph, path):
+    # Return the edge attributes along a path, looked up in the adjacency of the graph
+    return [graph.edges[source, target] for source, target in zip(path, path[1:])]
+
+
+def node_cost(node, cost):
+    # Read a routing cost from the submodels of a node. Node records hold the number of the attribute, node
+    # dictionaries its text. Missing, non-numeric and negative values give None.
+    submodel, attribute = ROUTE_COSTS[cost]
+    if isinstance(node, NodeRecord):
+        value = node.number(submodel, attribute)
+    else:
+        value = ((node or {}).get("submodels") or {}).get(submodel, {}).get(attribute)
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None
+    return value if value is not None and value >= 0 else None
+
+
+class WeightedRouter:
+    # Cheapest routes through a graph where passing a node costs the given node weight. The weights and the
+    # adjacency are turned into arrays once, so a query is a plain Dijkstra run that stops at the target.
+    def __init__(self, graph: nx.DiGraph, weights):
+        self.names = list(graph)
+        self.index = {name: position for position, name in enumerate(self.names)}
+        self.weights = np.array([weights.get(name) or 0.0 for name in self.names], dtype=np.float64)
+        self.missing = [name for name in self.names if weights.get(name) is None]
+
+        # Compressed adjacency: the successors of node i are successors[offsets[i]:offsets[i + 1]]
+        degrees = [len(graph.succ[name]) for name in self.names]
+        self.offsets = np.concatenate(([0], np.cumsum(degrees, dtype=np.int64)))
+        self.successors = np.array([self.index[successor] for name in self.names for successor in graph.succ[name]],
+                                   dtype=np.int64)
+        # Python lists of the arrays for the inner loop, indexing NumPy scalars one by one is slower
+        self._offsets = self.offsets.tolist()
+        self._successors = self.successors.tolist()
+        self._weights = self.weights.tolist()
+
+    def route(self, source, target):
+        # Return the cheapest path from the source to the target and its total cost, including the costs of
+        # both end nodes, or (None, inf) if the target cannot be reached
+        if source not in self.index or target not in self.index:
+            return None, float("inf")
+        start, goal = self.index[source], self.index[target]
+        offsets, successors, weights = self._offsets, self._successors, self._weights
+
+        distance = {start: weights[start]}
+        previous = {}
+        queue = [(weights[start], start)]
+        done = set()
+        while queue:
+            cost, node = heapq.heappop(queue)
+            if node in done:
+                continue
+            if node == goal:
+                path = [node]
+                while node != start:
+                    node = previous[node]
+                    path.append(node)
+                return [self.names[position] for position in reversed(path)], cost
+            done.add(node)
+            for successor in successors[offsets[node]:offsets[node + 1]]:
+                new_cost = cost + weights[successor]
+                if new_cost < distance.get(successor, float("inf")):
+                    distance[successor] = new_cost
+                    previous[successor] = node
+                    heapq.heappush(queue, (new_cost, successor))
+        return None, float("inf")
+
+
+def utilisation(names, types, edge_ends):
+    # Utilisation of every node type in every product: the share of the nodes of a type taking part in at least
+    # one edge of the product. edge_ends maps each product to the (sources, targets) name lists of its edges.
+    # Names are hashed to integer codes once, after that every product is a single pass of degree counting.
+    index = pd.Index(names)
+    type_codes, type_names = pd.factorize(pd.Series(types, dtype=object))
+    totals = np.bincount(type_codes, minlength=len(type_names))
+
+    rows = []
+    for product, (sources, targets) in edge_ends.items():
+        degree = np.zeros(len(index), dtype=np.int64)
+        for ends in (sources, targets):
+            codes = index.get_indexer(ends)
+            degree += np.bincount(codes[codes >= 0], minlength=len(index))
+        utilised = np.bincount(type_codes, weights=degree > 0, minlength=len(type_names)).astype(np.int64)
+        for node_type, total, count in zip(type_names, totals, utilised):
+            rows.append((product, node_type, int(total), int(count), 100 * count / total if total else 0))
+    return pd.DataFrame(rows, columns=["Product", "Type", "Nodes", "Utilised", "Utilisation (%)"])
+
+
+class ReachabilityIndex:
+    # Transitive closure of a graph restricted to the given source and target nodes. The graph is condensed
+    # into its DAG of strongly connected components and every component gets a bitset of the targets it
+    # reaches, filled in one pass in reverse topological order. Only the bitsets of source components are
+    # kept, stored as bytes so a single query is a constant time bit test.
+    def __init__(self, graph: nx.DiGraph, sources, targets):
+        self.targets = [target for target in dict.fromkeys(targets) if target in graph]
+        self.target_index = {target: index for index, target in enumerate(self.targets)}
+        self.size = (len(self.targets) + 7) // 8
+
+        condensed = nx.condensation(graph)
+        self.component = condensed.graph["mapping"]
+        source_components = {self.component[source] for source in sources if source in graph}
+
+        # Bits of the targets inside each component
+        own_bits = {}
+        for target, index in self.target_index.items():
+            component = self.component[target]
+            own_bits[component] = own_bits.get(component, 0) | (1 << index)
+
+        # Reverse topological pass, dropping a bitset as soon as all predecessors have used it
+        pending = dict(condensed.in_degree())
+        reach = {}
+        self.bits = {}
+        for component in reversed(list(nx.topological_sort(condensed))):
+            bits = own_bits.get(component, 0)
+            for successor in condensed.succ[component]:
+                bits |= reach[successor]
+            for successor in condensed.succ[component]:
+                pending[successor] -= 1
+                if pending[successor] == 0:
+                    del reach[successor]
+            if pending[component]:
+                reach[component] = bits
+            if component in source_components:
+                self.bits[component] = bits.to_bytes(self.size, "little")
+
+    def reaches(self, source, target):
+        # Check in constant time whether there is a path from the source to the target
+        index = self.target_index.get(target)
+        bits = self.bits.get(self.component.get(source))
+        if index is None or bits is None:
+            return False
+        return bool(bits[index >> 3] >> (index & 7) & 1)
+
+    def reachable_targets(self, source):
+        # Return all targets reachable from the source
+        bits = self.bits.get(self.component.get(source))
+        if bits is None:
+            return []
+        flags = np.unpackbits(np.frombuffer(bits, dtype=np.uint8), bitorder="little")[:len(self.targets)]
+        return [self.targets[index] for index in np.flatnonzero(flags)]
+
+    def matrix(self, sources, targets):
+        # Return the boolean impact matrix of the given sources (rows) and targets (columns) in one vectorized
+        # pass: the bitsets of all rows are unpacked together and the target columns are picked out of them
+        empty = bytes(self.size)
+        packed = np.frombuffer(b"".join(self.bits.get(self.component.get(source), empty) for source in sources),
+                               dtype=np.uint8).reshape(len(sources), self.size)
+        flags = np.unpackbits(packed, axis=1, bitorder="little").astype(bool)
+        columns = np.array([self.target_index.get(target, -1) for target in targets], dtype=np.int64)
+        if not self.targets:
+            return np.zeros((len(sources), len(targets)), dtype=bool)
+        matrix = flags[:, np.maximum(columns, 0)]
+        matrix[:, columns < 0] = False
+        return matrix
+
+
+class ShortestPathTable:
+    # All pairs shortest path table of an unweighted graph, stored as one breadth first search tree per source:
+    # an int32 row of distances and an int32 row of predecessors, -1 where a node is not reachable.
+    # Rows are computed on demand and by a background worker, lookups never wait for the worker.
+    def __init__(self, graph: nx.DiGraph):
+        self.names = list(graph)
+        self.index = {name: position for position, name in enumerate(self.names)}
+        self.rows = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._set_graph(graph)
+
+    def _set_graph(self, graph):
+        self.graph = graph
+        self._successors = [[self.index[successor] for successor in graph.succ[name]] for name in self.names]
+
+    def _bfs(self, successors, start):
+        # Breadth first search on Python lists, packed into int32 arrays at the end
+        distance = [-1] * len(self.names)
+        predecessor = [-1] * len(self.names)
+        distance[start] = 0
+        frontier = [start]
+        level = 0
+        while frontier:
+            level += 1
+            next_frontier = []
+            for node in frontier:
+                for successor in successors[node]:
+                    if distance[successor] < 0:
+                        distance[successor] = level
+                        predecessor[successor] = node
+                        next_frontier.append(successor)
+            frontier = next_frontier
+        return np.array(distance, dtype=np.int32), np.array(predecessor, dtype=np.int32)
+
+    def row(self, source):
+        # Return the (distance, predecessor) row of a source, computing it now if the worker has not yet
+        start = self.index[source]
+        row = self.rows.get(start)
+        if row is None:
+            row = self._bfs(self._successors, start)
+            with self._lock:
+                self.rows.setdefault(start, row)
+        return row
+
+    def distance(self, source, target):
+        # Return the number of edges on a shortest path, or None if there is no path
+        distance = int(self.row(source)[0][self.index[target]])
+        return distance if distance >= 0 else None
+
+    def path(self, source, target):
+        # Return a shortest path read from the predecessor row, or None if there is no path
+        distance, predecessor = self.row(source)
+        node = self.index[target]
+        if distance[node] < 0:
+            return None
+        path = [node]
+        while predecessor[node] >= 0:
+            node = int(predecessor[node])
+            path.append(node)
+        return [self.names[position] for position in reversed(path)]
+
+    def progress(self):
+        # Share of the rows that are computed
+        return len(self.rows) / len(self.names) if self.names else 1.0
+
+    def matches(self, graph: nx.DiGraph):
+        # Check whether the table was built for the same nodes in the same order
+        return len(graph) == len(self.names) and all(a == b for a, b in zip(graph, self.names))
+
+    def apply_edge_changes(self, graph: nx.DiGraph, changes):
+        # Switch to a new version of the graph with the same nodes, dropping only the rows that the added and
+        # removed (source, target) edges can change. Changes have to be given in the order they were made.
+        with self._lock:
+            self._generation += 1
+            for source, target, added in changes:
+                if source not in self.index or target not in self.index:
+                    continue
+                u, v = self.index[source], self.index[target]
+                for start, (distance, predecessor) in list(self.rows.items()):
+                    if added:
+                        # A new edge only matters where it shortens the way to its target
+                        stale = distance[u] >= 0 and (distance[v] < 0 or distance[u] + 1 < distance[v])
+                    else:
+                        # A removed edge only matters where it is part of the search tree
+                        stale = predecessor[v] == u
+                    if stale:
+                        del self.rows[start]
+            self._set_graph(graph)
+
+    def start(self):
+        # Fill the missing rows in a background thread, a previous worker stops at its next row
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            successors = self._successors
+        worker = threading.Thread(target=self._fill, args=(generation, successors), daemon=True)
+        worker.start()
+
+    def stop(self):
+        # Stop the background worker at its next row, e.g. before the table is dropped
+        with self._lock:
+            self._generation += 1
+
+    def _fill(self, generation, successors):
+        for start in range(len(self.names)):
+            if self._generation != generation:
+                return
+            if start in self.rows:
+                continue
+            row = self._bfs(successors, start)
+            with self._lock:
+                if self._generation != generation:
+                    return
+                self.rows.setdefault(start, row)
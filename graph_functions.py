@@ -1,16 +1,32 @@
 # Import necessary libraries
+import os  # os for the size limit of the shortest path table
 import streamlit as st  # Streamlit for creating web applications
 import networkx as nx  # NetworkX for graph analysis and manipulation
 import graphviz  # Graphviz for graph visualization
+import pandas as pd  # Pandas for the impact matrix table
 from networkx.algorithms.approximation import (all_pairs_node_connectivity, local_node_connectivity)  # Importing node connectivity algorithms
 from networkx.algorithms import approximation as approx  # Importing network approximation algorithms
-
+from graph_store import get_graph_store, PRODUCT_TYPE  # Indexed graph store of the session
+from graph_views import view_source  # Cached Graphviz views of the product graphs
+from graph_render import show_graph  # Server side or browser rendering of Graphviz graphs
+from instrumentation import instrumented  # Timing of the analysis functions
+from graph_algorithms import (recurring_structures, utilisation, k_shortest_paths, path_edges, node_cost,
+                              ROUTE_COSTS, WeightedRouter, ReachabilityIndex,
+                              ShortestPathTable)  # Structures, utilisation, paths, routing
+
+# Graphs with more nodes than this are not precomputed. The table of a graph with N nodes holds an int32 distance
+# and predecessor per pair of nodes, 8 * N * N bytes, for each product in each session that enables it: 18 MB per
+# product at 1,500 nodes, 200 MB at 5,000 nodes. PPR_MAX_PATH_TABLE_NODES sets another limit.
+MAX_PATH_TABLE_NODES = int(os.environ.get("PPR_MAX_PATH_TABLE_NODES", 1500))
+
+@instrumented
 def output_nodes_and_edges(graph: nx.Graph):
     # Display the nodes of the graph
     st.write(graph.nodes)
     # Display the edges of the graph
     st.write(graph.edges)
 
+@instrumented
 def count_nodes(graph: nx.Graph):
     # Count the number of nodes in the graph
     num_nodes = len(graph.nodes)
@@ -19,6 +35,7 @@ def count_nodes(graph: nx.Graph):
     # Alternative method using NetworkX function:
     # st.write(graph.number_of_nodes())
 
+@instrumented
 def count_edges(graph=nx.Graph):
     # Count the number of edges in the graph
     num_edges = len(graph.edges)
@@ -27,24 +44,22 @@ def count_edges(graph=nx.Graph):
     # Alternative method using NetworkX function:
     # st.write(graph.number_of_edges())
 
+@instrumented
 def specific_node(graph: nx.Graph):
     # Allow the user to select a specific node from the graph
     node_select = st.selectbox("Select node", options=graph.nodes, key="node_select")
-    # Retrieve the selected node from the graph
-    node = graph.nodes[node_select]
+    # Retrieve the selected node from the graph store, the graph itself only holds name, id and type
+    node = get_graph_store().node(node_select)
     # Display the details of the selected node in JSON format
-    st.json(node)
+    st.json(node.to_dict() if node is not None else graph.nodes[node_select])
 
+@instrumented
 def specific_edge(graph=nx.Graph):
     # Divide the Streamlit app into two columns for selecting nodes
     node1_col, node2_col = st.columns(2)
 
-    # Retrieve the node and edge lists from the session state
-    node_list = st.session_state["node_list"]
-    edge_list = st.session_state["p1_list"]
-
-    # Create a list of node names for selection
-    node_name_list = [node["name"] for node in node_list]
+    # Create a list of node names for selection from the graph store
+    node_name_list = get_graph_store().names()
 
     # Allow the user to select the first node
     with node1_col:
@@ -65,6 +80,7 @@ def specific_edge(graph=nx.Graph):
     # Retrieve and display the edge data between the selected nodes
     st.write(graph.get_edge_data(node1_select, node2_select, "None"))
 
+@instrumented
 def density_graph(graph: nx.Graph):
     # Calculate the density of the graph
     density = nx.density(graph)
@@ -72,6 +88,7 @@ def density_graph(graph: nx.Graph):
     # Display the density information
     st.info(f"The density of the graph is {density}")
 
+@instrumented
 def is_empty(graph: nx.Graph):
     # Check if the graph is empty
     is_empty = nx.is_empty(graph)
@@ -82,7 +99,53 @@ def is_empty(graph: nx.Graph):
     else:
         st.info("The graph is not empty.")
 
-def check_path(graph: nx.Graph):
+def drop_path_tables():
+    # Free the shortest path tables of the session, e.g. when the precomputation is switched off
+    for table, version in st.session_state.pop("path_tables", {}).values():
+        table.stop()
+
+def shortest_path_table(graph: nx.DiGraph, key):
+    # Return the all pairs shortest path table of the graph if it is enabled, kept in the session across graph
+    # versions. Edge edits only drop the rows they affect, any other change rebuilds the table.
+    if not st.session_state.get("path_table", False):
+        drop_path_tables()
+        return None
+    if key is None:
+        return None
+    store = get_graph_store()
+    tables = st.session_state.setdefault("path_tables", {})
+
+    entry = tables.get(key)
+    if entry is not None:
+        table, version = entry
+        if version == store.version:
+            return table
+        changes = store.edge_changes_since(version)
+        if changes is not None and table.matches(graph):
+            table.apply_edge_changes(graph, [(source, target, added)
+                                             for change_key, source, target, added in changes if change_key == key])
+            table.start()
+            tables[key] = (table, store.version)
+            return table
+
+    # The table of the previous graph is dropped, its worker stops filling it
+    if entry is not None:
+        tables.pop(key)[0].stop()
+    if len(graph) > MAX_PATH_TABLE_NODES:
+        return None
+    table = ShortestPathTable(graph)
+    table.start()
+    tables[key] = (table, store.version)
+    return table
+
+def show_table_progress(table):
+    # Show how far the background worker has filled the table
+    if table is not None and table.progress() < 1:
+        st.caption(f"Shortest path table {table.progress():.0%} precomputed, "
+                   f"missing rows are computed on request")
+
+@instrumented
+def check_path(graph: nx.Graph, key=None):
     # Layout for arranging the selection boxes horizontally
     node1_col, node2_col = st.columns(2)
 
@@ -96,12 +159,17 @@ def check_path(graph: nx.Graph):
 
     # Check if both nodes are selected
     if node1_select and node2_select:
+        table = shortest_path_table(graph, key)
+        show_table_progress(table)
+
         # Check if there exists a path between the selected nodes
-        if nx.has_path(graph, node1_select, node2_select):
+        if (table.distance(node1_select, node2_select) is not None if table is not None
+                else nx.has_path(graph, node1_select, node2_select)):
             st.success(f"There is a path between node {node1_select} and node {node2_select}.")
         else:
             st.error(f"There is no path between node {node1_select} and node {node2_select}.")
 
+@instrumented
 def is_directed(graph: nx.Graph):
     # Check if the graph is directed
     is_directed = nx.is_directed(graph)
@@ -112,69 +180,52 @@ def is_directed(graph: nx.Graph):
     else:
         st.info("The graph is not directed")
 
-def shows_shortest_paths(graph: nx.DiGraph):
-    # Retrieve graph data from session state
-    graph_dict_tree = st.session_state["graph_dict"]
-
-    # Extract node and edge lists from the graph data
-    node_list_tree = graph_dict_tree["nodes"]
-    edge_list_tree = graph_dict_tree["edges"]
-
-    # Initialize lists to store found nodes and edges related to the shortest paths
-    node_list_tree_found = []
-    edge_list_tree_found = []
+@instrumented
+def shows_shortest_paths(graph: nx.DiGraph, key="product 1"):
+    # Retrieve the graph store of the session for the node index
+    store = get_graph_store()
 
-    # Extract the names of nodes from the node list
-    node_name_list_tree = [node["name"] for node in node_list_tree]
+    # Present the nodes of the graph as start and end node
+    node_name_list_tree = list(graph.nodes)
 
-    # Present a selection box to choose the start node for calculating the shortest paths
     start_node_select_tree = st.selectbox(
         "Select the start node of the shortest paths",
-        options=node_name_list_tree
+        options=node_name_list_tree,
+        key=f"tree_start_{key}"
     )
 
     end_node_select_tree = st.selectbox(
         "Select the end node of the shortest paths",
-        options=node_name_list_tree
+        options=node_name_list_tree,
+        key=f"tree_end_{key}"
     )
 
+    # Compare several alternative routes at once (Yen's k shortest paths)
+    k = st.number_input("Number of alternative paths", min_value=1, max_value=20, value=1,
+                        key=f"tree_k_{key}")
+
     # Present a button to trigger the calculation of shortest paths when clicked
-    is_tree_button = st.button("Calculate trees", use_container_width=True, type="primary")
+    is_tree_button = st.button("Calculate trees", use_container_width=True, type="primary",
+                               key=f"tree_button_{key}")
 
     # If the button is clicked
     if is_tree_button:
-        # Calculate the shortest paths using NetworkX's shortest_path function
-        tree_list = nx.shortest_path(graph, source=start_node_select_tree, target=end_node_select_tree,
-                                     weight="dist")
-        # tree_list = nx.shortest_path(graph, source=start_node_select_tree, target=end_node_select_tree)
-        # Check if any shortest paths exist from the selected start node
-        if not tree_list:
+        path_list = k_shortest_paths(graph, start_node_select_tree, end_node_select_tree, k=int(k))
+
+        # Check if any path exists from the selected start node
+        if not path_list:
             st.write(f"There is no tree starting from {start_node_select_tree}.")
         else:
-            # Iterate through each tree in the list of shortest paths
-            for tree in tree_list:
-                st.write(f"The node {tree} is a member of the tree")
-                # For each node in the tree, identify the corresponding node data from the original node list
-                for tree_element in tree:
-                    for node_element in node_list_tree:
-                        if node_element["name"] == tree_element:
-                            to_be_assigned_element = node_element
-                            # Add the node to the list of found nodes if it's not already there
-                            if to_be_assigned_element not in node_list_tree_found:
-                                node_list_tree_found.append(node_element)
-
-            # Iterate through each edge in the original edge list
-            for edge_element in edge_list_tree:
-                for source in node_list_tree_found:
-                    for target in node_list_tree_found:
-                        # Check if both source and sink nodes of the edge are in the list of found nodes
-                        if edge_element["source"] == source["name"] and edge_element["target"] == \
-                                target["name"]:
-                            # Add the edge to the list of found edges
-                            edge_list_tree_found.append(edge_element)
-
-            # Display the graph without considering the weights of the edges
-            show_graph_without_weights(node_list_tree_found, edge_list_tree_found)
+            for number, path in enumerate(path_list, start=1):
+                st.write(f"Path {number} with {len(path) - 1} edges: {path}")
+
+                # Nodes and edges of the path from the name index and the adjacency of the graph,
+                # so the cost only depends on the length of the path
+                node_list_tree_found = [store.node(name) or {"name": name, "type": ""} for name in path]
+                edge_list_tree_found = path_edges(graph, path)
+
+                # Display the graph without considering the weights of the edges
+                show_graph_without_weights(node_list_tree_found, edge_list_tree_found)
 
 def show_graph_without_weights(nodes, edges):
     # Implement visualization logic here (not included for brevity)
@@ -204,9 +255,10 @@ def show_graph_without_weights(nodes, edges):
         graph.edge(source, target, label)
 
     # Display the graph using Streamlit's graphviz_chart
-    st.graphviz_chart(graph)
+    show_graph(graph)
 
-def shortest_path(graph: nx.DiGraph):
+@instrumented
+def shortest_path(graph: nx.DiGraph, key=None):
     import graphviz
 
     # Divide the layout into two columns for node selection
@@ -225,8 +277,15 @@ def shortest_path(graph: nx.DiGraph):
                                     key="node2_select")
 
     try:
-        # Attempt to find the shortest path between the selected nodes
-        shortest_path_for_graph = nx.shortest_path(graph, node1_select, node2_select)
+        # Read the shortest path from the precomputed table or search it
+        table = shortest_path_table(graph, key)
+        show_table_progress(table)
+        if table is not None and node1_select is not None and node2_select is not None:
+            shortest_path_for_graph = table.path(node1_select, node2_select)
+            if shortest_path_for_graph is None:
+                raise nx.NetworkXNoPath
+        else:
+            shortest_path_for_graph = nx.shortest_path(graph, node1_select, node2_select)
 
         # Display a success message with the shortest path
         st.success(f"The shortest path between {node1_select} and {node2_select} is {shortest_path_for_graph}")
@@ -245,153 +304,204 @@ def shortest_path(graph: nx.DiGraph):
             graphviz_graph.edge(str(edge[0]), str(edge[1]))
 
         # Display the Graphviz visualization of the shortest path
-        st.graphviz_chart(graphviz_graph)
+        show_graph(graphviz_graph)
 
     except nx.NetworkXNoPath:
         # If no path exists between the selected nodes, display an error message
         st.error(f"There is no path between {node1_select} and {node2_select}")
 
-def product1_visual():
-    # Define a function to set colors based on node types
-    def set_color(node_type):
-        color = "Red"
-        if node_type == "Product 1":
-            color = "Blue"
-        elif node_type == "Process":
-            color = "Yellow"
-        elif node_type == "Resource":
-            color = "Green"
-        return color
+def weighted_router(graph: nx.DiGraph, key, cost):
+    # Router with the node costs of the given attribute, built once per graph version
+    store = get_graph_store()
 
-    # Create a Graphviz object for visualization
-    graph = graphviz.Digraph()
+    def build():
+        weights = {name: node_cost(store.node(name), cost) for name in graph}
+        return WeightedRouter(graph, weights)
 
-    # Extract node and edge data from the session state
-    visual_dict = {
-        "nodes": st.session_state["node_list"],
-        "product 1": st.session_state["p1_list"],
-    }
-    st.session_state["visual_dict"] = visual_dict
-
-    node_list = visual_dict["nodes"]
-    edge_list = visual_dict["product 1"]
-
-    # Add nodes to the Graphviz object with appropriate colors
-    product_name = ["Product 2"]
-    for node in node_list:
-        if node["type"] not in product_name:
-            node_name = node["name"]
-            graph.node(node_name, node_name, color=set_color(node["type"]))
-
-    # Add edges to the Graphviz object
-    for edge in edge_list:
-        source = edge["source"]
-        target = edge["target"]
-        relation = edge["type"]
-        graph.edge(source, target, relation)
+    return store.cached(("router", key, id(graph), cost), build)
 
-    # Display the Graphviz visualization
-    st.graphviz_chart(graph)
+@instrumented
+def weighted_route(graph: nx.DiGraph, key="product 1"):
+    # Find the cheapest route between two nodes, using a submodel attribute of the nodes as cost
+    cost = st.selectbox("Select the cost of a route", options=list(ROUTE_COSTS), key=f"route_cost_{key}")
 
-def product2_visual():
-    # Define a function to set colors based on node types
-    def set_color(node_type):
-        color = "Red"
-        if node_type == "Product 1":
-            color = "Blue"
-        elif node_type == "Process":
-            color = "Yellow"
-        elif node_type == "Resource":
-            color = "Green"
-        return color
+    node1_col, node2_col = st.columns(2)
+    with node1_col:
+        node1_select = st.selectbox("Select first node", options=graph.nodes, key=f"route_start_{key}")
+    with node2_col:
+        node2_select = st.selectbox("Select second node", options=graph.nodes, key=f"route_end_{key}")
 
-    # Create a Graphviz object for visualization
-    graph = graphviz.Digraph()
+    if node1_select is None or node2_select is None:
+        return
 
-    # Extract node and edge data from the session state
-    visual_dict = {
-        "nodes": st.session_state["node_list"],
-        "product 2": st.session_state["p2_list"],
-    }
-    st.session_state["visual_dict"] = visual_dict
-
-    node_list = visual_dict["nodes"]
-    edge_list = visual_dict["product 2"]
-
-    # Add nodes to the Graphviz object with appropriate colors
-    product_name = ["Product 1"]
-    for node in node_list:
-        if node["type"] not in product_name:
-            node_name = node["name"]
-            graph.node(node_name, node_name, color=set_color(node["type"]))
-    # Add edges to the Graphviz object
-    for edge in edge_list:
-        source = edge["source"]
-        target = edge["target"]
-        relation = edge["type"]
-        graph.edge(source, target, relation)
+    router = weighted_router(graph, key, cost)
+    if router.missing:
+        st.warning(f"{len(router.missing)} nodes have no numeric {cost} and are passed at no cost")
 
-    # Display the Graphviz visualization
-    st.graphviz_chart(graph)
+    path, total = router.route(node1_select, node2_select)
+    if path is None:
+        st.error(f"There is no path between {node1_select} and {node2_select}")
+        return
 
-def resource_utilization1(graph):
-    # Retrieve graph data from session state
-    graph_dict = st.session_state["graph_dict"]
-    node_list = graph_dict["nodes"]
-    edge1_list = graph_dict["product 1"]
-    edge2_list = graph_dict["product 2"]
+    st.success(f"The cheapest route between {node1_select} and {node2_select} by {cost} costs {total:g}")
+    st.dataframe([{"Node": name, cost: router.weights[router.index[name]]} for name in path],
+                 hide_index=True, use_container_width=True)
 
-    # Extract node data from the graph data
-    node_list = st.session_state["node_list"]
-    node_name_list = []
+    # Draw the route with the cost of every node
+    graphviz_graph = graphviz.Digraph()
+    for name in path:
+        graphviz_graph.node(str(name), xlabel=f"{router.weights[router.index[name]]:g}")
+    for edge, (source, target) in zip(path_edges(graph, path), zip(path, path[1:])):
+        graphviz_graph.edge(str(source), str(target), edge.get("type", ""))
+    show_graph(graphviz_graph)
 
-    # Define tabs for different functionalities
-    tab1, tab2 = st.tabs(["Resource Utilisation",
-                          "Reachability"
-                          ])
-    with tab1:
-        # Iterate through the node list to find resource nodes
-        for node in node_list:
-            if node["type"] == "Resource":
-                node_name_list.append(node["name"])
+@instrumented
+def product1_visual():
+    # Display the PPR view of Product 1 from the render cache
+    show_graph(view_source(get_graph_store(), "product 1", "PPR View"))
+
+@instrumented
+def product2_visual():
+    # Display the PPR view of Product 2 from the render cache
+    show_graph(view_source(get_graph_store(), "product 2", "PPR View"))
+
+def reachability_index(graph: nx.DiGraph, key):
+    # Reachability from the product and process nodes to the process and resource nodes of a product graph,
+    # built once per graph version
+    store = get_graph_store()
+    return store.cached(("reachability", key), lambda: ReachabilityIndex(
+        graph,
+        sources=store.names_of_type(PRODUCT_TYPE[key], "Process"),
+        targets=store.names_of_type("Process", "Resource"),
+    ))
+
+def show_impact(graph: nx.DiGraph, key, source, target, success_message):
+    # Check whether the source has an impact on the target, i.e. there is a path between them
+    if source is None or target is None:
+        st.info("Please create the nodes of the graph first")
+        return
+
+    store = get_graph_store()
+    index = reachability_index(graph, key)
+    if index.reaches(source, target):
+        st.success(success_message)
 
-        # Calculate resource utilisation metrics
-        r = len(node_name_list)
-        st.info("Resource Utilisation")
-        st.write(f" Number of Resources in the system {r}")
+        # The connecting path is only searched when it is requested
+        if st.checkbox("Show the connecting path", key=f"show_path_{key}_{source}_{target}"):
+            shortest_path_for_graph = nx.shortest_path(graph, source, target)
+            st.write(shortest_path_for_graph)
 
-        name_list = []
-        c = 0
+            # Create a Graphviz object for the path
+            graphviz_graph = graphviz.Digraph()
+            for node in shortest_path_for_graph:
+                graphviz_graph.node(str(node))
+            for edge_source, edge_target in zip(shortest_path_for_graph, shortest_path_for_graph[1:]):
+                graphviz_graph.edge(str(edge_source), str(edge_target))
+            show_graph(graphviz_graph)
+    else:
+        st.error(f"There is no path between {source} and {target}")
+
+    # List every node of the target type affected by the source
+    target_type = store.node_type(target)
+    affected = [name for name in index.reachable_targets(source)
+                if name != source and store.node_type(name) == target_type]
+    if st.checkbox(f"Show all nodes of type {target_type} affected by {source} ({len(affected)})",
+                   key=f"show_affected_{key}_{source}_{target_type}"):
+        st.write(affected)
+
+def impact_matrix(graph: nx.DiGraph, key, source_type, target_type):
+    # Impact matrix of all nodes of the source type on all nodes of the target type, built once per graph version
+    store = get_graph_store()
+
+    def build():
+        sources = store.names_of_type(source_type)
+        targets = store.names_of_type(target_type)
+        matrix = reachability_index(graph, key).matrix(sources, targets)
+        table = pd.DataFrame(matrix, index=pd.Index(sources, name=source_type), columns=targets)
+        table.insert(0, "Affected", matrix.sum(axis=1))
+        return table
+
+    return store.cached(("impact_matrix", key, source_type, target_type), build)
+
+def show_impact_matrix(graph: nx.DiGraph, key, source_type, target_type):
+    # Display the impact matrix as a sortable table with CSV and Parquet downloads
+    widget_key = f"impact_matrix_{key}_{source_type}_{target_type}"
+    if not st.checkbox(f"Compute the impact of every {source_type} on every {target_type}", key=widget_key):
+        return
 
-        for name in node_name_list:
-            for edge in edge1_list:
-                if name not in name_list and (name == edge["source"] or name == edge["target"]):
-                    name_list.append(name)
-                    c += 1
+    store = get_graph_store()
+    table = impact_matrix(graph, key, source_type, target_type)
+    st.write(f"{len(table)} x {len(table.columns) - 1} impact matrix, "
+             f"{int(table['Affected'].sum())} affected pairs")
+    st.dataframe(table, use_container_width=True)
+
+    # The files are generated once per graph version
+    file_name = f"impact_{key}_{source_type}_{target_type}".replace(" ", "_").lower()
+    csv_data = store.cached(("impact_matrix_csv", key, source_type, target_type),
+                            lambda: table.to_csv().encode("utf-8"))
+    parquet_data = store.cached(("impact_matrix_parquet", key, source_type, target_type),
+                                lambda: table.to_parquet(compression="zstd"))
+    csv_col, parquet_col = st.columns(2)
+    with csv_col:
+        st.download_button("Download CSV", data=csv_data, file_name=f"{file_name}.csv", mime="text/csv",
+                           key=f"{widget_key}_csv", use_container_width=True)
+    with parquet_col:
+        st.download_button("Download Parquet", data=parquet_data, file_name=f"{file_name}.parquet",
+                           mime="application/octet-stream", key=f"{widget_key}_parquet",
+                           use_container_width=True)
+
+def utilisation_table():
+    # Utilisation of every node type in both products, computed in one pass over the edge lists per graph version
+    store = get_graph_store()
+
+    def build():
+        names = store.names()
+        edge_ends = {key: ([edge["source"] for edge in edges], [edge["target"] for edge in edges])
+                     for key, edges in store.edges.items()}
+        return utilisation(names, [store.node_type(name) for name in names], edge_ends)
+
+    return store.cached("utilisation", build)
+
+def show_utilisation(key, node_type, label, verb):
+    # Display the utilisation of the nodes of a type in the given product
+    table = utilisation_table()
+    row = table[(table["Product"] == key) & (table["Type"] == node_type)]
+    r = int(row["Nodes"].sum())
+    c = int(row["Utilised"].sum())
+
+    st.info(f"{node_type} Utilisation")
+    st.write(f" Number of {label} in the system {r}")
+    st.write(f" Number of {label} {verb} in the system {c}")
+    if r == 0:
+        st.write(f"{node_type} Utilisation is 0")
+    else:
+        x = (c / r) * 100
+        st.write(f"{node_type} Utilisation is {x} percentage")
 
-        st.write(f" Number of Resources utilised in the system {c}")
+    # Breakdown of all node types in both products
+    if st.checkbox("Show the utilisation of all node types", key=f"utilisation_{key}_{node_type}"):
+        st.dataframe(table, hide_index=True, use_container_width=True)
 
-        if r == 0:
-            st.write(f"Resource Utilisation is 0")
-        else:
-            x = (c / r) * 100
-            st.write(f"Resource Utilisation is {x} percentage")
+@instrumented
+def resource_utilization1(graph):
+    # Retrieve the graph store of the session
+    store = get_graph_store()
+
+    # Define tabs for different functionalities
+    tab1, tab2, tab3 = st.tabs(["Resource Utilisation",
+                                "Reachability",
+                                "Impact Matrix"
+                                ])
+    with tab1:
+        # Read the resource utilisation metrics from the utilisation table
+        show_utilisation("product 1", "Resource", "Resources", "utilised")
 
     with tab2:
-        import graphviz
         node1_col, node2_col = st.columns(2)
 
-        node_name_list = []
-        node_name_list1 = []
-
         # Extract product and resource node lists
-        for node in node_list:
-            if node["type"] == "Product 1":
-                node_name_list.append(node["name"])
-
-        for node in node_list:
-            if node["type"] == "Resource":
-                node_name_list1.append(node["name"])
+        node_name_list = store.names_of_type("Product 1")
+        node_name_list1 = store.names_of_type("Resource")
 
         # Present selection boxes to choose product and resource nodes
         with node1_col:
@@ -402,84 +512,34 @@ def resource_utilization1(graph):
             node2_select = st.selectbox("Select Resource",
                                         options=node_name_list1,
                                         key="node2_select")
-        try:
-            # Calculate the shortest path between the selected product and resource nodes
-            shortest_path_for_graph = nx.shortest_path(graph, node1_select, node2_select)
-            st.success(f"The Resource {node2_select} is utilised by {node1_select}")
-            st.write(shortest_path_for_graph)
-            subgraph = graph.subgraph(shortest_path_for_graph)
-            graphviz_graph = graphviz.Digraph()
-            st.write(subgraph.edges)
+        # Answer the query from the reachability index of the product graph
+        show_impact(graph, "product 1", node1_select, node2_select,
+                    f"The Resource {node2_select} is utilised by {node1_select}")
 
-            # Create a subgraph for visualization
-            for node in subgraph.nodes:
-                graphviz_graph.node(str(node))
-
-            # Add edges to the Graphviz object
-            for edge in subgraph.edges:
-                graphviz_graph.edge(str(edge[0]), str(edge[1]))
-            st.graphviz_chart(graphviz_graph)
-        except nx.NetworkXNoPath:
-            st.error(f"There is no path between {node1_select} and {node2_select}")
+    with tab3:
+        # Impact of every product on every resource at once
+        show_impact_matrix(graph, "product 1", "Product 1", "Resource")
 
+@instrumented
 def resource_utilization2(graph):
-    # Retrieve graph data from session state
-    graph_dict = st.session_state["graph_dict"]
-    node_list = graph_dict["nodes"]
-    edge1_list = graph_dict["product 1"]
-    edge2_list = graph_dict["product 2"]
-
-    # Extract node data from the graph data
-    node_list = st.session_state["node_list"]
-    node_name_list = []
+    # Retrieve the graph store of the session
+    store = get_graph_store()
 
     # Define tabs for different functionalities
-    tab1, tab2 = st.tabs(["Resource Utilisation",
-                          "Reachability"
-                          ])
+    tab1, tab2, tab3 = st.tabs(["Resource Utilisation",
+                                "Reachability",
+                                "Impact Matrix"
+                                ])
     with tab1:
-        # Iterate through the node list to find resource nodes
-        for node in node_list:
-            if node["type"] == "Resource":
-                node_name_list.append(node["name"])
-
-        # Calculate resource utilisation metrics
-        r = len(node_name_list)
-        st.info("Resource Utilisation")
-        st.write(f" Number of Resources in the system {r}")
-
-        name_list = []
-        c = 0
-
-        for name in node_name_list:
-            for edge in edge2_list:
-                if name not in name_list and (name == edge["source"] or name == edge["target"]):
-                    name_list.append(name)
-                    c += 1
-
-        st.write(f" Number of Resources utilised in the system {c}")
-
-        if r == 0:
-            st.write(f"Resource Utilisation is 0")
-        else:
-            x = (c / r) * 100
-            st.write(f"Resource Utilisation is {x} percentage")
+        # Read the resource utilisation metrics from the utilisation table
+        show_utilisation("product 2", "Resource", "Resources", "utilised")
 
     with tab2:
-        import graphviz
         node1_col, node2_col = st.columns(2)
 
-        node_name_list = []
-        node_name_list1 = []
-
         # Extract product and resource node lists
-        for node in node_list:
-            if node["type"] == "Product 2":
-                node_name_list.append(node["name"])
-
-        for node in node_list:
-            if node["type"] == "Resource":
-                node_name_list1.append(node["name"])
+        node_name_list = store.names_of_type("Product 2")
+        node_name_list1 = store.names_of_type("Resource")
 
         # Present selection boxes to choose product and resource nodes
         with node1_col:
@@ -490,51 +550,27 @@ def resource_utilization2(graph):
             node22_select = st.selectbox("Select Resource",
                                          options=node_name_list1,
                                          key="node22_select")
-        try:
-            # Calculate the shortest path between the selected product and resource nodes
-            shortest_path_for_graph = nx.shortest_path(graph, node11_select, node22_select)
-            st.success(f"The Resource {node22_select} is utilised by {node11_select}")
-            st.write(shortest_path_for_graph)
-            subgraph = graph.subgraph(shortest_path_for_graph)
-            graphviz_graph = graphviz.Digraph()
-            st.write(subgraph.edges)
+        # Answer the query from the reachability index of the product graph
+        show_impact(graph, "product 2", node11_select, node22_select,
+                    f"The Resource {node22_select} is utilised by {node11_select}")
 
-            # Create a subgraph for visualization
-            for node in subgraph.nodes:
-                graphviz_graph.node(str(node))
-
-            # Add edges to the Graphviz object
-            for edge in subgraph.edges:
-                graphviz_graph.edge(str(edge[0]), str(edge[1]))
-            st.graphviz_chart(graphviz_graph)
-        except nx.NetworkXNoPath:
-            st.error(f"There is no path between {node11_select} and {node22_select}")
+    with tab3:
+        # Impact of every product on every resource at once
+        show_impact_matrix(graph, "product 2", "Product 2", "Resource")
 
+@instrumented
 def recurring1(graph: nx.DiGraph):
-    # Retrieve necessary data from the session state
-    graph_dict = st.session_state["graph_dict"]
-    node_list = graph_dict["nodes"]
-    edge1_list = graph_dict["product 1"]
-    edge2_list = graph_dict["product 2"]
-
-    # Get the list of nodes from the session state
-    node_list = st.session_state["node_list"]
-
-    # Prepare a list of node names excluding those belonging to Product 2
-    node_name_list = []
-    product_name = ["Product 2"]
-    for node in node_list:
-        if node["type"] not in product_name:
-            node_name_list.append(node["name"])
+    # Retrieve the graph store of the session
+    store = get_graph_store()
 
     # Create tabs for different analysis methods
     tab1, tab2 = st.tabs(
         ["Strongly Connected Components",
-         "DFS Method - Similar Production Structures"]
+         "Similar Production Structures"]
     )
 
     # Check if the graph is empty
-    if len(node_list) == 0:
+    if len(store.nodes) == 0:
         st.error("Please create a graph")
         return
 
@@ -544,48 +580,24 @@ def recurring1(graph: nx.DiGraph):
         for component in recurring_components:
             st.write(component)
 
-    # Analyze using the DFS method
+    # Analyze similar production structures
     with tab2:
-        node16_select = st.selectbox("Select Product",
-                                     options=node_name_list,
-                                     key="node16_select")
-        # Call the DFS method to identify recurring components
-        dfs(graph, node16_select, recurring_components)
-
-        st.write("Identified Recurring Components:")
-        for component in recurring_components:
-            st.write(component)
+        similar_structures(graph, "product 1")
 
 
+@instrumented
 def recurring2(graph: nx.DiGraph):
-    # Retrieve graph data from the session state
-    graph_dict = st.session_state["graph_dict"]
-    node_list = graph_dict["nodes"]
-    edge1_list = graph_dict["product 1"]
-    edge2_list = graph_dict["product 2"]
-
-    # Retrieve node list from the session state
-    node_list = st.session_state["node_list"]
-
-    # Initialize an empty list to store node names
-    node_name_list = []
-
-    # Define the product name for filtering
-    product_name = ["Product 1"]
-
-    # Iterate through the node list and append node names not belonging to Product 1 to node_name_list
-    for node in node_list:
-        if node["type"] not in product_name :
-            node_name_list.append(node["name"])
+    # Retrieve the graph store of the session
+    store = get_graph_store()
 
     # Create tabs for different analysis methods
     tab1, tab2 = st.tabs(
         ["Strongly Connected Components",
-         "DFS Method - Similar Production Structures"]
+         "Similar Production Structures"]
     )
 
     # Check if the node list is empty
-    if len(node_list) == 0:
+    if len(store.nodes) == 0:
         st.error("Please Create a Graph")
         return
 
@@ -598,57 +610,48 @@ def recurring2(graph: nx.DiGraph):
         for component in recurring_components:
             st.write(component)
 
-    # Analyze recurring components using DFS Method
+    # Analyze similar production structures
     with tab2:
-        # Select a product from the available options
-        node17_select = st.selectbox("Select Product",
-                                     options=node_name_list,
-                                     key="node17_select")
+        similar_structures(graph, "product 2")
 
-        # Analyze recurring components using DFS Method
-        dfs(graph, node17_select, recurring_components)
 
-        # Display the identified recurring components
-        st.write("Identified Recurring Components:")
-        for component in recurring_components:
-            st.write(component)
-
-
-def dfs(graph, start_node, recurring_components):
-    visited = set()  # Keep track of visited nodes
-    stack = [start_node]  # Use a stack for DFS
-    current_subgraph = []  # Track current sub-graph during traversal
+def similar_structures(graph: nx.DiGraph, key):
+    # Depth of the downstream structure compared between nodes
+    depth = st.slider("Depth of the compared structures", min_value=1, max_value=10, value=3,
+                      key=f"structure_depth_{key}")
 
-    while stack:
-        current_node = stack.pop()
-        if current_node not in visited:
-            visited.add(current_node)
-            current_subgraph.append(current_node)  # Add current node to sub-graph
+    # Find the recurring structures once per graph version and depth
+    store = get_graph_store()
+    structures = store.cached(("recurring_structures", key, depth), lambda: recurring_structures(graph, depth))
 
-            # Explore neighbors of the current node
-            for neighbor in graph[current_node]:
-                stack.append(neighbor)
-                dfs(graph, neighbor, recurring_components)  # Recursive DFS call
+    if not structures:
+        st.info("No recurring production structures were found.")
+        return
 
-        # Check for recurring sub-graph at the end of a branch (leaf node or backtrack)
-        if current_node not in visited and len(current_subgraph) > 1:  # Avoid single-node sub-graphs
-            if tuple(current_subgraph) not in recurring_components:
-                recurring_components.add(tuple(current_subgraph))  # Store as immutable tuple for hashable set
-            current_subgraph.pop()  # Remove current node from sub-graph (backtrack)
+    st.write("Identified Recurring Components:")
+    st.dataframe(
+        [{"Structure": index, "Occurrences": structure["occurrences"], "Nodes": structure["size"],
+          "Starting at": ", ".join(map(str, structure["roots"]))}
+         for index, structure in enumerate(structures)],
+        use_container_width=True
+    )
 
-    recurring_components = set()  # Initialize set to store recurring sub-graphs
-    # dfs(graph, node16_select, recurring_components)  # Uncomment if this function is called elsewhere
+    # Draw one occurrence of the selected structure
+    structure_select = st.selectbox("Show structure", options=range(len(structures)),
+                                    key=f"structure_select_{key}")
+    structure = structures[structure_select]
+    graphviz_graph = graphviz.Digraph()
+    for node in structure["nodes"]:
+        graphviz_graph.node(str(node))
+    for source, target in structure["edges"]:
+        graphviz_graph.edge(str(source), str(target), graph.edges[source, target].get("type", ""))
+    show_graph(graphviz_graph)
 
 
+@instrumented
 def process_on_process1(graph: nx.DiGraph):
-    # Extract necessary data from session state
-    graph_dict = st.session_state["graph_dict"]
-    node_list = graph_dict["nodes"]
-    edge1_list = graph_dict["product 1"]
-    edge2_list = graph_dict["product 2"]
-
-    # Retrieve node list from session state
-    node_list = st.session_state["node_list"]
+    # Retrieve the graph store of the session
+    store = get_graph_store()
 
     # Display information message
     st.info("Reachability")
@@ -656,19 +659,11 @@ def process_on_process1(graph: nx.DiGraph):
     # Initialize columns for node selection
     node1_col, node2_col = st.columns(2)
 
-    # Initialize lists to store node names
-    node_name_list = []
-    node_name_list1 = []
-
-    # Populate node_name_list with process nodes
-    for node in node_list:
-        if node["type"] == "Process":
-            node_name_list.append(node["name"])
+    # Look up the process nodes in the type index
+    node_name_list = store.names_of_type("Process")
 
     # Populate node_name_list1 with process nodes
-    for node in node_list:
-        if node["type"] == "Process":
-            node_name_list1.append(node["name"])
+    node_name_list1 = store.names_of_type("Process")
 
     # User selects first process
     with node1_col:
@@ -683,43 +678,19 @@ def process_on_process1(graph: nx.DiGraph):
                                      key="node23_select"
                                      )
 
-    try:
-        # Calculate shortest path between selected processes
-        shortest_path_for_graph = nx.shortest_path(graph, node12_select, node23_select)
-        # Display success message
-        st.success(f"The Process {node12_select} will have an impact on {node23_select}")
-        # Display shortest path
-        st.write(shortest_path_for_graph)
-        # Extract subgraph representing the shortest path
-        subgraph = graph.subgraph(shortest_path_for_graph)
-        # Initialize Graphviz graph object
-        graphviz_graph = graphviz.Digraph()
+    # Answer the query from the reachability index of the product graph
+    show_impact(graph, "product 1", node12_select, node23_select,
+                f"The Process {node12_select} will have an impact on {node23_select}")
 
-        # Add nodes to the Graphviz object
-        for node in subgraph.nodes:
-            graphviz_graph.node(str(node))
-
-        # Add edges to the Graphviz object
-        for edge in subgraph.edges:
-            graphviz_graph.edge(str(edge[0]), str(edge[1]))
-
-        # Visualize the subgraph using Graphviz
-        st.graphviz_chart(graphviz_graph)
-
-    except nx.NetworkXNoPath:
-        # Display error message if no path exists between selected processes
-        st.error(f"There is no path between {node12_select} and {node23_select}")
+    # Impact of every process on every other process at once
+    st.info("Impact Matrix")
+    show_impact_matrix(graph, "product 1", "Process", "Process")
 
 
+@instrumented
 def process_on_process2(graph: nx.DiGraph):
-    # Extract necessary data from session state
-    graph_dict = st.session_state["graph_dict"]
-    node_list = graph_dict["nodes"]
-    edge1_list = graph_dict["product 1"]
-    edge2_list = graph_dict["product 2"]
-
-    # Retrieve node list from session state
-    node_list = st.session_state["node_list"]
+    # Retrieve the graph store of the session
+    store = get_graph_store()
 
     # Create tabs for user interface
     tab1, tab2 = st.tabs(
@@ -729,28 +700,19 @@ def process_on_process2(graph: nx.DiGraph):
         ]
     )
 
-    # Display process selection tab
+    # Display the impact of every process on every other process
     with tab1:
-        pass
+        show_impact_matrix(graph, "product 2", "Process", "Process")
 
     # Display reachability analysis tab
     with tab2:
-        import graphviz
         node1_col, node2_col = st.columns(2)
 
-        # Initialize lists to store node names
-        node_name_list = []
-        node_name_list1 = []
-
-        # Populate node_name_list with process nodes
-        for node in node_list:
-            if node["type"] == "Process":
-                node_name_list.append(node["name"])
+        # Look up the process nodes in the type index
+        node_name_list = store.names_of_type("Process")
 
         # Populate node_name_list1 with process nodes
-        for node in node_list:
-            if node["type"] == "Process":
-                node_name_list1.append(node["name"])
+        node_name_list1 = store.names_of_type("Process")
 
         # User selects first process
         with node1_col:
@@ -765,44 +727,15 @@ def process_on_process2(graph: nx.DiGraph):
                                          key="node25_select"
                                          )
 
-        try:
-            # Calculate shortest path between selected processes
-            shortest_path_for_graph = nx.shortest_path(graph, node14_select, node25_select)
-            # Display success message
-            st.success(f"The Process {node14_select} will have an impact on {node25_select}")
-            # Display shortest path
-            st.write(shortest_path_for_graph)
-            # Extract subgraph representing the shortest path
-            subgraph = graph.subgraph(shortest_path_for_graph)
-            # Initialize Graphviz graph object
-            graphviz_graph = graphviz.Digraph()
-
-            # Add nodes to the Graphviz object
-            for node in subgraph.nodes:
-                graphviz_graph.node(str(node))
-
-            # Add edges to the Graphviz object
-            for edge in subgraph.edges:
-                graphviz_graph.edge(str(edge[0]), str(edge[1]))
-
-            # Visualize the subgraph using Graphviz
-            st.graphviz_chart(graphviz_graph)
-
-        except nx.NetworkXNoPath:
-            # Display error message if no path exists between selected processes
-            st.error(f"There is no path between {node14_select} and {node25_select}")
+        # Answer the query from the reachability index of the product graph
+        show_impact(graph, "product 2", node14_select, node25_select,
+                    f"The Process {node14_select} will have an impact on {node25_select}")
 
 
+@instrumented
 def input_product_on_process1(graph: nx.DiGraph):
-    # Extract necessary data from session state
-    graph_dict = st.session_state["graph_dict"]
-    node_list = graph_dict["nodes"]
-    edge1_list = graph_dict["product 1"]
-    edge2_list = graph_dict["product 2"]
-
-    # Retrieve node list from session state
-    node_list = st.session_state["node_list"]
-    node_name_list = []
+    # Retrieve the graph store of the session
+    store = get_graph_store()
 
     # Create tabs for user interface
     tab1, tab2 = st.tabs(
@@ -814,54 +747,18 @@ def input_product_on_process1(graph: nx.DiGraph):
 
     # Display process utilisation tab
     with tab1:
-        # Populate node_name_list with process nodes
-        for node in node_list:
-            if node["type"] == "Process":
-                node_name_list.append(node["name"])
-
-        # Calculate number of processes in the system
-        r = len(node_name_list)
-
-        # Display process utilisation information
-        st.info("Process Utilisation")
-        st.write(f" Number of Processes in the system {r}")
-
-        # Initialize list to store unique process names involved in product 1 edges
-        name_list = []
-        c = 0
-
-        # Count processes performed in the system
-        for name in node_name_list:
-            for edge in edge1_list:
-                if name not in name_list and (name == edge["source"] or name == edge["target"]):
-                    name_list.append(name)
-                    c += 1
-        st.write(f" Number of Processes performed in the system {c}")
-
-        # Calculate process utilisation percentage
-        if r == 0:
-            st.write(f"Process Utilisation is 0")
-        else:
-            x = (c / r) * 100
-            st.write(f"Process Utilisation is {x} percentage")
+        # Read the process utilisation metrics from the utilisation table
+        show_utilisation("product 1", "Process", "Processes", "performed")
 
     # Display reachability analysis tab
     with tab2:
-        import graphviz
         node1_col, node2_col = st.columns(2)
 
-        node_name_list = []
-        node_name_list1 = []
-
         # Populate node_name_list with input product nodes
-        for node in node_list:
-            if node["type"] == "Product 1":
-                node_name_list.append(node["name"])
+        node_name_list = store.names_of_type("Product 1")
 
         # Populate node_name_list1 with process nodes
-        for node in node_list:
-            if node["type"] == "Process":
-                node_name_list1.append(node["name"])
+        node_name_list1 = store.names_of_type("Process")
 
         # User selects input product
         with node1_col:
@@ -874,43 +771,15 @@ def input_product_on_process1(graph: nx.DiGraph):
                                          options=node_name_list1,
                                          key="node24_select")
 
-        try:
-            # Calculate shortest path between selected product and process
-            shortest_path_for_graph = nx.shortest_path(graph, node13_select, node24_select)
-            # Display success message
-            st.success(f"Based on the input product {node13_select} the following {node24_select} process "
-                       f"will be executed")
-            st.write(shortest_path_for_graph)
-            # Extract subgraph representing the shortest path
-            subgraph = graph.subgraph(shortest_path_for_graph)
-            # Initialize Graphviz graph object
-            graphviz_graph = graphviz.Digraph()
-
-            # Add nodes to the Graphviz object
-            for node in subgraph.nodes:
-                graphviz_graph.node(str(node))
-
-            # Add edges to the Graphviz object
-            for edge in subgraph.edges:
-                graphviz_graph.edge(str(edge[0]), str(edge[1]))
-
-            # Visualize the subgraph using Graphviz
-            st.graphviz_chart(graphviz_graph)
-
-        except nx.NetworkXNoPath:
-            # Display error message if no path exists between selected product and process
-            st.error(f"There is no path between {node13_select} and {node24_select}")
+        # Answer the query from the reachability index of the product graph
+        show_impact(graph, "product 1", node13_select, node24_select,
+                    f"Based on the input product {node13_select} the following {node24_select} process "
+                    f"will be executed")
 
+@instrumented
 def input_product_on_process2(graph: nx.DiGraph):
-    # Extract necessary data from session state
-    graph_dict = st.session_state["graph_dict"]
-    node_list = graph_dict["nodes"]
-    edge1_list = graph_dict["product 1"]
-    edge2_list = graph_dict["product 2"]
-
-    # Retrieve node list from session state
-    node_list = st.session_state["node_list"]
-    node_name_list = []
+    # Retrieve the graph store of the session
+    store = get_graph_store()
 
     # Create tabs for user interface
     tab1, tab2 = st.tabs(
@@ -922,54 +791,18 @@ def input_product_on_process2(graph: nx.DiGraph):
 
     # Display process utilisation tab
     with tab1:
-        # Populate node_name_list with process nodes
-        for node in node_list:
-            if node["type"] == "Process":
-                node_name_list.append(node["name"])
-
-        # Calculate number of processes in the system
-        r = len(node_name_list)
-
-        # Display process utilisation information
-        st.info("Process Utilisation")
-        st.write(f" Number of Processes in the system {r}")
-
-        # Initialize list to store unique process names involved in product 2 edges
-        name_list = []
-        c = 0
-
-        # Count processes performed in the system
-        for name in node_name_list:
-            for edge in edge2_list:
-                if name not in name_list and (name == edge["source"] or name == edge["target"]):
-                    name_list.append(name)
-                    c += 1
-        st.write(f" Number of Processes performed in the system {c}")
-
-        # Calculate process utilisation percentage
-        if r == 0:
-            st.write(f"Process Utilisation is 0")
-        else:
-            x = (c / r) * 100
-            st.write(f"Process Utilisation is {x} percentage")
+        # Read the process utilisation metrics from the utilisation table
+        show_utilisation("product 2", "Process", "Processes", "performed")
 
     # Display reachability analysis tab
     with tab2:
-        import graphviz
         node1_col, node2_col = st.columns(2)
 
-        node_name_list = []
-        node_name_list1 = []
-
         # Populate node_name_list with input product nodes
-        for node in node_list:
-            if node["type"] == "Product 2":
-                node_name_list.append(node["name"])
+        node_name_list = store.names_of_type("Product 2")
 
         # Populate node_name_list1 with process nodes
-        for node in node_list:
-            if node["type"] == "Process":
-                node_name_list1.append(node["name"])
+        node_name_list1 = store.names_of_type("Process")
 
         # User selects input product
         with node1_col:
@@ -982,30 +815,8 @@ def input_product_on_process2(graph: nx.DiGraph):
                                          options=node_name_list1,
                                          key="node25_select")
 
-        try:
-            # Calculate shortest path between selected product and process
-            shortest_path_for_graph = nx.shortest_path(graph, node15_select, node25_select)
-            # Display success message
-            st.success(f"Based on the input product {node15_select} the following {node25_select} process "
-                       f"will be executed")
-            st.write(shortest_path_for_graph)
-            # Extract subgraph representing the shortest path
-            subgraph = graph.subgraph(shortest_path_for_graph)
-            # Initialize Graphviz graph object
-            graphviz_graph = graphviz.Digraph()
-
-            # Add nodes to the Graphviz object
-            for node in subgraph.nodes:
-                graphviz_graph.node(str(node))
-
-            # Add edges to the Graphviz object
-            for edge in subgraph.edges:
-                graphviz_graph.edge(str(edge[0]), str(edge[1]))
-
-            # Visualize the subgraph using Graphviz
-            st.graphviz_chart(graphviz_graph)
-
-        except nx.NetworkXNoPath:
-            # Display error message if no path exists between selected product and process
-            st.error(f"There is no path between {node15_select} and {node25_select}")
+        # Answer the query from the reachability index of the product graph
+        show_impact(graph, "product 2", node15_select, node25_select,
+                    f"Based on the input product {node15_select} the following {node25_select} process "
+                    f"will be executed")
 
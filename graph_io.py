@@ -0,0 +1,315 @@
+import codecs  # Import codecs for incremental UTF-8 decoding of uploaded bytes
+import json  # Import JSON library for handling JSON data
+import zipfile  # Import zipfile to bundle the node and edge tables in one file
+import pyarrow as pa  # Import PyArrow for the columnar graph format
+import pyarrow.parquet as pq  # Import Parquet reader and writer
+from node_model import json_default  # Import the JSON encoding of the node records
+
+# Top level keys of the graph JSON whose arrays are streamed element by element
+GRAPH_SECTIONS = ["nodes", "product 1", "product 2"]
+
+# Names of the tables inside a columnar graph archive
+NODE_TABLE = "nodes.parquet"
+EDGE_TABLE = "edges.parquet"
+
+# Separator between submodel and attribute name in the flattened node columns, e.g. "Engineering.Cost"
+SUBMODEL_SEPARATOR = "."
+
+# Keys stored in their own columns, any other keys of a node or edge go to the "extra" JSON column
+NODE_KEYS = ("id", "name", "type", "submodels")
+EDGE_KEYS = ("id", "source", "target", "type")
+
+# Node column listing, as JSON text, the attribute columns of a node that hold the JSON text of a value which is no
+# text, e.g. a number or null
+TYPED_COLUMN = "typed"
+
+# Marker of an attribute a node does not have
+_MISSING = object()
+
+# Whitespace allowed between JSON tokens
+_WHITESPACE = " \t\n\r"
+
+# Characters that may continue a JSON number
+_NUMBER_CHARACTERS = "0123456789.eE+-"
+
+
+class _JsonStream:
+    # Character buffer over a binary file that is filled chunk by chunk while parsing
+    def __init__(self, fileobj, chunk_size):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.json_decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        # Read the next chunk, dropping the part of the buffer that was already parsed
+        if self.eof:
+            return False
+        chunk = self.fileobj.read(self.chunk_size)
+        if not chunk:
+            self.buffer = self.buffer[self.pos:] + self.decoder.decode(b"", final=True)
+            self.pos = 0
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + self.decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        # Return the next character that is not whitespace without consuming it
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of the graph file")
+
+    def expect(self, characters):
+        # Consume the next character, which has to be one of the given characters
+        character = self.peek()
+        if character not in characters:
+            raise ValueError(f"Expected one of {characters!r} at {self.pos} but found {character!r}")
+        self.pos += 1
+        return character
+
+    def value(self):
+        # Decode the next complete JSON value, reading more chunks while it is cut off
+        self.peek()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if (isinstance(value, (int, float)) and not self.eof
+                    and (end == len(self.buffer) or self.buffer[end] in _NUMBER_CHARACTERS)):
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_graph(fileobj, chunk_size=1 << 20):
+    # Yield (section, element) for every element of the "nodes", "product 1" and "product 2" arrays
+    # of a graph JSON file without loading the whole document at once
+    stream = _JsonStream(fileobj, chunk_size)
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+
+    while True:
+        key = stream.value()
+        stream.expect(":")
+
+        if key in GRAPH_SECTIONS and stream.peek() == "[":
+            stream.expect("[")
+            if stream.peek() != "]":
+                while True:
+                    yield key, stream.value()
+                    if stream.expect(",]") == "]":
+                        break
+            else:
+                stream.expect("]")
+        else:
+            # Other top level values are parsed and skipped
+            stream.value()
+
+        if stream.expect(",}") == "}":
+            return
+
+
+def read_json_graph(fileobj, store, batch_size=10000, on_progress=None):
+    # Stream a graph JSON file into a graph store in batches and return the number of elements per section
+    size = getattr(fileobj, "size", None)
+    counts = {section: 0 for section in GRAPH_SECTIONS}
+    batches = {section: [] for section in GRAPH_SECTIONS}
+
+    def flush(section):
+        if section == "nodes":
+            store.add_nodes(batches[section])
+        else:
+            store.add_edges(section, batches[section])
+        batches[section] = []
+        if on_progress is not None and size:
+            on_progress(min(fileobj.tell() / size, 1.0), counts)
+
+    for section, element in iter_json_graph(fileobj):
+        batches[section].append(element)
+        counts[section] += 1
+        if len(batches[section]) >= batch_size:
+            flush(section)
+
+    for section in GRAPH_SECTIONS:
+        if batches[section]:
+            flush(section)
+    if on_progress is not None:
+        on_progress(1.0, counts)
+    return counts
+
+
+def ppr_node(node):
+    # Convert a node to the node layout of the PPR dictionary
+    return {
+        "id": node.get("id", None),
+        "type": node.get("type", None),
+        "data": {
+            "label": node.get("name", None),
+            "props": {
+                "views": node.get("submodels", None),
+            },
+            "style": node.get("ui_data", {}).get("style", None),
+        },
+        "position": node.get("ui_data", {}).get("position", None),
+        "width": node.get("ui_data", {}).get("width", None),
+        "height": node.get("ui_data", {}).get("height", None),
+    }
+
+
+def ppr_edge(edge):
+    # Convert an edge to the edge layout of the PPR dictionary
+    return {
+        "id": edge.get("id", None),
+        "label": edge.get("name", None),
+        "source": edge.get("source", None),
+        "target": edge.get("target", None),
+        "sourceHandle": edge.get("ui_data", {}).get("sourceHandle", None),
+        "targetHandle": edge.get("ui_data", {}).get("targetHandle", None),
+    }
+
+
+def iter_graph_json(graph_dict):
+    # Yield the JSON text of the graph piece by piece, node records are written as node dictionaries
+    return json.JSONEncoder(default=json_default).iterencode(graph_dict)
+
+
+def iter_ppr_json(graph_dict):
+    # Yield the JSON text of the PPR dictionary piece by piece, converting one node or edge at a time
+    yield '{"nodes": ['
+    for index, node in enumerate(graph_dict.get("nodes", [])):
+        yield (", " if index else "") + json.dumps(ppr_node(node))
+    yield '], "edges": ['
+    index = 0
+    for section in GRAPH_SECTIONS[1:]:
+        for edge in graph_dict.get(section, []):
+            yield (", " if index else "") + json.dumps(ppr_edge(edge))
+            index += 1
+    yield "]}"
+
+
+def write_chunks(chunks, fileobj, buffer_size=1 << 20):
+    # Write text chunks to a binary file in UTF-8, collecting them into writes of about buffer_size characters
+    buffered = []
+    size = 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        size += len(chunk)
+        if size >= buffer_size:
+            fileobj.write("".join(buffered).encode("utf-8"))
+            buffered = []
+            size = 0
+    fileobj.write("".join(buffered).encode("utf-8"))
+
+
+def graph_to_tables(store):
+    # Convert the graph to a node table with flattened submodel columns and an edge table with a product column
+    nodes = store.nodes
+    submodels = [node.submodels() for node in nodes]
+
+    # Collect the submodel attributes of all nodes, keeping their first appearance order
+    attribute_columns = {}
+    for node_submodels in submodels:
+        for view, values in node_submodels.items():
+            for attribute in values:
+                attribute_columns.setdefault((view, attribute), None)
+
+    # Submodels in another layout than submodel -> attribute -> value are kept in the extra column of the node
+    node_columns = {
+        "id": [node.id for node in nodes],
+        "name": [node.name for node in nodes],
+        "type": [node.type for node in nodes],
+        "extra": [_extra_to_json(node.extra or {}, ()) for node in nodes],
+    }
+    typed = [None] * len(nodes)
+    for view, attribute in attribute_columns:
+        column = view + SUBMODEL_SEPARATOR + attribute
+        values = [node_submodels.get(view, {}).get(attribute, _MISSING) for node_submodels in submodels]
+        for index, value in enumerate(values):
+            if type(value) is not str:
+                # Attributes are entered as text, other values are kept as their JSON text and listed as typed
+                if value is _MISSING:
+                    values[index] = None
+                else:
+                    values[index] = json.dumps(value)
+                    typed[index] = (typed[index] or []) + [column]
+        node_columns[column] = values
+    node_columns[TYPED_COLUMN] = [json.dumps(columns) if columns else None for columns in typed]
+
+    edge_columns = {"product": [], "id": [], "source": [], "target": [], "type": [], "extra": []}
+    for key, edges in store.edges.items():
+        edge_columns["product"].extend([key] * len(edges))
+        for column in EDGE_KEYS:
+            edge_columns[column].extend(edge.get(column) for edge in edges)
+        edge_columns["extra"].extend(_extra_to_json(edge, EDGE_KEYS) for edge in edges)
+
+    return pa.table(node_columns), pa.table(edge_columns)
+
+
+def _extra_to_json(element, keys):
+    # Keep keys without a column of their own, such as "ui_data", as JSON text
+    extra = {key: value for key, value in element.items() if key not in keys}
+    return json.dumps(extra) if extra else None
+
+
+def write_parquet_graph(store, fileobj):
+    # Write the graph as a zip archive holding the node table and the edge table as Parquet files
+    node_table, edge_table = graph_to_tables(store)
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_STORED) as archive:
+        for name, table in ((NODE_TABLE, node_table), (EDGE_TABLE, edge_table)):
+            sink = pa.BufferOutputStream()
+            pq.write_table(table, sink, compression="zstd")
+            archive.writestr(name, sink.getvalue().to_pybytes())
+
+
+def read_parquet_graph(fileobj, store):
+    # Read a columnar graph archive into a graph store and return the number of elements per section
+    with zipfile.ZipFile(fileobj) as archive:
+        node_table = pq.read_table(pa.BufferReader(archive.read(NODE_TABLE)))
+        edge_table = pq.read_table(pa.BufferReader(archive.read(EDGE_TABLE)))
+
+    # Rebuild the node dictionaries column by column
+    attribute_columns = [(name, name.split(SUBMODEL_SEPARATOR, 1)) for name in node_table.column_names
+                         if SUBMODEL_SEPARATOR in name]
+    ids = node_table.column("id").to_pylist()
+    names = node_table.column("name").to_pylist()
+    types = node_table.column("type").to_pylist()
+    extras = node_table.column("extra").to_pylist()
+    typed = (node_table.column(TYPED_COLUMN).to_pylist() if TYPED_COLUMN in node_table.column_names
+             else [None] * len(ids))
+    typed = [frozenset(json.loads(columns)) if columns else () for columns in typed]
+    nodes = [{"name": name, "submodels": {}, "id": node_id, "type": node_type, **json.loads(extra or "{}")}
+             for node_id, name, node_type, extra in zip(ids, names, types, extras)]
+    for column, (view, attribute) in attribute_columns:
+        for node, value, node_typed in zip(nodes, node_table.column(column).to_pylist(), typed):
+            if value is not None:
+                node["submodels"].setdefault(view, {})[attribute] = (json.loads(value) if column in node_typed
+                                                                     else value)
+    store.add_nodes(nodes)
+
+    # Split the edge table by product
+    counts = {"nodes": len(nodes)}
+    edge_columns = {column: edge_table.column(column).to_pylist()
+                    for column in ("product", "source", "target", "type", "id", "extra")}
+    edges = {section: [] for section in GRAPH_SECTIONS[1:]}
+    for product, source, target, relation, edge_id, extra in zip(*edge_columns.values()):
+        edges.setdefault(product, []).append({"source": source, "target": target, "type": relation, "id": edge_id,
+                                              **json.loads(extra or "{}")})
+    for section in GRAPH_SECTIONS[1:]:
+        store.add_edges(section, edges[section])
+        counts[section] = len(edges[section])
+    return counts
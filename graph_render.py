@@ -0,0 +1,84 @@
+import hashlib  # Import hashlib for the keys of the rendered images
+import os  # Import os to size the worker pool
+import threading  # Import threading to guard the worker pool and image cache shared by all sessions
+from collections import OrderedDict  # Import OrderedDict for the least recently used image cache
+from concurrent.futures import ProcessPoolExecutor  # Import the process pool running the layouts
+import streamlit as st  # Import Streamlit library for building web applications
+import graphviz  # Import Graphviz for graph visualization
+
+# Upper bound of layout worker processes
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+# Graphs with more nodes than this are laid out with the force directed "sfdp" engine instead of "dot"
+SFDP_THRESHOLD = 500
+
+# Seconds to wait for a layout before falling back to rendering in the browser
+RENDER_TIMEOUT = 120
+
+# Number of rendered SVG images kept in the cache
+SVG_CACHE_SIZE = 64
+
+# Worker pool and rendered SVG images, shared by all sessions
+_executor = None
+_svg_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def _get_executor():
+    # Create the worker pool on first use
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+        return _executor
+
+
+def _layout_svg(source, engine):
+    # Run the Graphviz layout of a DOT source and return the SVG image, executed in a worker process
+    try:
+        return graphviz.Source(source, engine=engine).pipe(format="svg").decode("utf-8")
+    except graphviz.ExecutableNotFound as error:
+        # This exception cannot be rebuilt from its message when it is sent back to the session
+        raise RuntimeError(str(error)) from None
+
+
+def choose_engine(source):
+    # Use "dot" for small graphs and "sfdp" for large ones, counting the node statements between the braces
+    node_count = sum(1 for line in source.splitlines()[1:-1] if "->" not in line)
+    return "sfdp" if node_count > SFDP_THRESHOLD else "dot"
+
+
+def render_svg(source, engine=None):
+    # Return the SVG image of a DOT source, laid out in the worker pool and cached by source and engine
+    engine = engine or choose_engine(source)
+    key = hashlib.blake2b(f"{engine}\n{source}".encode(), digest_size=16).hexdigest()
+    with _lock:
+        svg = _svg_cache.get(key)
+        if svg is not None:
+            _svg_cache.move_to_end(key)
+            return svg
+    # The layout runs outside the lock, so other sessions are not kept waiting
+    svg = _get_executor().submit(_layout_svg, source, engine).result(timeout=RENDER_TIMEOUT)
+    with _lock:
+        _svg_cache[key] = svg
+        while len(_svg_cache) > SVG_CACHE_SIZE:
+            _svg_cache.popitem(last=False)
+    return svg
+
+
+def show_graph(graph):
+    # Display a Graphviz graph or DOT source, laid out on the server if server side rendering is enabled
+    source = graph.source if isinstance(graph, graphviz.Digraph) else graph
+    if not st.session_state.get("server_rendering", False):
+        st.graphviz_chart(source)
+        return
+
+    try:
+        with st.spinner("Rendering graph"):
+            svg = render_svg(source)
+    except Exception as error:
+        # Missing Graphviz binaries, a crashed worker or a timeout fall back to the layout in the browser
+        st.warning(f"Server side rendering failed ({error}), the graph is laid out in the browser instead")
+        st.graphviz_chart(source)
+    else:
+        st.image(svg, use_column_width=True)
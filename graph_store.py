@@ -0,0 +1,461 @@
+import itertools  # Import itertools for the graph version counter
+from collections import deque  # Import deque for the undo history
+import uuid  # Import UUID library for generating unique identifiers
+import networkx as nx  # Import NetworkX library for graph manipulation
+from node_model import as_node, id_key  # Import the compact node records and the keys of their ids
+
+# Keys of the edge lists for each product, as used in the graph dictionary
+PRODUCT_KEYS = ["product 1", "product 2"]
+
+# Node type that must be left out of each product's graph (the other product)
+EXCLUDED_TYPE = {
+    "product 1": "Product 2",
+    "product 2": "Product 1",
+}
+
+# Node type of the product itself in each product's graph
+PRODUCT_TYPE = {
+    "product 1": "Product 1",
+    "product 2": "Product 2",
+}
+
+# Version numbers are unique across all stores, so caches keyed on a version never mix up two graphs
+_versions = itertools.count(1)
+
+# Number of changes kept in the change journal of a store
+JOURNAL_SIZE = 1000
+
+# Limits of the undo history: number of edits and number of nodes and edges referenced by them
+HISTORY_SIZE = 100
+HISTORY_ELEMENTS = 100000
+
+
+class GraphStore:
+    # In-memory graph holding the node list and the edge lists of both products together with
+    # name, id, type and adjacency indexes, so lookups do not have to scan the lists. Nodes are kept as read-only
+    # node records, node dictionaries given to the store are converted.
+    def __init__(self, nodes=None, p1_list=None, p2_list=None):
+        # The lists are kept as they are so the session state can share them with the store
+        self.nodes = nodes if nodes is not None else []
+        self.nodes[:] = map(as_node, self.nodes)
+        self.edges = {
+            "product 1": p1_list if p1_list is not None else [],
+            "product 2": p2_list if p2_list is not None else [],
+        }
+        # Values derived from the graph, valid as long as the version does not change
+        self._cache = {}
+        self._cache_version = None
+        # Number of cache lookups answered from the cache and built anew, read by the instrumentation
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.reindex()
+
+    def reindex(self):
+        # Index nodes by name, id key (see node_model.id_key) and type
+        self.by_name = {}
+        self.by_id = {}
+        self.names_by_type = {}
+
+        # Per product adjacency: node name -> list of outgoing / incoming edges
+        self.out_edges = {key: {} for key in PRODUCT_KEYS}
+        self.in_edges = {key: {} for key in PRODUCT_KEYS}
+
+        for node in self.nodes:
+            self._index_node(node)
+        for key in PRODUCT_KEYS:
+            for edge in self.edges[key]:
+                self._index_edge(key, edge)
+
+        # Sizes of the lists as known to the store, used to detect changes made behind its back
+        self._node_total = len(self.nodes)
+        self._edge_total = sum(len(self.edges[key]) for key in PRODUCT_KEYS)
+        self._journal = []
+        self._clear_history()
+        self.touch()
+        # Oldest version the journal can report changes from
+        self._journal_start = self.version
+
+    def touch(self, edge_changes=None):
+        # Give the graph a new version number, every mutation has to call this.
+        # Mutations that only add or remove edges pass them as (key, source, target, added) tuples,
+        # any other change is journaled as a structural change.
+        self.version = next(_versions)
+        if edge_changes is None or len(edge_changes) > JOURNAL_SIZE:
+            self._journal.append((self.version, None))
+        else:
+            self._journal.extend((self.version, change) for change in edge_changes)
+        if len(self._journal) > JOURNAL_SIZE:
+            self._journal_start = self._journal[-JOURNAL_SIZE - 1][0]
+            del self._journal[:-JOURNAL_SIZE]
+
+    def edge_changes_since(self, version):
+        # Return the edge changes made after the given version in order, or None if anything else changed
+        # in the meantime or the version is older than the journal
+        if version == self.version:
+            return []
+        if version < self._journal_start:
+            return None
+        changes = [change for change_version, change in self._journal if change_version > version]
+        if any(change is None for change in changes):
+            return None
+        return changes
+
+    def cached(self, key, build):
+        # Return the value stored under the key for the current version, building it only on the first request
+        if self._cache_version != self.version:
+            self._cache = {}
+            self._cache_version = self.version
+        if key in self._cache:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def is_backed_by(self, nodes, p1_list, p2_list):
+        # Check whether the store still wraps the given lists and they were not changed behind its back
+        return (self.nodes is nodes and self.edges["product 1"] is p1_list
+                and self.edges["product 2"] is p2_list
+                and self._node_total == len(nodes)
+                and self._edge_total == len(p1_list) + len(p2_list))
+
+    def _index_node(self, node):
+        name = node.name
+        # Names are used as node keys by the edges, the first node with a name wins
+        if name not in self.by_name:
+            self.by_name[name] = node
+            self.names_by_type.setdefault(node.type, {})[name] = None
+        self.by_id[node.uid] = node
+
+    def _unindex_node(self, node):
+        name = node.name
+        if self.by_name.get(name) is node:
+            del self.by_name[name]
+            self.names_by_type.get(node.type, {}).pop(name, None)
+        self.by_id.pop(node.uid, None)
+
+    def _index_edge(self, key, edge):
+        self.out_edges[key].setdefault(edge["source"], []).append(edge)
+        self.in_edges[key].setdefault(edge["target"], []).append(edge)
+
+    def _unindex_edge(self, key, edge):
+        for adjacency, name in ((self.out_edges[key], edge["source"]), (self.in_edges[key], edge["target"])):
+            edges = adjacency.get(name, [])
+            edges[:] = [e for e in edges if e is not edge]
+            if not edges:
+                adjacency.pop(name, None)
+
+    # ----- Queries -----
+
+    def node(self, name):
+        # Return the node with the given name or None
+        return self.by_name.get(name)
+
+    def node_by_id(self, node_id):
+        # Return the node with the given id or None
+        return self.by_id.get(id_key(node_id))
+
+    def node_type(self, name):
+        # Return the type of the node with the given name, or an empty string if it does not exist
+        node = self.by_name.get(name)
+        return node.type if node is not None else ""
+
+    def names(self):
+        # Return the names of all nodes
+        return list(self.by_name)
+
+    def names_of_type(self, *node_types):
+        # Return the names of all nodes of the given types
+        names = []
+        for node_type in node_types:
+            names.extend(self.names_by_type.get(node_type, {}))
+        return names
+
+    def names_for_product(self, key):
+        # Return the names of all nodes that may take part in the graph of the given product
+        excluded = EXCLUDED_TYPE[key]
+        return [name for node_type, names in self.names_by_type.items() if node_type != excluded
+                for name in names]
+
+    def nodes_for_product(self, key):
+        # Return the nodes that may take part in the graph of the given product
+        return [self.by_name[name] for name in self.names_for_product(key)]
+
+    def out_edges_of(self, key, name):
+        # Return the edges of the given product that start at the node
+        return self.out_edges[key].get(name, [])
+
+    def in_edges_of(self, key, name):
+        # Return the edges of the given product that end at the node
+        return self.in_edges[key].get(name, [])
+
+    def is_connected(self, key, name):
+        # Check whether the node takes part in at least one edge of the given product
+        return name in self.out_edges[key] or name in self.in_edges[key]
+
+    def is_cached(self, key):
+        # Check whether a value is stored under the key for the current version
+        return self._cache_version == self.version and key in self._cache
+
+    def product_graph(self, key, all_nodes=False):
+        # Return the NetworkX graph of the given product, built once per graph version.
+        # The graph is shared between reruns and must not be modified by the caller. Its nodes hold name, id and
+        # type, the submodels are read from the node records of the store.
+        def build():
+            graph = nx.DiGraph()
+            nodes = self.nodes if all_nodes else self.nodes_for_product(key)
+            graph.add_nodes_from((node.name, {"name": node.name, "id": node.id, "type": node.type}) for node in nodes)
+            graph.add_edges_from((edge["source"], edge["target"], edge) for edge in self.edges[key])
+            return graph
+
+        return self.cached(("product_graph", key, all_nodes), build)
+
+    def graph_dict(self):
+        # Return the graph in the JSON layout used for import and export, the nodes being node records
+        return {
+            "nodes": self.nodes,
+            "product 1": self.edges["product 1"],
+            "product 2": self.edges["product 2"],
+        }
+
+    # ----- Mutations -----
+    # Edits are applied as ("set", list, index, old, new), ("insert", list, pairs), ("delete", list, pairs),
+    # ("append", list, elements) and ("truncate", list, elements) operations on the node list ("nodes") or an edge
+    # list (product key), pairs being (index, element) in ascending order. The operations of an edit are kept in
+    # the undo history, undoing applies their inverses.
+
+    def load(self, nodes, p1_list, p2_list):
+        # Replace the whole graph, keeping the list objects shared with the session state
+        self.nodes[:] = map(as_node, nodes)
+        self.edges["product 1"][:] = p1_list
+        self.edges["product 2"][:] = p2_list
+        self.reindex()
+
+    def add_node(self, node):
+        # Append a new node to the graph
+        node = as_node(node)
+        self._edit(f"Create node {node['name']}", [("append", "nodes", [node])])
+        return node
+
+    def add_nodes(self, nodes, label=None):
+        # Append a batch of nodes to the graph as a single change, which can be undone if it has a label
+        self._edit(label, [("append", "nodes", list(map(as_node, nodes)))])
+
+    def update_node(self, name, new_name, new_type, submodels):
+        # Update name, type and submodels of a node and rename the edges connected to it.
+        # The node record and the edge dictionaries are replaced by updated copies instead of being changed in
+        # place, so snapshots of earlier versions can keep sharing them.
+        old = self.by_name[name]
+        node = old.updated(new_name, new_type, submodels)
+        operations = [("set", "nodes", next(index for index, item in enumerate(self.nodes) if item is old), old, node)]
+
+        if new_name != name:
+            for key in PRODUCT_KEYS:
+                connected = {id(edge) for edge in self.out_edges[key].get(name, []) + self.in_edges[key].get(name, [])}
+                for index, edge in self._positions(key, connected):
+                    operations.append(("set", key, index, edge, {
+                        **edge,
+                        "source": new_name if edge["source"] == name else edge["source"],
+                        "target": new_name if edge["target"] == name else edge["target"],
+                    }))
+        self._edit(f"Update node {name}", operations)
+        return node
+
+    def delete_node(self, name):
+        # Remove every node with the given name together with the edges connected to it
+        removed = [(index, node) for index, node in enumerate(self.nodes) if node.name == name]
+        operations = []
+        for key in PRODUCT_KEYS:
+            connected = {id(edge) for edge in self.out_edges[key].get(name, []) + self.in_edges[key].get(name, [])}
+            if connected:
+                operations.append(("delete", key, self._positions(key, connected)))
+        operations.append(("delete", "nodes", removed))
+        self._edit(f"Delete node {name}", operations)
+        return [node for _, node in removed]
+
+    def add_edge(self, key, source, relation, target):
+        # Append a new relation to the edge list of the given product
+        edge = {
+            "source": source,
+            "target": target,
+            "type": relation,
+            "id": str(uuid.uuid4()),
+        }
+        self._edit(f"Create relation {source} {relation} {target}",
+                   [("append", key, [edge])])
+        return edge
+
+    def add_edges(self, key, edges, label=None):
+        # Append a batch of existing edge dictionaries to the edge list of the given product as a single change,
+        # which can be undone if it has a label
+        self._edit(label, [("append", key, edges)])
+
+    def delete_edge(self, key, relation):
+        # Remove every edge of the given product matching a (source, type, target) tuple
+        source, relation_type, target = relation
+        matching = {id(edge) for edge in self.out_edges_of(key, source)
+                    if edge["type"] == relation_type and edge["target"] == target}
+        removed = self._positions(key, matching)
+        self._edit(f"Delete relation {source} {relation_type} {target}", [("delete", key, removed)])
+        return [edge for _, edge in removed]
+
+    def _positions(self, key, edge_ids):
+        # Return (index, edge) of the edges of a product with the given object ids
+        if not edge_ids:
+            return []
+        return [(index, edge) for index, edge in enumerate(self.edges[key]) if id(edge) in edge_ids]
+
+    # ----- Undo and redo -----
+
+    def can_undo(self):
+        return bool(self.undo_history)
+
+    def can_redo(self):
+        return bool(self.redo_history)
+
+    def undo(self):
+        # Revert the last edit and return its label, the cost is proportional to the size of the edit
+        label, operations, size = self.undo_history.pop()
+        self._history_size -= size
+        self._apply([_inverse(operation) for operation in reversed(operations)])
+        self.redo_history.append((label, operations, size))
+        return label
+
+    def redo(self):
+        # Repeat the last undone edit and return its label
+        label, operations, size = self.redo_history.pop()
+        self._apply(operations)
+        self._remember(label, operations, size)
+        return label
+
+    def _edit(self, label, operations):
+        # Apply the operations of an edit and keep them in the undo history. An edit without a label cannot be
+        # undone and clears the history, as the positions kept for the earlier edits are no longer valid.
+        self._apply(operations)
+        self.redo_history.clear()
+        if label is None:
+            self._clear_history()
+        else:
+            self._remember(label, operations, sum(_operation_size(operation) for operation in operations))
+
+    def _remember(self, label, operations, size):
+        # Keep an edit in the undo history, dropping the oldest edits beyond HISTORY_SIZE edits or
+        # HISTORY_ELEMENTS nodes and edges. The last edit is always kept.
+        self.undo_history.append((label, operations, size))
+        self._history_size += size
+        while len(self.undo_history) > 1 and (len(self.undo_history) > HISTORY_SIZE
+                                              or self._history_size > HISTORY_ELEMENTS):
+            self._history_size -= self.undo_history.popleft()[2]
+
+    def _clear_history(self):
+        self.undo_history = deque()
+        self.redo_history = []
+        self._history_size = 0
+
+    def _apply(self, operations):
+        # Apply list operations and keep the indexes and the change journal up to date
+        edge_changes = []
+        structural = False
+        for operation in operations:
+            kind, sequence_name = operation[0], operation[1]
+            sequence = self.nodes if sequence_name == "nodes" else self.edges[sequence_name]
+            if kind == "set":
+                _, _, index, old, new = operation
+                sequence[index] = new
+                removed, added = [old], [new]
+            elif kind == "append":
+                sequence.extend(operation[2])
+                removed, added = (), operation[2]
+            elif kind == "truncate":
+                del sequence[len(sequence) - len(operation[2]):]
+                removed, added = operation[2], ()
+            elif kind == "insert":
+                _insert(sequence, operation[2])
+                removed, added = (), [element for _, element in operation[2]]
+            else:
+                _delete(sequence, operation[2])
+                removed, added = [element for _, element in operation[2]], ()
+
+            if sequence_name == "nodes":
+                for node in removed:
+                    self._unindex_node(node)
+                for node in added:
+                    self._index_node(node)
+                self._node_total += len(added) - len(removed)
+                structural = True
+            else:
+                for edge in removed:
+                    self._unindex_edge(sequence_name, edge)
+                for edge in added:
+                    self._index_edge(sequence_name, edge)
+                self._edge_total += len(added) - len(removed)
+                if len(edge_changes) + len(removed) + len(added) > JOURNAL_SIZE:
+                    # Too many changes to journal one by one, e.g. an import
+                    structural = True
+                if not structural:
+                    edge_changes.extend((sequence_name, edge["source"], edge["target"], False) for edge in removed)
+                    edge_changes.extend((sequence_name, edge["source"], edge["target"], True) for edge in added)
+        self.touch(None if structural else edge_changes)
+
+
+def _inverse(operation):
+    # Return the operation reverting the given one
+    if operation[0] == "set":
+        kind, sequence_name, index, old, new = operation
+        return kind, sequence_name, index, new, old
+    kind, sequence_name, elements = operation
+    inverse = {"insert": "delete", "delete": "insert", "append": "truncate", "truncate": "append"}
+    return inverse[kind], sequence_name, elements
+
+
+def _operation_size(operation):
+    return 1 if operation[0] == "set" else len(operation[2])
+
+
+def _insert(sequence, pairs):
+    # Insert elements at their index in the resulting list, pairs in ascending order of the index
+    if len(pairs) <= 16:
+        for index, element in pairs:
+            sequence.insert(index, element)
+    else:
+        # Merge many elements in one pass instead of shifting the list for each of them
+        inserted = dict(pairs)
+        remaining = iter(list(sequence))
+        sequence[:] = [inserted[index] if index in inserted else next(remaining)
+                       for index in range(len(sequence) + len(pairs))]
+
+
+def _delete(sequence, pairs):
+    # Remove the elements at the given indexes of the list, pairs in ascending order of the index
+    if len(pairs) <= 16:
+        for index, _ in reversed(pairs):
+            del sequence[index]
+    else:
+        removed = {index for index, _ in pairs}
+        sequence[:] = [element for index, element in enumerate(sequence) if index not in removed]
+
+
+def set_graph_store(store):
+    # Make the given store the graph of the current Streamlit session
+    import streamlit as st
+
+    st.session_state["node_list"] = store.nodes
+    st.session_state["p1_list"] = store.edges["product 1"]
+    st.session_state["p2_list"] = store.edges["product 2"]
+    st.session_state["graph_store"] = store
+    st.session_state["graph_dict"] = store.graph_dict()
+
+
+def get_graph_store():
+    # Return the graph store of the current Streamlit session, rebuilding it if the session lists were replaced
+    import streamlit as st
+
+    node_list = st.session_state["node_list"]
+    p1_list = st.session_state["p1_list"]
+    p2_list = st.session_state["p2_list"]
+
+    store = st.session_state.get("graph_store")
+    if store is None or not store.is_backed_by(node_list, p1_list, p2_list):
+        store = GraphStore(node_list, p1_list, p2_list)
+        st.session_state["graph_store"] = store
+    return store
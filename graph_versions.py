@@ -0,0 +1,140 @@
+# Named snapshots of the graph of a session. A snapshot keeps the node and edge lists as tuples of chunks, and
+# chunks that did not change since the snapshot a version is based on are shared with it. Node and edge
+# dictionaries are never changed in place by the graph store, so all snapshots share them as well and a new
+# version only costs the chunks holding its changes.
+import itertools  # Import itertools to join the chunks of a snapshot
+from collections import OrderedDict  # Import OrderedDict for the snapshots and the least recently used stores
+from datetime import datetime, timezone  # Import datetime for the time stamp of a snapshot
+from graph_store import GraphStore, PRODUCT_KEYS  # Import the graph store
+
+# Average number of nodes or edges per chunk. Chunk ends are chosen by the elements themselves, so inserting
+# or removing an element only changes the chunk holding it and the following chunks are still shared.
+CHUNK_SIZE = 256
+MAX_CHUNK_SIZE = 4 * CHUNK_SIZE
+
+# Number of graph stores with their indexes kept for the recently used snapshots. Switching to one of them is
+# O(1), switching to any other snapshot rebuilds its store and indexes in O(N) for N nodes and edges.
+STORE_CACHE_SIZE = 4
+
+
+def _is_chunk_end(element):
+    # Spread the addresses of the dictionaries with a multiplicative hash, dictionaries are 16 byte aligned
+    return ((id(element) >> 4) * 2654435761) % (1 << 32) % CHUNK_SIZE == 0
+
+
+def _freeze(elements, known):
+    # Split a list into chunks, reusing the known chunk with the same elements where there is one
+    chunks = []
+    chunk = []
+    for element in elements:
+        chunk.append(element)
+        if _is_chunk_end(element) or len(chunk) == MAX_CHUNK_SIZE:
+            chunks.append(_shared_chunk(chunk, known))
+            chunk = []
+    if chunk:
+        chunks.append(_shared_chunk(chunk, known))
+    return tuple(chunks)
+
+
+def _shared_chunk(chunk, known):
+    previous = known.get(id(chunk[0]))
+    if previous is not None and len(previous) == len(chunk) and all(a is b for a, b in zip(previous, chunk)):
+        return previous
+    return tuple(chunk)
+
+
+class Snapshot:
+    # One saved version of the graph
+    def __init__(self, name, nodes, edges, parent=None):
+        self.name = name
+        self.saved_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.nodes = nodes
+        self.edges = edges
+        self.parent = parent
+        self.node_count = sum(len(chunk) for chunk in nodes)
+        self.edge_count = sum(len(chunk) for key in PRODUCT_KEYS for chunk in edges[key])
+
+    def chunks(self):
+        # Return all chunks of the node and edge lists
+        return itertools.chain(self.nodes, *(self.edges[key] for key in PRODUCT_KEYS))
+
+    def store(self):
+        # Build a graph store with its indexes holding this version
+        return GraphStore(list(itertools.chain.from_iterable(self.nodes)),
+                          *(list(itertools.chain.from_iterable(self.edges[key])) for key in PRODUCT_KEYS))
+
+
+class VersionHistory:
+    # Snapshots of the graph of a session by name. Switching to a snapshot returns its graph store; the stores of
+    # the cache_size most recently used snapshots are kept as long as they are not edited, so switching between
+    # them is O(1). Any other snapshot is rebuilt with its indexes from its chunks in O(N).
+    def __init__(self, cache_size=STORE_CACHE_SIZE):
+        self.snapshots = OrderedDict()
+        self.current = None
+        self.cache_size = cache_size
+        # Snapshot name -> (graph store, version of the store when it held the snapshot)
+        self._stores = OrderedDict()
+
+    def save(self, name, store):
+        # Save the graph of a store as a snapshot, replacing a snapshot with the same name
+        known = {}
+        for base in (self.snapshots.get(self.current), self.snapshots.get(name)):
+            if base is not None:
+                known.update((id(chunk[0]), chunk) for chunk in base.chunks())
+        snapshot = Snapshot(name, _freeze(store.nodes, known),
+                            {key: _freeze(store.edges[key], known) for key in PRODUCT_KEYS},
+                            parent=self.current if self.current != name else self.snapshots[name].parent)
+        self.snapshots[name] = snapshot
+        self.snapshots.move_to_end(name)
+        self.current = name
+        self._keep_store(name, store)
+        return snapshot
+
+    def checkout(self, name):
+        # Return a graph store holding the snapshot, raises KeyError for an unknown name
+        snapshot = self.snapshots[name]
+        if self.is_indexed(name):
+            store = self._stores[name][0]
+            self._stores.move_to_end(name)
+        else:
+            store = snapshot.store()
+            self._keep_store(name, store)
+        self.current = name
+        return store
+
+    def delete(self, name):
+        # Remove a snapshot, the chunks it shares with other snapshots are kept by them
+        del self.snapshots[name]
+        self._stores.pop(name, None)
+        if self.current == name:
+            self.current = None
+
+    def is_indexed(self, name):
+        # Check whether the snapshot has a kept store, so switching to it does not rebuild the indexes
+        entry = self._stores.get(name)
+        return entry is not None and entry[0].version == entry[1]
+
+    def is_saved(self, store):
+        # Check whether the store holds a snapshot and was not edited since
+        return any(saved is store and saved.version == version for saved, version in self._stores.values())
+
+    def references(self):
+        # Return the node and edge references held by all snapshots and the number they would hold unshared
+        unique = {id(chunk): len(chunk) for snapshot in self.snapshots.values() for chunk in snapshot.chunks()}
+        total = sum(snapshot.node_count + snapshot.edge_count for snapshot in self.snapshots.values())
+        return sum(unique.values()), total
+
+    def _keep_store(self, name, store):
+        self._stores[name] = (store, store.version)
+        self._stores.move_to_end(name)
+        while len(self._stores) > self.cache_size:
+            self._stores.popitem(last=False)
+
+
+def get_version_history():
+    # Return the snapshots of the current Streamlit session
+    import streamlit as st
+
+    if "graph_versions" not in st.session_state:
+        st.session_state["graph_versions"] = VersionHistory()
+    return st.session_state["graph_versions"]
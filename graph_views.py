@@ -0,0 +1,82 @@
+import hashlib  # Import hashlib for the content hashes of the views
+import threading  # Import threading to guard the render cache shared by all sessions
+from collections import OrderedDict  # Import OrderedDict for the least recently used render cache
+import graphviz  # Import Graphviz for graph visualization
+
+# Views of a product graph: the PPR structure and one view per submodel
+VIEWS = {
+    "PPR View": None,
+    "Basic Engineering View": "Engineering",
+    "Electrical View": "Electrical",
+    "Sustainable View": "Sustainable",
+}
+
+# Number of rendered views kept in the cache
+RENDER_CACHE_SIZE = 64
+
+# DOT sources of rendered views keyed by the content hash of the view, shared by all sessions
+_render_cache = OrderedDict()
+_render_cache_lock = threading.Lock()
+
+
+def set_color(node_type):
+    # Set the color of a node based on its type
+    color = "Red"
+    if node_type == "Product 1":
+        color = "Blue"
+    elif node_type == "Process":
+        color = "Yellow"
+    elif node_type == "Resource":
+        color = "Green"
+    return color
+
+
+def view_hash(store, key, view):
+    # Hash of everything a view of a product graph shows: node names, types, the submodel of the view and the edges
+    def build():
+        submodel = VIEWS[view]
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr((key, view)).encode())
+        for node in store.nodes_for_product(key):
+            label = str(node.submodel(submodel)) if submodel else ""
+            digest.update(repr((node["name"], node["type"], label)).encode())
+        for edge in store.edges[key]:
+            digest.update(repr((edge["source"], edge["target"], edge["type"])).encode())
+        return digest.hexdigest()
+
+    # The hash itself only has to be computed once per graph version
+    return store.cached(("view_hash", key, view), build)
+
+
+def build_view(store, key, view):
+    # Build the Graphviz graph of a view of the given product
+    submodel = VIEWS[view]
+    graph = graphviz.Digraph()
+    for node in store.nodes_for_product(key):
+        node_name = node["name"]
+        if submodel:
+            graph.node(node_name, node_name,
+                       xlabel=str(node.submodel(submodel)),
+                       color=set_color(node["type"]))
+        else:
+            graph.node(node_name, node_name, color=set_color(node["type"]))
+    for edge in store.edges[key]:
+        graph.edge(edge["source"], edge["target"], edge["type"])
+    return graph
+
+
+def view_source(store, key, view):
+    # Return the DOT source of a view, built only if a view with the same content was not rendered before
+    content_hash = view_hash(store, key, view)
+    with _render_cache_lock:
+        source = _render_cache.get(content_hash)
+        if source is not None:
+            _render_cache.move_to_end(content_hash)
+            return source
+    # The view is built outside the lock, so other sessions are not kept waiting
+    source = build_view(store, key, view).source
+    with _render_cache_lock:
+        _render_cache[content_hash] = source
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return source
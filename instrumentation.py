@@ -0,0 +1,183 @@
+# Timing of the tabs and analysis functions: wall time, graph size and graph store cache hits per call,
+# kept per process and exported in the Prometheus text format
+import functools  # Import functools to keep the names of the instrumented functions
+import os  # Import os for the metrics file path
+import tempfile  # Import tempfile for the default location of the metrics file
+import threading  # Import threading to guard the metrics shared by all sessions
+import time  # Import time for the timings
+from collections import deque  # Import deque for the recent timings of each metric
+from contextlib import contextmanager  # Import contextmanager for the timing blocks
+import numpy as np  # Import NumPy for the percentiles
+
+# Upper bounds in seconds of the histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Number of recent timings kept per metric for the percentiles
+SAMPLE_SIZE = 1000
+
+# Metrics file in the Prometheus text format, for the textfile collector of the node exporter
+METRICS_FILE = os.environ.get("PPR_METRICS_FILE", os.path.join(tempfile.gettempdir(), "ppr_metrics.prom"))
+
+
+class Metric:
+    # Timings of one tab or function
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.nodes = None
+        self.edges = None
+
+    def add(self, seconds, nodes, edges, cache_hits, cache_misses):
+        self.count += 1
+        self.total += seconds
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+                break
+        self.samples.append(seconds)
+        self.cache_hits += cache_hits
+        self.cache_misses += cache_misses
+        if nodes is not None:
+            self.nodes, self.edges = nodes, edges
+
+
+# Metrics by (kind, name), shared by all sessions of the process
+_metrics = {}
+_lock = threading.Lock()
+
+
+def record(kind, name, seconds, nodes=None, edges=None, cache_hits=0, cache_misses=0):
+    # Add one timing to the metric of a tab ("tab") or analysis function ("function")
+    with _lock:
+        _metrics.setdefault((kind, name), Metric()).add(seconds, nodes, edges, cache_hits, cache_misses)
+
+
+def reset():
+    # Forget all timings
+    with _lock:
+        _metrics.clear()
+
+
+def _session_store():
+    # Return the graph store of the current session, or None outside of a session
+    try:
+        from graph_store import get_graph_store
+        return get_graph_store()
+    except Exception:
+        # Without a Streamlit session there is no store, the timing is still recorded
+        return None
+
+
+@contextmanager
+def measure(kind, name):
+    # Time a block and record it with the size of the graph and the cache lookups of the graph store
+    store = _session_store()
+    hits, misses = (store.cache_hits, store.cache_misses) if store is not None else (0, 0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        after = _session_store()
+        if after is None:
+            record(kind, name, seconds)
+        else:
+            if after is not store:
+                # The graph was replaced during the block, e.g. by an import
+                hits, misses = 0, 0
+            record(kind, name, seconds, len(after.nodes), sum(len(edges) for edges in after.edges.values()),
+                   after.cache_hits - hits, after.cache_misses - misses)
+
+
+def instrumented(function):
+    # Decorator recording every call of an analysis function
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with measure("function", function.__name__):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+def summary():
+    # Return one row per metric with count, percentiles, cache hit ratio and the last graph size
+    with _lock:
+        items = [(key, metric, list(metric.samples)) for key, metric in sorted(_metrics.items())]
+    rows = []
+    for (kind, name), metric, samples in items:
+        p50, p90, p99 = np.percentile(samples, [50, 90, 99]) if samples else (0.0, 0.0, 0.0)
+        lookups = metric.cache_hits + metric.cache_misses
+        rows.append({
+            "Kind": kind,
+            "Name": name,
+            "Calls": metric.count,
+            "Mean (s)": metric.total / metric.count,
+            "p50 (s)": p50,
+            "p90 (s)": p90,
+            "p99 (s)": p99,
+            "Max (s)": max(samples) if samples else 0.0,
+            "Cache hit ratio": metric.cache_hits / lookups if lookups else None,
+            "Nodes": metric.nodes,
+            "Edges": metric.edges,
+        })
+    return rows
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text():
+    # Return all metrics in the Prometheus text exposition format
+    lines = [
+        "# HELP ppr_duration_seconds Wall time of the tabs and analysis functions",
+        "# TYPE ppr_duration_seconds histogram",
+    ]
+    with _lock:
+        items = sorted(_metrics.items())
+        for (kind, name), metric in items:
+            labels = f'kind="{_label(kind)}",name="{_label(name)}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, metric.buckets):
+                cumulative += count
+                lines.append(f'ppr_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'ppr_duration_seconds_bucket{{{labels},le="+Inf"}} {metric.count}')
+            lines.append(f"ppr_duration_seconds_sum{{{labels}}} {metric.total}")
+            lines.append(f"ppr_duration_seconds_count{{{labels}}} {metric.count}")
+
+        for metric_name, help_text, attribute in (
+                ("ppr_cache_hits_total", "Graph store cache hits", "cache_hits"),
+                ("ppr_cache_misses_total", "Graph store cache misses", "cache_misses")):
+            lines.append(f"# HELP {metric_name} {help_text}")
+            lines.append(f"# TYPE {metric_name} counter")
+            for (kind, name), metric in items:
+                lines.append(f'{metric_name}{{kind="{_label(kind)}",name="{_label(name)}"}} '
+                             f"{getattr(metric, attribute)}")
+
+        for metric_name, help_text, attribute in (
+                ("ppr_graph_nodes", "Nodes of the graph at the last call", "nodes"),
+                ("ppr_graph_edges", "Edges of the graph at the last call", "edges")):
+            lines.append(f"# HELP {metric_name} {help_text}")
+            lines.append(f"# TYPE {metric_name} gauge")
+            for (kind, name), metric in items:
+                if getattr(metric, attribute) is not None:
+                    lines.append(f'{metric_name}{{kind="{_label(kind)}",name="{_label(name)}"}} '
+                                 f"{getattr(metric, attribute)}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path=None):
+    # Write the metrics file, replacing it in one step so a collector never reads half a file.
+    # Returns False if the file cannot be written, the metrics must never break a rerun.
+    path = path or METRICS_FILE
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temporary, "w", encoding="utf-8") as fileobj:
+            fileobj.write(prometheus_text())
+        os.replace(temporary, path)
+    except OSError:
+        return False
+    return True
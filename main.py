@@ -5,7 +5,10 @@ from streamlit_option_menu import option_menu  # Import custom option menu
 from tabs import (upload_graph, create_node, update_node, delete_node,  # Import custom tab functions
                   create_relation, delete_relation,
                   store_graph, visualization_graph, basic_analyze_graph,
-                  export_graph, graph_dict_to_ppr_dict, adv_analyze_graph)
+                  export_graph, graph_dict_to_ppr_dict, adv_analyze_graph, performance_panel,
+                  edit_history)
+from instrumentation import measure, write_metrics  # Import the timing of the tabs
+from graph_functions import MAX_PATH_TABLE_NODES, drop_path_tables  # Import the shortest path table settings
 
 if __name__ == '__main__':
     # Initialize session state variables if not already present
@@ -37,7 +40,8 @@ if __name__ == '__main__':
         "Visualize the graph",
         "Basic Analysis of the graph",
         "Advanced Analysis of the graph",
-        "Export the graph"
+        "Export the graph",
+        "Performance"
     ]
 
     # Configure the Streamlit page layout
@@ -48,44 +52,62 @@ if __name__ == '__main__':
         selected_tab = option_menu("Main Menu",
                                    tab_list,
                                    icons=['cloud-download', 'gear', 'brilliance', 'trash', 'asterisk', 'trash-fill',
-                                          'clock-history', 'car-front', 'cast', 'floppy2', 'cloud-upload'],
+                                          'clock-history', 'car-front', 'cast', 'floppy2', 'cloud-upload', 'speedometer2'],
                                    menu_icon="cast",
                                    default_index=0,
                                    orientation="vertical")
+        # Undo and redo the last edits of the nodes and relations
+        edit_history()
+        # Lay out graphs on the server in a worker pool instead of in the browser
+        st.checkbox("Render graphs on the server", key="server_rendering",
+                    help="Recommended for large graphs, the browser only receives the finished image")
+        # Answer the path queries of the basic analysis from a precomputed all pairs table
+        if not st.checkbox("Precompute all shortest paths", key="path_table",
+                           help="Path lookups become table reads, the table is filled in the background. It takes "
+                                f"8 bytes per pair of nodes, graphs with more than {MAX_PATH_TABLE_NODES:,} nodes are "
+                                "not precomputed"):
+            drop_path_tables()
 
     # Main title for the application
     st.title("PPR - Machine Tower")
 
-    # Determine the action based on the selected tab
-    if selected_tab == "Import existing graph":
-        upload_graph()
+    # Determine the action based on the selected tab, timing the whole tab
+    with measure("tab", selected_tab):
+        if selected_tab == "Import existing graph":
+            upload_graph()
 
-    if selected_tab == "Create Nodes":
-        create_node()
+        if selected_tab == "Create Nodes":
+            create_node()
 
-    if selected_tab == "Update Nodes":
-        update_node()
+        if selected_tab == "Update Nodes":
+            update_node()
 
-    if selected_tab == "Delete Nodes":
-        delete_node()
+        if selected_tab == "Delete Nodes":
+            delete_node()
 
-    if selected_tab == "Create Relation":
-        create_relation()
+        if selected_tab == "Create Relation":
+            create_relation()
 
-    if selected_tab == "Delete Relation":
-        delete_relation()
+        if selected_tab == "Delete Relation":
+            delete_relation()
 
-    if selected_tab == "Store the graph":
-        store_graph()
+        if selected_tab == "Store the graph":
+            store_graph()
 
-    if selected_tab == "Visualize the graph":
-        visualization_graph()
+        if selected_tab == "Visualize the graph":
+            visualization_graph()
 
-    if selected_tab == "Basic Analysis of the graph":
-        basic_analyze_graph()
+        if selected_tab == "Basic Analysis of the graph":
+            basic_analyze_graph()
 
-    if selected_tab == "Advanced Analysis of the graph":
-        adv_analyze_graph()
+        if selected_tab == "Advanced Analysis of the graph":
+            adv_analyze_graph()
 
-    if selected_tab == "Export the graph":
-        export_graph()
+        if selected_tab == "Export the graph":
+            export_graph()
+
+        if selected_tab == "Performance":
+            performance_panel()
+
+    # Update the local metrics file after every rerun
+    write_metrics()
@@ -0,0 +1,177 @@
+# Validation against the metamodel of Model.metamodel_dict. The metamodel is compiled once into lookup tables:
+# the relation types of each node type, the set of allowed (source type, relation, target type) triples and a
+# boolean NumPy table of the triples indexed by integer codes, so whole edge lists are checked without a loop.
+from itertools import repeat  # Import repeat for the default codes of the lookups
+import numpy as np  # Import NumPy for the vectorized checks
+import pandas as pd  # Import pandas for the code lookups and the violation report
+from Model import metamodel_dict  # Import metamodel dictionary from Model module
+from graph_store import PRODUCT_KEYS, EXCLUDED_TYPE  # Import the product keys and the excluded node types
+
+# Columns of a violation report
+REPORT_COLUMNS = ["Section", "Row", "Element", "Problem"]
+
+# Problems of an edge, in the order of the bits of the problem tables: (column, problem)
+EDGE_PROBLEMS = [
+    ("source", "The source node does not exist"),
+    ("target", "The target node does not exist"),
+    ("source", "A {excluded} node cannot take part in this product"),
+    ("relation", "The relation has to be one of {relations}"),
+    ("relation", "The metamodel does not allow this relation between the types of its nodes"),
+]
+
+
+def _codes(lookup, values, default):
+    # Look up the codes of many values with C level iteration, values without a code get the default
+    return np.fromiter(map(lookup.get, values, repeat(default)), dtype=np.intp)
+
+
+class Metamodel:
+    # Lookup tables compiled from a metamodel dictionary
+    def __init__(self, metamodel):
+        self.node_types = [node["type"] for node in metamodel["nodes"]]
+        self.relation_types = list(metamodel["edges"])
+        self.relations_of_type = {node["type"]: frozenset(node["edges"]) for node in metamodel["nodes"]}
+        self.triples = frozenset(tuple(triple) for triple in metamodel.get("relations", []))
+
+        for source, relation, target in self.triples:
+            if source not in self.relations_of_type or target not in self.relations_of_type:
+                raise ValueError(f"The relation {source} {relation} {target} uses an undeclared node type")
+            if relation not in self.relations_of_type[source] or relation not in self.relations_of_type[target]:
+                raise ValueError(f"The relation {source} {relation} {target} is not declared for both node types")
+
+        # Integer codes of the node and relation types, unknown values get the code after the last type
+        self.type_code = {node_type: code for code, node_type in enumerate(self.node_types)}
+        self.relation_code = {relation: code for code, relation in enumerate(self.relation_types)}
+        self.allowed = np.zeros((len(self.node_types) + 1, len(self.relation_types) + 1, len(self.node_types) + 1),
+                                dtype=bool)
+        for source, relation, target in self.triples:
+            self.allowed[self.type_code[source], self.relation_code[relation], self.type_code[target]] = True
+        self._problem_tables = {}
+
+    # ----- Single elements, for the edit forms -----
+
+    def is_allowed(self, source_type, relation, target_type):
+        return (source_type, relation, target_type) in self.triples
+
+    def allowed_relations(self, source_type, target_type):
+        # Return the relation types allowed from a node of the source type to a node of the target type
+        return [relation for relation in self.relation_types if (source_type, relation, target_type) in self.triples]
+
+    def node_type_problems(self, store, name, new_type):
+        # Return the relations of a node that the metamodel allows now but would no longer allow if its type were
+        # changed, relations breaking the metamodel already do not keep the node from being edited
+        old_type = store.node_type(name)
+        problems = []
+        for key in PRODUCT_KEYS:
+            if new_type == EXCLUDED_TYPE[key] != old_type and store.is_connected(key, name):
+                problems.append(f"A {new_type} node cannot take part in the relations of {key}")
+            edges = list(store.out_edges_of(key, name)) + [edge for edge in store.in_edges_of(key, name)
+                                                           if edge["source"] != name]
+            for edge in edges:
+                source, target = edge["source"], edge["target"]
+                old_types = [old_type if end == name else store.node_type(end) for end in (source, target)]
+                new_types = [new_type if end == name else store.node_type(end) for end in (source, target)]
+                if (self.is_allowed(old_types[0], edge["type"], old_types[1])
+                        and not self.is_allowed(new_types[0], edge["type"], new_types[1])):
+                    problems.append(f"{source} {edge['type']} {target} ({key}) is not allowed "
+                                    f"from a {new_types[0]} to a {new_types[1]}")
+        return problems
+
+    # ----- Vectorized checks -----
+    # Node type codes run from 0 to len(node_types), the last code standing for undeclared types, and -1 stands
+    # for a missing node. Relation codes run from 0 to len(relation_types), the last code for unknown relations.
+
+    def type_codes(self, types):
+        return _codes(self.type_code, types, len(self.node_types))
+
+    def relation_codes(self, relations):
+        return _codes(self.relation_code, relations, len(self.relation_types))
+
+    def name_codes(self, store):
+        # Return a dictionary from the node names of a store to the codes of their types, read from the type index
+        codes = {}
+        for node_type, names in store.names_by_type.items():
+            codes.update(dict.fromkeys(names, self.type_code.get(node_type, len(self.node_types))))
+        return codes
+
+    def end_codes(self, name_codes, names):
+        # Type codes of the nodes with the given names, -1 for names without a node
+        return _codes(name_codes, names, -1)
+
+    def problem_table(self, key):
+        # Bit mask of the EDGE_PROBLEMS of every (source code + 1, relation code, target code + 1) of a product
+        if key not in self._problem_tables:
+            types = len(self.node_types)
+            source = np.arange(-1, types + 1)[:, None, None]
+            relation = np.arange(len(self.relation_types) + 1)[None, :, None]
+            target = np.arange(-1, types + 1)[None, None, :]
+            excluded = self.type_code.get(EXCLUDED_TYPE[key], -2)
+            known = (source >= 0) & (source < types) & (target >= 0) & (target < types) & (relation < len(self.relation_types))
+            allowed = self.allowed[np.clip(source, 0, types), relation, np.clip(target, 0, types)]
+            masks = [
+                source == -1,
+                target == -1,
+                (source == excluded) | (target == excluded),
+                relation == len(self.relation_types),
+                known & ~allowed,
+            ]
+            table = np.zeros((types + 2, len(self.relation_types) + 1, types + 2), dtype=np.uint8)
+            for bit, mask in enumerate(masks):
+                table |= np.broadcast_to(mask, table.shape).astype(np.uint8) << bit
+            self._problem_tables[key] = table
+        return self._problem_tables[key]
+
+    def edge_checks(self, source_codes, relation_codes, target_codes, key):
+        # Check edges given the type codes of their end nodes and their relation codes.
+        # Returns (mask, column, problem) tuples.
+        bits = self.problem_table(key)[source_codes + 1, relation_codes, target_codes + 1]
+        return [((bits >> bit) & 1 == 1, column, problem.format(excluded=EXCLUDED_TYPE[key],
+                                                               relations=", ".join(self.relation_types)))
+                for bit, (column, problem) in enumerate(EDGE_PROBLEMS)]
+
+    def validate(self, store):
+        # Check every node and relation of a graph store and return a report of all violations,
+        # kept in the cache of the store until the graph changes
+        return store.cached(("metamodel_report",), lambda: self._validate(store))
+
+    def _validate(self, store):
+        frames = []
+        undeclared = [node_type for node_type in store.names_by_type if node_type not in self.type_code]
+        if undeclared:
+            rows = [row for row, node in enumerate(store.nodes) if node["type"] not in self.type_code]
+            frames.append(pd.DataFrame({
+                "Section": "nodes",
+                "Row": np.array(rows, dtype=np.intp) + 1,
+                "Element": [store.nodes[row]["name"] for row in rows],
+                "Problem": [f"The node type {store.nodes[row]['type']} is not declared in the metamodel"
+                            for row in rows],
+            }))
+
+        # One pass over the edges computing the flat index of (source, relation, target) in the problem table
+        get_name, get_relation = self.name_codes(store).get, self.relation_code.get
+        types, relations = len(self.node_types), len(self.relation_types)
+        for key in PRODUCT_KEYS:
+            edges = store.edges[key]
+            flat = np.fromiter(
+                (((get_name(edge["source"], -1) + 1) * (relations + 1) + get_relation(edge["type"], relations))
+                 * (types + 2) + get_name(edge["target"], -1) + 1 for edge in edges),
+                dtype=np.intp, count=len(edges))
+            bits = self.problem_table(key).ravel()[flat]
+            for bit, (_, problem) in enumerate(EDGE_PROBLEMS):
+                rows = np.flatnonzero((bits >> bit) & 1)
+                if len(rows):
+                    frames.append(pd.DataFrame({
+                        "Section": key,
+                        "Row": rows + 1,
+                        "Element": [f"{edges[row]['source']} {edges[row]['type']} {edges[row]['target']}"
+                                    for row in rows],
+                        "Problem": problem.format(excluded=EXCLUDED_TYPE[key], relations=", ".join(self.relation_types)),
+                    }))
+
+        if not frames:
+            return pd.DataFrame({column: [] for column in REPORT_COLUMNS})
+        return pd.concat(frames, ignore_index=True).sort_values(["Section", "Row"], kind="stable", ignore_index=True)
+
+
+# Metamodel of the application, compiled once on import
+METAMODEL = Metamodel(metamodel_dict)
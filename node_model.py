@@ -0,0 +1,268 @@
+# Compact nodes of the graph store. A node keeps its name, its interned type and its id in slots, a UUID id as its
+# 16 bytes, and its submodel attributes as numbers in a float array, so analyses read the numbers without parsing
+# text. A number keeps its count of decimals, so it is written back exactly as it was entered. The names of the
+# submodels and attributes are kept once for all nodes sharing them. Nodes are read-only mappings in the layout of
+# the graph JSON file, so code reading node dictionaries works with them unchanged.
+import re  # Import re to recognize the numbers among the attribute texts
+import sys  # Import sys to intern the node types and attribute names
+from array import array  # Import array for the numbers of the attributes
+from collections.abc import Mapping  # Import Mapping for the dictionary interface of the nodes
+from operator import itemgetter  # Import itemgetter to split the parsed attributes
+
+# Submodels and attributes of a node as entered in "Create Nodes"
+NODE_SUBMODELS = {
+    "Engineering": ["Cost", "Target Values", "OEE", "MTTR", "MTTF"],
+    "Electrical": ["current", "voltage", "power", "resistance"],
+    "Sustainable": ["CO2 footprint", "energy consumption", "reusability", "repairability"],
+}
+
+# Keys of a node with a slot of their own, any other keys are kept in a dictionary
+NODE_KEYS = ("name", "submodels", "id", "type")
+_NODE_KEY_SET = frozenset(NODE_KEYS)
+
+# Attribute texts stored as numbers: decimal numbers without exponent, plus sign or leading zeros and with up to
+# 15 digits, which are always read back exactly from their number and count of decimals
+_match_decimal = re.compile(r"(-?)(?:0|[1-9][0-9]*)(?:(\.)[0-9]+)?").fullmatch
+
+# Format strings of the numbers by their count of decimals
+_FORMATS = [f"%.{decimals}f" for decimals in range(16)]
+
+# Number of attribute texts whose number and format are remembered, attribute values repeat a lot
+PARSED_CACHE_SIZE = 1 << 16
+
+
+class _Layout:
+    # Submodel and attribute names of a node in their order, shared by all nodes with the same names
+    __slots__ = ("views", "positions")
+
+    def __init__(self, views):
+        self.views = views
+        self.positions = {(view, attribute): position for position, (view, attribute) in
+                          enumerate((view, attribute) for view, attributes in views for attribute in attributes)}
+
+
+# Separator of the attribute texts formatted in one go, never part of a formatted number
+_SEPARATOR = "\x1f"
+
+# (number, format) of an attribute value that is no number
+_NO_NUMBER = (float("nan"), None)
+_first, _second = itemgetter(0), itemgetter(1)
+
+
+class _Formats:
+    # Format strings of the attributes of a node in the order of its layout, shared by all nodes with the same
+    # formats. Without other texts than the empty one all attributes are written with a single template.
+    __slots__ = ("formats", "template")
+
+    def __init__(self, formats):
+        self.formats = formats
+        self.template = None if None in formats else _SEPARATOR.join(
+            number_format or "%.0s" for number_format in formats)
+
+
+# Layouts by their ((submodel, ...), ((attribute, ...), ...)) tuple and formats by their tuple, shared by the nodes
+_layouts = {}
+_formats = {}
+
+# (number, format) of the recently parsed attribute texts
+_parsed = {}
+
+
+def _layout(submodels):
+    key = (tuple(submodels), tuple(map(tuple, submodels.values())))
+    layout = _layouts.get(key)
+    if layout is None:
+        views = tuple((sys.intern(view), tuple(sys.intern(attribute) for attribute in attributes))
+                      for view, attributes in zip(*key))
+        layout = _layouts[key] = _Layout(views)
+    return layout
+
+
+def _parse(text):
+    # Return the number and the format of an attribute text. Numbers get the format string writing them back,
+    # the empty text the number NaN and the format "" and any other text NaN and None.
+    parsed = _parsed.get(text)
+    if parsed is None:
+        match = _match_decimal(text)
+        point = match.start(2) if match is not None else -1
+        if match is not None and len(text) - match.end(1) - (point >= 0) <= 15:
+            parsed = (float(text), _FORMATS[len(text) - point - 1 if point >= 0 else 0])
+        else:
+            parsed = (_NO_NUMBER[0], "" if text == "" else None)
+        if len(_parsed) >= PARSED_CACHE_SIZE:
+            _parsed.clear()
+        _parsed[text] = parsed
+    return parsed
+
+
+def id_key(node_id):
+    # Key of a node id in the node records and the id index: the 16 bytes of an id in the text form of a UUID,
+    # any other id as it is
+    if type(node_id) is str and len(node_id) == 36 and node_id == node_id.lower():
+        try:
+            uid = bytes.fromhex(node_id.replace("-", ""))
+        except ValueError:
+            return node_id
+        if len(uid) == 16 and node_id[8] == node_id[13] == node_id[18] == node_id[23] == "-":
+            return uid
+    return node_id
+
+
+def _uuid_text(uid):
+    digits = uid.hex()
+    return f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}"
+
+
+class NodeRecord(Mapping):
+    # One node of the graph. The node is never changed after it is created, edits replace it with a new record.
+    __slots__ = ("name", "type", "uid", "layout", "numbers", "formats", "texts", "extra")
+
+    def __init__(self, name, node_type, node_id, submodels=None, extra=None):
+        self.name = name
+        self.type = sys.intern(node_type) if type(node_type) is str else node_type
+        self.uid = id_key(node_id)
+        self.extra = dict(extra) if extra else None
+        # Numbers and formats of the attributes in the order of the layout. Texts that are no number have the
+        # format None and are kept in "texts" by their position, as are values that are no text.
+        self.layout = None
+        self.numbers = None
+        self.formats = None
+        self.texts = None
+        if submodels is None:
+            return
+        if not isinstance(submodels, dict) or not all(isinstance(values, dict) for values in submodels.values()):
+            # Submodels in another layout are kept as they are
+            self.extra = {**(self.extra or {}), "submodels": submodels}
+            return
+
+        self.layout = _layout(submodels)
+        parsed = [(_parsed.get(value) or _parse(value)) if type(value) is str else _NO_NUMBER
+                  for view_values in submodels.values() for value in view_values.values()]
+        self.numbers = array("d", map(_first, parsed))
+        formats = tuple(map(_second, parsed))
+        self.formats = _formats.get(formats) or _formats.setdefault(formats, _Formats(formats))
+        self.texts = None
+        if self.formats.template is None:
+            values = [value for view_values in submodels.values() for value in view_values.values()]
+            self.texts = {position: values[position] for position, number_format in enumerate(formats)
+                          if number_format is None}
+
+    @classmethod
+    def from_dict(cls, node):
+        # Create a record from a node dictionary in the layout of the graph JSON file
+        extra = {} if _NODE_KEY_SET.issuperset(node) else {key: value for key, value in node.items()
+                                                             if key not in _NODE_KEY_SET}
+        if node.get("submodels", 0) is None:
+            extra["submodels"] = None
+        return cls(node["name"], node["type"], node["id"], node.get("submodels"), extra)
+
+    @property
+    def id(self):
+        return _uuid_text(self.uid) if type(self.uid) is bytes else self.uid
+
+    # ----- Attributes -----
+
+    def number(self, view, attribute):
+        # Return an attribute as a number, or None if the node has no such attribute or it is not a number
+        position = self.layout.positions.get((view, attribute)) if self.layout is not None else None
+        if position is None:
+            return None
+        if self.formats.formats[position]:
+            return self.numbers[position]
+        value = self.texts.get(position) if self.texts is not None else None
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+        return None
+
+    def _values(self):
+        # Attribute values in the order of the layout, numbers written back as text
+        if self.formats.template is not None:
+            return (self.formats.template % tuple(self.numbers)).split(_SEPARATOR) if self.numbers else []
+        texts = self.texts
+        return [number_format % number if number_format else "" if number_format == "" else texts[position]
+                for position, (number_format, number) in enumerate(zip(self.formats.formats, self.numbers))]
+
+    def submodel(self, view):
+        # Return the attributes of one submodel as a dictionary, raises KeyError for a missing submodel
+        values = iter(self._values() if self.layout is not None else ())
+        for name, attributes in self.layout.views if self.layout is not None else ():
+            submodel = dict(zip(attributes, values))
+            if name == view:
+                return submodel
+        raise KeyError(view)
+
+    def submodels(self):
+        # Return all submodels as dictionaries of attribute texts, as in the graph JSON file
+        if self.layout is None:
+            return {}
+        values = iter(self._values())
+        return {view: dict(zip(attributes, values)) for view, attributes in self.layout.views}
+
+    def updated(self, name, node_type, submodels):
+        # Return a copy of the node with a new name and type and the given submodel attributes replaced
+        merged = self.submodels() if self.layout is not None else {}
+        for view, values in submodels.items():
+            merged[view] = {**merged.get(view, {}), **values}
+        return NodeRecord(name, node_type, self.id, merged, self.extra)
+
+    def to_dict(self):
+        # Return the node as a dictionary in the layout of the graph JSON file
+        node = {"name": self.name}
+        if self.layout is not None:
+            node["submodels"] = self.submodels()
+        node["id"] = self.id
+        node["type"] = self.type
+        if self.extra:
+            node.update(self.extra)
+        return node
+
+    # ----- Mapping -----
+
+    def __getitem__(self, key):
+        if key == "name":
+            return self.name
+        if key == "type":
+            return self.type
+        if key == "id":
+            return self.id
+        if key == "submodels" and self.layout is not None:
+            return self.submodels()
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return (key in ("name", "type", "id") or (key == "submodels" and self.layout is not None)
+                or (self.extra is not None and key in self.extra))
+
+    def __iter__(self):
+        yield "name"
+        if self.layout is not None:
+            yield "submodels"
+        yield "id"
+        yield "type"
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return 3 + (self.layout is not None) + len(self.extra or ())
+
+    def __repr__(self):
+        return f"NodeRecord({self.to_dict()!r})"
+
+
+def as_node(node):
+    # Return a node dictionary as a record, records are returned as they are
+    return node if type(node) is NodeRecord else NodeRecord.from_dict(node)
+
+
+def node_dicts(nodes):
+    # Return nodes as dictionaries, e.g. to show them with st.json
+    return [node.to_dict() if type(node) is NodeRecord else node for node in nodes]
+
+
+def json_default(value):
+    # Encode node records as their dictionaries, for the default argument of the JSON encoder
+    if type(value) is NodeRecord:
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
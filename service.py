@@ -0,0 +1,270 @@
+# Local HTTP service answering graph analyses, import and export without the user interface, e.g.
+#   python service.py --port 8600
+#   curl --data-binary @line.json http://localhost:8600/graphs                      -> {"hash": "...", ...}
+#   curl "http://localhost:8600/graphs/<hash>/analysis/impact?node=Robot"
+# Requests are handled asynchronously by Tornado, the analyses run in a process pool. Uploaded graphs are kept
+# in memory by the content hash of the file, every worker process keeps its own parsed copy with its indexes.
+# Requests send only the hash to a worker, the file itself only goes to a worker that has not parsed it yet.
+import argparse  # Import argparse for the command line options
+import hashlib  # Import hashlib for the content hashes of the graphs
+import inspect  # Import inspect to check the options of an analysis
+import io  # Import io for in-memory files
+import json  # Import JSON library for the responses
+import os  # Import os to size the worker pool
+import zipfile  # Import zipfile for the errors of damaged columnar graph archives
+from collections import OrderedDict  # Import OrderedDict for the least recently used graph caches
+from concurrent.futures import ProcessPoolExecutor  # Import the process pool running the analyses
+
+import tornado.ioloop  # Import the Tornado event loop
+import tornado.web  # Import the Tornado request handlers
+
+from analysis import ANALYSES, run_analysis  # Import the analyses
+from graph_io import (read_json_graph, read_parquet_graph, write_parquet_graph, iter_graph_json,  # Import the graph file readers and writers
+                      iter_ppr_json, write_chunks)
+from graph_store import GraphStore  # Import the graph store
+
+# Number of uploaded graph files kept by the service and of parsed graphs kept by each worker process
+GRAPH_CACHE_SIZE = 32
+WORKER_CACHE_SIZE = 8
+
+# Options of the analyses that are integers, all other query arguments are passed as text
+INTEGER_OPTIONS = ("k", "depth")
+
+# Options of the analyses naming a node of the graph
+NODE_OPTIONS = ("node", "source", "target")
+
+# Export formats: name -> (file extension, content type)
+EXPORT_FORMATS = {
+    "json": ("json", "application/json"),
+    "ppr": ("json", "application/json"),
+    "parquet": ("zip", "application/zip"),
+}
+
+# Parsed graphs of a worker process by content hash
+_worker_stores = OrderedDict()
+
+
+class InvalidRequest(Exception):
+    # A graph file or analysis option the service cannot use, answered with 400 Bad Request
+    pass
+
+
+class GraphNotParsed(Exception):
+    # A worker process without a parsed copy of a graph was sent only its hash, the graph file follows on the retry
+    pass
+
+
+def content_hash(data):
+    # Hash of an uploaded graph file
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def parse_graph(data):
+    # Read a graph JSON file or a columnar graph archive from bytes into a graph store
+    store = GraphStore()
+    try:
+        if data[:2] == b"PK":
+            read_parquet_graph(io.BytesIO(data), store)
+        else:
+            read_json_graph(io.BytesIO(data), store)
+    except (ValueError, KeyError, zipfile.BadZipFile) as error:
+        raise InvalidRequest(f"Invalid graph file: {error}") from error
+    return store
+
+
+def _worker_store(graph_hash, data):
+    # Return the parsed graph of a worker process, parsing the file only on the first request for it. Without the
+    # file (data None) a graph the worker has not parsed raises GraphNotParsed.
+    store = _worker_stores.get(graph_hash)
+    if store is None:
+        if data is None:
+            raise GraphNotParsed(graph_hash)
+        store = parse_graph(data)
+        _worker_stores[graph_hash] = store
+        if len(_worker_stores) > WORKER_CACHE_SIZE:
+            _worker_stores.popitem(last=False)
+    else:
+        _worker_stores.move_to_end(graph_hash)
+    return store
+
+
+def _describe(graph_hash, data):
+    # Parse a graph and return its size, executed in a worker process
+    store = _worker_store(graph_hash, data)
+    return {
+        "hash": graph_hash,
+        "nodes": len(store.nodes),
+        "product 1": len(store.edges["product 1"]),
+        "product 2": len(store.edges["product 2"]),
+    }
+
+
+def _analyze(graph_hash, data, name, options):
+    # Run an analysis on a graph, executed in a worker process. Options the analysis does not take, unknown nodes
+    # and option values the analysis rejects are invalid requests, any other error is an error of the service.
+    store = _worker_store(graph_hash, data)
+    try:
+        inspect.signature(ANALYSES[name]).bind(store, **options)
+    except TypeError as error:
+        raise InvalidRequest(str(error)) from error
+    for key in NODE_OPTIONS:
+        if key in options and store.node(options[key]) is None:
+            raise InvalidRequest(f"Unknown node {options[key]!r}")
+    try:
+        return run_analysis(name, store, **options)
+    except ValueError as error:
+        raise InvalidRequest(str(error)) from error
+
+
+def _export(graph_hash, data, export_format):
+    # Write a graph in one of the export formats, executed in a worker process
+    store = _worker_store(graph_hash, data)
+    output = io.BytesIO()
+    if export_format == "parquet":
+        write_parquet_graph(store, output)
+    elif export_format == "ppr":
+        write_chunks(iter_ppr_json(store.graph_dict()), output)
+    else:
+        write_chunks(iter_graph_json(store.graph_dict()), output)
+    return output.getvalue()
+
+
+class GraphService:
+    # Uploaded graph files by content hash and the worker pool running the analyses
+    def __init__(self, workers):
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.graphs = OrderedDict()
+
+    def graph(self, graph_hash):
+        data = self.graphs.get(graph_hash)
+        if data is None:
+            raise tornado.web.HTTPError(404, reason=f"Unknown graph {graph_hash}")
+        self.graphs.move_to_end(graph_hash)
+        return data
+
+    def add(self, data):
+        graph_hash = content_hash(data)
+        self.graphs[graph_hash] = data
+        self.graphs.move_to_end(graph_hash)
+        if len(self.graphs) > GRAPH_CACHE_SIZE:
+            self.graphs.popitem(last=False)
+        return graph_hash
+
+    async def run(self, function, graph_hash, *args, data=None):
+        # Run a function on a graph in the worker pool. Without data only the hash is sent, and the graph file is
+        # sent again only to a worker that has not parsed the graph yet.
+        loop = tornado.ioloop.IOLoop.current()
+        try:
+            return await loop.run_in_executor(self.executor, function, graph_hash, data, *args)
+        except GraphNotParsed:
+            return await loop.run_in_executor(self.executor, function, graph_hash, self.graph(graph_hash), *args)
+
+
+class ServiceHandler(tornado.web.RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    def write_json(self, value, status=200):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(value))
+
+    def write_error(self, status_code, **kwargs):
+        self.write_json({"error": self._reason}, status_code)
+
+    async def in_pool(self, function, graph_hash, *args, data=None):
+        # Run a function in the worker pool, reporting invalid graphs and options as bad requests
+        try:
+            return await self.service.run(function, graph_hash, *args, data=data)
+        except InvalidRequest as error:
+            raise tornado.web.HTTPError(400, reason=str(error))
+
+
+class HealthHandler(ServiceHandler):
+    def get(self):
+        self.write_json({"status": "ok", "graphs": len(self.service.graphs)})
+
+
+class GraphsHandler(ServiceHandler):
+    def get(self):
+        # List the hashes of the loaded graphs
+        self.write_json({"graphs": list(self.service.graphs)})
+
+    async def post(self):
+        # Load a graph JSON file or columnar graph archive sent as the request body
+        data = self.request.body
+        if not data:
+            raise tornado.web.HTTPError(400, reason="The request body has to contain a graph file")
+        graph_hash = content_hash(data)
+        description = await self.in_pool(_describe, graph_hash, data=data)
+        self.service.add(data)
+        self.write_json(description, 201)
+
+
+class GraphHandler(ServiceHandler):
+    async def get(self, graph_hash):
+        self.service.graph(graph_hash)
+        self.write_json(await self.in_pool(_describe, graph_hash))
+
+    def delete(self, graph_hash):
+        self.service.graph(graph_hash)
+        del self.service.graphs[graph_hash]
+        self.set_status(204)
+        self.finish()
+
+
+class AnalysisHandler(ServiceHandler):
+    async def get(self, graph_hash, name):
+        # Run an analysis, the query arguments are its options
+        if name not in ANALYSES:
+            raise tornado.web.HTTPError(404, reason=f"Unknown analysis {name}")
+        self.service.graph(graph_hash)
+        options = {key: self.get_query_argument(key) for key in self.request.query_arguments}
+        try:
+            options.update({key: int(options[key]) for key in INTEGER_OPTIONS if key in options})
+        except ValueError as error:
+            raise tornado.web.HTTPError(400, reason=str(error))
+        self.write_json(await self.in_pool(_analyze, graph_hash, name, options))
+
+
+class ExportHandler(ServiceHandler):
+    async def get(self, graph_hash):
+        # Export a graph as graph JSON, PPR JSON or columnar archive
+        export_format = self.get_query_argument("format", "json")
+        if export_format not in EXPORT_FORMATS:
+            raise tornado.web.HTTPError(400, reason=f"Unknown format {export_format}")
+        self.service.graph(graph_hash)
+        extension, content_type = EXPORT_FORMATS[export_format]
+        output = await self.in_pool(_export, graph_hash, export_format)
+        self.set_header("Content-Type", content_type)
+        self.set_header("Content-Disposition", f'attachment; filename="{graph_hash}.{extension}"')
+        self.finish(output)
+
+
+def make_app(workers):
+    service = GraphService(workers)
+    arguments = {"service": service}
+    return tornado.web.Application([
+        (r"/health", HealthHandler, arguments),
+        (r"/graphs", GraphsHandler, arguments),
+        (r"/graphs/([0-9a-f]+)", GraphHandler, arguments),
+        (r"/graphs/([0-9a-f]+)/analysis/(\w+)", AnalysisHandler, arguments),
+        (r"/graphs/([0-9a-f]+)/export", ExportHandler, arguments),
+    ], max_body_size=1 << 30)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the graph analyses over HTTP on this machine.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8600, help="port to listen on (default: 8600)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    args = parser.parse_args(argv)
+
+    app = make_app(args.workers)
+    app.listen(args.port, address=args.host)
+    print(f"Serving graph analyses on http://{args.host}:{args.port}", flush=True)
+    tornado.ioloop.IOLoop.current().start()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+# Persistent graph storage in an SQLite database. Every saved graph has a name, its nodes, submodel attributes
+# and edges are kept in indexed tables so single nodes, types and relations can be read without loading it.
+import json  # Import JSON library for values without a column of their own
+import os  # Import os for the database path
+import sqlite3  # Import SQLite for the database
+from contextlib import closing  # Import closing to release the connections
+from datetime import datetime, timezone  # Import datetime for the time stamp of a save
+from graph_store import GraphStore, PRODUCT_KEYS  # Import the graph store
+
+# Database file, one file holds any number of named graphs. It is kept in the home directory of the user so it does
+# not depend on the working directory, PPR_DATABASE sets another path.
+DATABASE_FILE = os.environ.get("PPR_DATABASE", os.path.join(os.path.expanduser("~"), ".ppr_graphs.sqlite"))
+
+# Keys stored in their own columns, any other keys of a node or edge go to the "extra" JSON column
+NODE_KEYS = ("id", "name", "type", "submodels")
+EDGE_KEYS = ("id", "source", "target", "type")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS graphs (
+    name TEXT PRIMARY KEY,
+    saved_at TEXT NOT NULL,
+    nodes INTEGER NOT NULL,
+    edges INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    row INTEGER PRIMARY KEY,
+    graph TEXT NOT NULL,
+    id TEXT,
+    name TEXT,
+    type TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS nodes_id ON nodes (graph, id);
+CREATE INDEX IF NOT EXISTS nodes_name ON nodes (graph, name);
+CREATE INDEX IF NOT EXISTS nodes_type ON nodes (graph, type);
+CREATE TABLE IF NOT EXISTS attributes (
+    node INTEGER NOT NULL,
+    submodel TEXT NOT NULL,
+    attribute TEXT,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS attributes_node ON attributes (node);
+CREATE INDEX IF NOT EXISTS attributes_name ON attributes (submodel, attribute);
+CREATE TABLE IF NOT EXISTS edges (
+    row INTEGER PRIMARY KEY,
+    graph TEXT NOT NULL,
+    product TEXT NOT NULL,
+    id TEXT,
+    source TEXT,
+    target TEXT,
+    type TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS edges_id ON edges (graph, id);
+CREATE INDEX IF NOT EXISTS edges_source ON edges (graph, product, source);
+CREATE INDEX IF NOT EXISTS edges_target ON edges (graph, product, target);
+"""
+
+
+def _extra_to_json(element, keys):
+    # Keep keys without a column of their own, such as "ui_data", as JSON text
+    extra = {key: value for key, value in element.items() if key not in keys}
+    return json.dumps(extra) if extra else None
+
+
+class SQLiteGraphStore:
+    # Named graphs in an SQLite database. Connections are opened per operation, so the store can be shared
+    # between the threads of the Streamlit server.
+    def __init__(self, path=None):
+        self.path = path or DATABASE_FILE
+        with closing(self._connect()) as connection:
+            connection.executescript(SCHEMA)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    # ----- Saving and loading -----
+
+    def save(self, name, store):
+        # Save the graph of a store under the given name, replacing a graph saved under the same name
+        with closing(self._connect()) as connection, connection:
+            self._delete(connection, name)
+            first_row = connection.execute("SELECT COALESCE(MAX(row), 0) + 1 FROM nodes").fetchone()[0]
+
+            # Submodels in another layout than submodel -> attribute -> value are kept in the extra column of the node
+            node_rows = []
+            attribute_rows = []
+            for row, node in enumerate(store.nodes, start=first_row):
+                node_rows.append((row, name, node.id, node.name, node.type,
+                                  _extra_to_json(node.extra or {}, ())))
+                for submodel, values in node.submodels().items():
+                    if not values:
+                        # Keep empty submodels with a row without attribute
+                        attribute_rows.append((row, submodel, None, None))
+                    for attribute, value in values.items():
+                        attribute_rows.append((row, submodel, attribute, json.dumps(value)))
+            connection.executemany("INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?)", node_rows)
+            connection.executemany("INSERT INTO attributes VALUES (?, ?, ?, ?)", attribute_rows)
+
+            edge_total = 0
+            for key in PRODUCT_KEYS:
+                edges = store.edges[key]
+                connection.executemany(
+                    "INSERT INTO edges (graph, product, id, source, target, type, extra) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((name, key, edge.get("id"), edge.get("source"), edge.get("target"), edge.get("type"),
+                      _extra_to_json(edge, EDGE_KEYS)) for edge in edges))
+                edge_total += len(edges)
+
+            connection.execute("INSERT INTO graphs VALUES (?, ?, ?, ?)",
+                               (name, datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                                len(node_rows), edge_total))
+
+    def load(self, name, store=None):
+        # Load a saved graph into a new or the given graph store
+        with closing(self._connect()) as connection:
+            if connection.execute("SELECT 1 FROM graphs WHERE name = ?", (name,)).fetchone() is None:
+                raise KeyError(f"There is no graph named {name!r} in the database")
+            nodes = self._nodes(connection, "WHERE graph = ? ORDER BY row", (name,), whole_graph=name)
+            edges = {key: self._edges(connection, "WHERE graph = ? AND product = ? ORDER BY row", (name, key))
+                     for key in PRODUCT_KEYS}
+
+        store = store if store is not None else GraphStore()
+        store.load(nodes, edges["product 1"], edges["product 2"])
+        return store
+
+    def delete(self, name):
+        # Remove a saved graph
+        with closing(self._connect()) as connection, connection:
+            self._delete(connection, name)
+
+    def _delete(self, connection, name):
+        connection.execute("DELETE FROM attributes WHERE node IN (SELECT row FROM nodes WHERE graph = ?)", (name,))
+        connection.execute("DELETE FROM nodes WHERE graph = ?", (name,))
+        connection.execute("DELETE FROM edges WHERE graph = ?", (name,))
+        connection.execute("DELETE FROM graphs WHERE name = ?", (name,))
+
+    # ----- Queries reading only the rows they need -----
+
+    def graphs(self):
+        # Return name, time of saving and size of every saved graph
+        with closing(self._connect()) as connection:
+            rows = connection.execute("SELECT name, saved_at, nodes, edges FROM graphs ORDER BY name").fetchall()
+        return [{"name": name, "saved_at": saved_at, "nodes": nodes, "edges": edges}
+                for name, saved_at, nodes, edges in rows]
+
+    def count_by_type(self, name):
+        # Return the number of nodes per type of a saved graph
+        with closing(self._connect()) as connection:
+            return dict(connection.execute("SELECT type, COUNT(*) FROM nodes WHERE graph = ? GROUP BY type",
+                                           (name,)).fetchall())
+
+    def node(self, name, node_name):
+        # Return the first node with the given name or None
+        with closing(self._connect()) as connection:
+            nodes = self._nodes(connection, "WHERE graph = ? AND name = ? ORDER BY row LIMIT 1", (name, node_name))
+        return nodes[0] if nodes else None
+
+    def nodes(self, name, node_type=None, limit=100, offset=0):
+        # Return a page of the nodes of a saved graph, optionally of one type only
+        with closing(self._connect()) as connection:
+            if node_type is None:
+                return self._nodes(connection, "WHERE graph = ? ORDER BY row LIMIT ? OFFSET ?",
+                                   (name, limit, offset))
+            return self._nodes(connection, "WHERE graph = ? AND type = ? ORDER BY row LIMIT ? OFFSET ?",
+                               (name, node_type, limit, offset))
+
+    def edges(self, name, key, source=None, target=None, limit=100, offset=0):
+        # Return a page of the edges of a product, optionally only those starting or ending at a node
+        conditions = ["graph = ?", "product = ?"]
+        parameters = [name, key]
+        if source is not None:
+            conditions.append("source = ?")
+            parameters.append(source)
+        if target is not None:
+            conditions.append("target = ?")
+            parameters.append(target)
+        with closing(self._connect()) as connection:
+            return self._edges(connection, f"WHERE {' AND '.join(conditions)} ORDER BY row LIMIT ? OFFSET ?",
+                               (*parameters, limit, offset))
+
+    def _nodes(self, connection, where, parameters, whole_graph=None):
+        # Read nodes and their submodel attributes in the layout of the graph JSON file
+        rows = connection.execute(f"SELECT row, id, name, type, extra FROM nodes {where}", parameters).fetchall()
+        nodes = {}
+        for row, node_id, node_name, node_type, extra in rows:
+            nodes[row] = {"name": node_name, "submodels": {}, "id": node_id, "type": node_type,
+                          **json.loads(extra or "{}")}
+        if not nodes:
+            return []
+
+        # Attributes of the selected rows only, in batches below the SQLite parameter limit
+        if whole_graph is not None:
+            batches = [("node IN (SELECT row FROM nodes WHERE graph = ?)", [whole_graph])]
+        else:
+            selected = list(nodes)
+            batches = [(f"node IN ({', '.join('?' * len(selected[start:start + 900]))})", selected[start:start + 900])
+                       for start in range(0, len(selected), 900)]
+        for condition, batch in batches:
+            attributes = connection.execute(
+                f"SELECT node, submodel, attribute, value FROM attributes WHERE {condition} ORDER BY rowid", batch)
+            for row, submodel, attribute, value in attributes:
+                values = nodes[row]["submodels"].setdefault(submodel, {})
+                if attribute is not None:
+                    values[attribute] = json.loads(value)
+        return list(nodes.values())
+
+    def _edges(self, connection, where, parameters):
+        rows = connection.execute(f"SELECT id, source, target, type, extra FROM edges {where}", parameters)
+        return [{"source": source, "target": target, "type": relation, "id": edge_id, **json.loads(extra or "{}")}
+                for edge_id, source, target, relation, extra in rows]
+
+
+# Database of the Streamlit server, shared by all sessions
+_database = None
+
+
+def get_database():
+    # Return the database at DATABASE_FILE, creating its tables on first use
+    global _database
+    if _database is None:
+        _database = SQLiteGraphStore()
+    return _database
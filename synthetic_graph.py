@@ -0,0 +1,107 @@
+# Generator of synthetic PPR graphs in the layout of the graph JSON file, for benchmarks and load tests, e.g.
+#   python synthetic_graph.py 100000 --output line.json
+# Every product line is a chain of process steps: an input product is "Input for" the first step, the steps are
+# "Connected to" each other, every step is "Executed by" one or two resources and the last step "Outputs" the
+# product of the line. Processes and resources are shared between the lines of both products.
+import argparse  # Import argparse for the command line options
+import random  # Import random for reproducible identifiers
+import sys  # Import sys for writing to stdout
+import uuid  # Import UUID library for the node and edge identifiers
+import numpy as np  # Import NumPy for the random structure
+from Model import metamodel_dict  # Import metamodel dictionary from Model module
+from graph_io import iter_graph_json, write_chunks  # Import the graph JSON writer
+from graph_store import PRODUCT_KEYS, PRODUCT_TYPE  # Import the product keys and types
+
+# Relation types of the generated edges, taken from the metamodel
+INPUT_FOR, OUTPUTS, EXECUTED_BY, CONNECTED_TO = metamodel_dict["edges"][:4]
+
+# Share of each node type in a generated graph
+TYPE_SHARES = {"Product 1": 0.05, "Product 2": 0.05, "Process": 0.5, "Resource": 0.4}
+
+# Number of process steps of a product line
+CHAIN_LENGTH = 5
+
+
+def synthetic_node(name, node_type, values, uid):
+    # Create a node with the submodels entered in "Create Nodes", filled with ten random values as text
+    cost, oee, mttr, mttf, current, voltage, co2, energy, reuse, repair = values
+    return {
+        "name": name,
+        "submodels": {
+            "Engineering": {"Cost": f"{cost * 1000:.2f}", "Target Values": "", "OEE": f"{oee * 100:.1f}",
+                            "MTTR": f"{mttr * 120:.0f}", "MTTF": f"{mttf * 10000:.0f}"},
+            "Electrical": {"current": f"{current * 32:.1f}", "voltage": f"{voltage * 400:.0f}",
+                           "power": f"{current * voltage * 12800:.0f}", "resistance": f"{voltage * 100:.1f}"},
+            "Sustainable": {"CO2 footprint": f"{co2 * 10:.3f}", "energy consumption": f"{energy * 500:.1f}",
+                            "reusability": f"{reuse * 100:.0f}", "repairability": f"{repair * 100:.0f}"},
+        },
+        "id": str(uid),
+        "type": node_type,
+    }
+
+
+def synthetic_graph(node_count, seed=0):
+    # Generate a graph dictionary with about node_count nodes. The same seed always gives the same graph.
+    rng = np.random.default_rng(seed)
+    bits = random.Random(seed)
+    uuids = iter(lambda: uuid.UUID(int=bits.getrandbits(128), version=4), None)
+
+    names = {}
+    nodes = []
+    for node_type, share in TYPE_SHARES.items():
+        count = max(1, round(node_count * share))
+        prefix = node_type.replace(" ", "")
+        names[node_type] = [f"{prefix} {number}" for number in range(count)]
+        values = rng.random((count, 10)).tolist()
+        nodes.extend(synthetic_node(name, node_type, row, next(uuids)) for name, row in zip(names[node_type], values))
+
+    def edge(source, relation, target):
+        return {"source": source, "target": target, "type": relation, "id": str(next(uuids))}
+
+    processes = names["Process"]
+    resources = names["Resource"]
+    edges = {key: [] for key in PRODUCT_KEYS}
+
+    # One or two different resources per process
+    resource_count = rng.integers(1, 3, size=len(processes)).tolist()
+    first = rng.integers(0, len(resources), size=len(processes))
+    second = (first + 1 + rng.integers(0, max(len(resources) - 1, 1), size=len(processes))) % len(resources)
+    executing = [[resources[a]] if count == 1 or a == b else [resources[a], resources[b]]
+                 for count, a, b in zip(resource_count, first.tolist(), second.tolist())]
+
+    # Split the processes into product lines, alternating between the products
+    order = rng.permutation(len(processes)).tolist()
+    for line, start in enumerate(range(0, len(processes), CHAIN_LENGTH)):
+        key = PRODUCT_KEYS[line % len(PRODUCT_KEYS)]
+        products = names[PRODUCT_TYPE[key]]
+        chain = [processes[index] for index in order[start:start + CHAIN_LENGTH]]
+        source_product, output_product = rng.integers(0, len(products), size=2)
+
+        edges[key].append(edge(products[source_product], INPUT_FOR, chain[0]))
+        for step, next_step in zip(chain, chain[1:]):
+            edges[key].append(edge(step, CONNECTED_TO, next_step))
+        for index in order[start:start + CHAIN_LENGTH]:
+            for resource in executing[index]:
+                edges[key].append(edge(processes[index], EXECUTED_BY, resource))
+        edges[key].append(edge(chain[-1], OUTPUTS, products[output_product]))
+
+    return {"nodes": nodes, **edges}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic PPR graph JSON file.")
+    parser.add_argument("nodes", type=int, help="number of nodes")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument("--output", help="output file, default is stdout")
+    args = parser.parse_args(argv)
+
+    graph_dict = synthetic_graph(args.nodes, args.seed)
+    if args.output:
+        with open(args.output, "wb") as fileobj:
+            write_chunks(iter_graph_json(graph_dict), fileobj)
+    else:
+        write_chunks(iter_graph_json(graph_dict), sys.stdout.buffer)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,43 @@
 import streamlit as st  # Import Streamlit library for building web applications
-import json  # Import JSON library for handling JSON data
-from Model import metamodel_dict  # Import metamodel dictionary from Model module
+from metamodel import METAMODEL  # Import the compiled metamodel of Model.metamodel_dict
 import uuid  # Import UUID library for generating unique identifiers
-import graphviz  # Import Graphviz for graph visualization
 from streamlit_agraph import agraph, Node, Edge, Config  # Import streamlit_agraph for rendering graph
-import networkx as nx  # Import NetworkX library for graph manipulation
+from graph_store import GraphStore, get_graph_store, set_graph_store  # Import the indexed graph store of the session
+import io  # Import io for in-memory export files
+import zipfile  # Import zipfile to detect broken columnar graph archives
+from graph_views import VIEWS, view_source  # Import the cached graph views
+from graph_render import show_graph  # Import server side or browser rendering of Graphviz graphs
+from graph_io import (read_json_graph, read_parquet_graph, write_parquet_graph, iter_graph_json,  # Import the graph file readers and writers
+                      iter_ppr_json, ppr_node, ppr_edge, write_chunks)
 from graph_functions import (output_nodes_and_edges, count_nodes, count_edges, density_graph,
-                             check_path, is_empty, is_directed, shortest_path, specific_node,
-                             specific_edge, product1_visual, product2_visual, resource_utilization1,
+                             check_path, is_empty, is_directed, shortest_path, shows_shortest_paths, weighted_route,
+                             specific_node, specific_edge, product1_visual, product2_visual, resource_utilization1,
                              resource_utilization2, recurring1, process_on_process1, input_product_on_process1,
                              process_on_process2, input_product_on_process2, recurring2)  # Import custom graph functions
 from networkx.algorithms.approximation import (all_pairs_node_connectivity, local_node_connectivity)  # Import algorithms for node connectivity
+from instrumentation import summary, prometheus_text, reset, METRICS_FILE  # Import the timing of the tabs and functions
+from sqlite_store import get_database  # Import the persistent graph database
+from graph_versions import get_version_history  # Import the snapshots of the session graph
+from bulk_import import read_table, node_columns, nodes_from_table, edges_from_table  # Import the bulk import of tables
+from node_model import node_dicts  # Import the conversion of node records to dictionaries for display
+
+# Function to show a compact summary of a graph
+def show_graph_summary(store):
+    nodes_col, p1_col, p2_col = st.columns(3)
+    nodes_col.metric("Nodes", len(store.nodes))
+    p1_col.metric("Product 1 relations", len(store.edges["product 1"]))
+    p2_col.metric("Product 2 relations", len(store.edges["product 2"]))
+    # Number of nodes per node type
+    st.write({node_type: len(names) for node_type, names in store.names_by_type.items()})
+
 
 # Function to upload an existing graph
 def upload_graph():
-    uploaded_graph = st.file_uploader("upload an existing graph", type="json")  # Upload JSON file
+    # Upload a JSON file or a columnar graph archive (zip of Parquet tables)
+    uploaded_graph = st.file_uploader("upload an existing graph", type=["json", "zip"])
     if uploaded_graph is not None:
-        uploaded_graph_dict = json.load(uploaded_graph)  # Load JSON data
-        uploaded_nodes = uploaded_graph_dict["nodes"]  # Extract nodes from the uploaded graph
-        uploaded_p1 = uploaded_graph_dict["product 1"]  # Extract product 1 edges
-        uploaded_p2 = uploaded_graph_dict["product 2"]  # Extract product 2 edges
-        st.json(uploaded_graph_dict, expanded=False)  # Display uploaded graph data
+        # Only show the size of the file, the graph itself is parsed when it is imported
+        st.write(f"{uploaded_graph.name} ({uploaded_graph.size / 1e6:.1f} MB) is ready to be imported")
     else:
         st.info("Please upload a graph if available")  # Inform user to upload a graph if not available
 
@@ -31,18 +48,63 @@ def upload_graph():
         type="primary"
     )
     if update_graph_button and uploaded_graph:
-        # Update session state with uploaded graph data
-        st.session_state["node_list"] = uploaded_nodes
-        st.session_state["p1_list"] = uploaded_p1
-        st.session_state["p2_list"] = uploaded_p2
-
-        # Create graph dictionary from uploaded graph data
-        graph_dict = {
-            "nodes": st.session_state["node_list"],
-            "product 1": st.session_state["p1_list"],
-            "product 2": st.session_state["p2_list"],
-        }
-        st.session_state["graph_dict"] = graph_dict  # Update session state with the new graph dictionary
+        # Progress bar updated after every batch of imported nodes and relations
+        progress_bar = st.progress(0.0, text="Importing graph")
+
+        def show_progress(fraction, counts):
+            progress_bar.progress(fraction, text=f"Imported {counts['nodes']} nodes, "
+                                                 f"{counts['product 1']} Product 1 relations and "
+                                                 f"{counts['product 2']} Product 2 relations")
+
+        # Read the uploaded graph into a new graph store, JSON files are streamed in batches
+        store = GraphStore()
+        uploaded_graph.seek(0)
+        try:
+            if uploaded_graph.name.endswith(".zip"):
+                show_progress(1.0, read_parquet_graph(uploaded_graph, store))
+            else:
+                read_json_graph(uploaded_graph, store, on_progress=show_progress)
+        except (ValueError, KeyError, zipfile.BadZipFile) as error:
+            st.error(f"The uploaded file is not a valid graph: {error}")
+        else:
+            # Replace the graph of the session with the uploaded graph
+            set_graph_store(store)
+            st.success("The graph has been imported")
+            show_graph_summary(store)
+            show_metamodel_report(store)
+
+
+def show_metamodel_report(store):
+    # Show the elements of a graph that break the metamodel, the report is cached until the graph changes
+    report = METAMODEL.validate(store)
+    if report.empty:
+        st.info("All nodes and relations follow the metamodel")
+        return
+    st.warning(f"{len(report)} nodes and relations do not follow the metamodel")
+    st.dataframe(report.head(1000), hide_index=True, use_container_width=True)
+    st.download_button("download the metamodel report", report.to_csv(index=False), file_name="metamodel_report.csv",
+                       mime="text/csv")
+
+def edit_history():
+    # Buttons undoing and redoing the edits of the graph, the edit is applied in a callback before the rerun
+    store = get_graph_store()
+
+    def undo():
+        st.session_state["edit_message"] = f"Undone: {get_graph_store().undo()}"
+
+    def redo():
+        st.session_state["edit_message"] = f"Redone: {get_graph_store().redo()}"
+
+    undo_col, redo_col = st.columns(2)
+    with undo_col:
+        st.button("Undo", key="undo_edit", on_click=undo, disabled=not store.can_undo(), use_container_width=True,
+                  help=f"Undo: {store.undo_history[-1][0]}" if store.can_undo() else None)
+    with redo_col:
+        st.button("Redo", key="redo_edit", on_click=redo, disabled=not store.can_redo(), use_container_width=True,
+                  help=f"Redo: {store.redo_history[-1][0]}" if store.can_redo() else None)
+    if "edit_message" in st.session_state:
+        st.caption(st.session_state.pop("edit_message"))
+
 
 # Function to create a new node
 def create_node():
@@ -94,12 +156,11 @@ def create_node():
             "id": str(uuid.uuid4()),
             "type": type_n
         }
-        st.session_state["node_list"].append(node_dict)  # Append node to session state node list
+        get_graph_store().add_node(node_dict)  # Append node to the graph store of the session
 
     # Input fields for node creation
     name_node = st.text_input("Type in the name of the node")
-    type_node = st.selectbox("Specify the type of the node",
-                             ["Product 1", "Product 2", "Process", "Resource"])
+    type_node = st.selectbox("Specify the type of the node", METAMODEL.node_types)
 
     # Tabs for different data categories
     engineering_node, electrical_node, sustainable_node = st.tabs(
@@ -144,31 +205,55 @@ def create_node():
     if save_node_button:
         save_node(name_node, views_data, type_node)  # Call save_node function to store the node
 
-    st.json(st.session_state["node_list"], expanded=False)  # Display the stored nodes
+    # Import many nodes at once from a table, e.g. an export of the ERP system
+    with st.expander("Import nodes from a table"):
+        st.caption("The table needs a name and a type column and may have an id column. Attributes are named as "
+                   "in the form, e.g. \"Cost\", or with their submodel, e.g. \"Engineering.Cost\".")
+        node_file = st.file_uploader("CSV or Parquet file", type=["csv", "parquet"], key="node_table_file")
+        if st.button("Import nodes", key="import_nodes_button", use_container_width=True,
+                     disabled=node_file is None):
+            store = get_graph_store()
+            try:
+                frame = read_table(node_file, node_file.name)
+                nodes, problems = nodes_from_table(frame, store)
+            except ValueError as error:
+                st.error(f"The table cannot be imported: {error}")
+            else:
+                if nodes:
+                    store.add_nodes(nodes, label=f"Import {len(nodes)} nodes from {node_file.name}")
+                st.success(f"{len(nodes)} nodes have been imported")
+                ignored = node_columns(frame)[1]
+                if ignored:
+                    st.info(f"Columns without a matching attribute were ignored: {', '.join(ignored)}")
+                if len(problems):
+                    st.warning(f"{problems['Row'].nunique()} rows were not imported")
+                    st.dataframe(problems, hide_index=True, use_container_width=True)
+
+    st.json(node_dicts(st.session_state["node_list"]), expanded=False)  # Display the stored nodes
 
 def update_node():
-    # Retrieve node and edge lists from session state
-    node_list = st.session_state["node_list"]
-    edge1_list = st.session_state["p1_list"]
-    edge2_list = st.session_state["p2_list"]
-    # Extract node names from the node list
-    node_names = [node["name"] for node in node_list]
+    # Retrieve the graph store and the node names from the session
+    store = get_graph_store()
+    node_names = store.names()
 
     try:
         # Select the node to update
         node_to_update = st.selectbox("Select node to update", options=node_names)
 
-        # Find the index of the selected node in the list
-        selected_index = node_names.index(node_to_update)
-        selected_node = node_list[selected_index]
+        # Look up the selected node by its name
+        selected_node = store.node(node_to_update)
+        if selected_node is None:
+            raise ValueError(node_to_update)
 
         # Display current node properties
         st.write(f"Current properties of node '{node_to_update}':")
-        st.write(selected_node)
+        st.json(selected_node.to_dict())
 
         # Allow users to update node properties
         custom_node_name = st.text_input("Enter new name for the node", value=selected_node["name"])
-        new_type = st.selectbox("Select new type for the node", options=["Product 1", "Product 2", "Process", "Resource"])
+        node_types = METAMODEL.node_types
+        new_type = st.selectbox("Select new type for the node", options=node_types,
+                                index=node_types.index(selected_node["type"]) if selected_node["type"] in node_types else 0)
 
         st.write("Attributes to Update")
         tab1, tab2, tab3 = st.tabs(["Engineering Data", "Electrical Data", "Sustainabilty Data"])
@@ -199,45 +284,36 @@ def update_node():
         update_node_button_key = f"update_node_button_{node_to_update}"
         update_node_button = st.button("Update Node", key=update_node_button_key, use_container_width=True, type="primary")
 
-        if update_node_button:
-            # Update node properties
-            node_list[selected_index]["name"] = custom_node_name
-            node_list[selected_index]["type"] = new_type
-            node_list[selected_index]["submodels"]["Engineering"]["Cost"] = cost
-            node_list[selected_index]["submodels"]["Engineering"]["Target Values"] = target_values
-            node_list[selected_index]["submodels"]["Engineering"]["MTTF"] = mttf_data
-            node_list[selected_index]["submodels"]["Engineering"]["OEE"] = oee_data
-            node_list[selected_index]["submodels"]["Engineering"]["MTTR"] = mttr_data
-            node_list[selected_index]["submodels"]["Electrical"]["current"] = current
-            node_list[selected_index]["submodels"]["Electrical"]["voltage"] = voltage
-            node_list[selected_index]["submodels"]["Electrical"]["power"] = power
-            node_list[selected_index]["submodels"]["Electrical"]["resistance"] = resistance
-            node_list[selected_index]["submodels"]["Sustainable"]["CO2 footprint"] = CO2_footprint
-            node_list[selected_index]["submodels"]["Sustainable"]["energy consumption"] = energy_consumption
-            node_list[selected_index]["submodels"]["Sustainable"]["reusability"] = reusability
-            node_list[selected_index]["submodels"]["Sustainable"]["repairability"] = repairability
-
-            # Update edges connected to the selected node
-            updated_edges1 = []
-            for edge in edge1_list:
-                if edge["source"] == node_to_update:
-                    edge["source"] = custom_node_name
-                if edge["target"] == node_to_update:
-                    edge["target"] = custom_node_name
-                updated_edges1.append(edge)
-
-            updated_edges2 = []
-            for edge in edge2_list:
-                if edge["source"] == node_to_update:
-                    edge["source"] = custom_node_name
-                if edge["target"] == node_to_update:
-                    edge["target"] = custom_node_name
-                updated_edges2.append(edge)
-
-            # Update session state with the modified node and edge lists
-            st.session_state["node_list"] = node_list
-            st.session_state["p1_list"] = updated_edges1
-            st.session_state["p2_list"] = updated_edges2
+        # Relations of the node the metamodel would no longer allow with the new type
+        type_problems = METAMODEL.node_type_problems(store, node_to_update, new_type)
+
+        if update_node_button and type_problems:
+            st.error("The node cannot get the type " + new_type + ":\n\n" +
+                     "\n".join(f"- {problem}" for problem in type_problems))
+
+        elif update_node_button:
+            # Update node properties, the store also renames the edges connected to the node
+            store.update_node(node_to_update, custom_node_name, new_type, {
+                "Engineering": {
+                    "Cost": cost,
+                    "Target Values": target_values,
+                    "MTTF": mttf_data,
+                    "OEE": oee_data,
+                    "MTTR": mttr_data,
+                },
+                "Electrical": {
+                    "current": current,
+                    "voltage": voltage,
+                    "power": power,
+                    "resistance": resistance,
+                },
+                "Sustainable": {
+                    "CO2 footprint": CO2_footprint,
+                    "energy consumption": energy_consumption,
+                    "reusability": reusability,
+                    "repairability": repairability,
+                },
+            })
 
             st.success(f"Node '{node_to_update}' and connected edges have been updated.")
 
@@ -250,9 +326,9 @@ def update_node():
 def delete_node():
     import time
     
-    # Extract the node list and node names
-    node_list = st.session_state["node_list"]
-    node_names = [node["name"] for node in node_list]
+    # Extract the node names from the graph store
+    store = get_graph_store()
+    node_names = store.names()
 
     # Dropdown to select the node to delete
     node_to_delete = st.selectbox("Select node to delete", options=node_names)
@@ -261,14 +337,8 @@ def delete_node():
     delete_node_button = st.button("Delete Node", key="delete_node_button", use_container_width=True, type="primary")
 
     if delete_node_button:
-        # Remove the selected node from the node list
-        st.session_state["node_list"] = [node for node in node_list if node["name"] != node_to_delete]
-
-        # Remove edges connected to the deleted node from the edge lists of Product 1 and Product 2
-        st.session_state["p1_list"] = [edge for edge in st.session_state["p1_list"]
-                                        if edge["source"] != node_to_delete and edge["target"] != node_to_delete]
-        st.session_state["p2_list"] = [edge for edge in st.session_state["p2_list"]
-                                        if edge["source"] != node_to_delete and edge["target"] != node_to_delete]
+        # Remove the selected node and the edges of Product 1 and Product 2 connected to it
+        store.delete_node(node_to_delete)
         
         # Store the name of the deleted node
         st.session_state["deleted_node"] = node_to_delete  
@@ -284,40 +354,35 @@ def delete_node():
 
 
 def create_relation():
+    # Retrieve the graph store of the session
+    store = get_graph_store()
+
     # Expander for Product 1
     with st.expander("Product 1"):
-        product_name = ["Product 2"]
-        
         # Function to save relations for Product 1
         def save_product1(node1, relation, node2):
-            product1_dict = {
-                "source": node1,
-                "target": node2,
-                "type": relation,
-                "id": str(uuid.uuid4()),
-            }
-            st.session_state["p1_list"].append(product1_dict)
+            # Check the relation against the metamodel before storing it
+            source_type, target_type = store.node_type(node1), store.node_type(node2)
+            if not METAMODEL.is_allowed(source_type, relation, target_type):
+                allowed = METAMODEL.allowed_relations(source_type, target_type)
+                st.error(f"The metamodel does not allow {relation} from a {source_type} to a {target_type}. " +
+                         (f"Allowed relations: {', '.join(allowed)}" if allowed
+                          else "No relation is allowed between these types."))
+                return
+            store.add_edge("product 1", node1, relation, node2)
         
         # UI rendering for Product 1
         node1_col, type1_col, relation_col, node2_col, type2_col = st.columns(5)
         
-        # Extracting node information
-        node_list = st.session_state["node_list"]
-        node_name_list = []
-        for node in node_list:
-            if node["type"] not in product_name:
-                node_name_list.append(node["name"])
+        # Extracting the names of the nodes that can take part in Product 1
+        node_name_list = store.names_for_product("product 1")
         
         # Callback functions for node selection
         def callback1():
-            for node in node_list:
-                if node["name"] == st.session_state["node1_select"]:
-                    st.session_state["selected_value"] = node["type"]
+            st.session_state["selected_value"] = store.node_type(st.session_state["node1_select"])
 
         def callback2():
-            for node in node_list:
-                if node["name"] == st.session_state["node2_select"]:
-                    st.session_state["selected_value"] = node["type"]
+            st.session_state["selected_value"] = store.node_type(st.session_state["node2_select"])
 
         # Dropdown for selecting first node of relation
         with node1_col:
@@ -337,7 +402,7 @@ def create_relation():
         # Dropdown for selecting relation
         with relation_col:
             # Extract relation options
-            relation_list = metamodel_dict["edges"]
+            relation_list = METAMODEL.relation_types
             # UI rendering
             relation_name = st.selectbox(
                 "Specify the relation",
@@ -378,38 +443,30 @@ def create_relation():
 
     # Expander for Product 2
     with st.expander("Product 2"):
-        product_name = ["Product 1"]
-        
         # Function to save relations for Product 2
         def save_product2(node1, relation, node2):
-            product2_dict = {
-                "source": node1,
-                "target": node2,
-                "type": relation,
-                "id": str(uuid.uuid4()),
-            }
-            st.session_state["p2_list"].append(product2_dict)
+            # Check the relation against the metamodel before storing it
+            source_type, target_type = store.node_type(node1), store.node_type(node2)
+            if not METAMODEL.is_allowed(source_type, relation, target_type):
+                allowed = METAMODEL.allowed_relations(source_type, target_type)
+                st.error(f"The metamodel does not allow {relation} from a {source_type} to a {target_type}. " +
+                         (f"Allowed relations: {', '.join(allowed)}" if allowed
+                          else "No relation is allowed between these types."))
+                return
+            store.add_edge("product 2", node1, relation, node2)
         
         # UI rendering for Product 2
         node1_col, type3_col, relation_col, node2_col, type4_col = st.columns(5)
         
-        # Extracting node information for Product 2
-        node_list = st.session_state["node_list"]
-        node_name_list = []
-        for node in node_list:
-            if node["type"] not in product_name:
-                node_name_list.append(node["name"])
+        # Extracting the names of the nodes that can take part in Product 2
+        node_name_list = store.names_for_product("product 2")
         
         # Callback functions for node selection for Product 2
         def callback3():
-            for node in node_list:
-                if node["name"] == st.session_state["node11_select"]:
-                    st.session_state["selected_value11"] = node["type"]
+            st.session_state["selected_value11"] = store.node_type(st.session_state["node11_select"])
         
         def callback4():
-            for node in node_list:
-                if node["name"] == st.session_state["node22_select"]:
-                    st.session_state["selected_value22"] = node["type"]
+            st.session_state["selected_value22"] = store.node_type(st.session_state["node22_select"])
 
         # Dropdown for selecting first node of relation for Product 2
         with node1_col:
@@ -417,7 +474,7 @@ def create_relation():
                 "select the first node",
                 options=node_name_list,
                 key="node11_select",
-                on_change=callback2
+                on_change=callback3
             )
 
         # Display type of first node for Product 2
@@ -429,7 +486,7 @@ def create_relation():
         # Dropdown for selecting relation for Product 2
         with relation_col:
             # Extract relation options
-            relation_list = metamodel_dict["edges"]
+            relation_list = METAMODEL.relation_types
             # UI rendering
             relation2_name = st.selectbox(
                 "Specify the relation",
@@ -442,7 +499,8 @@ def create_relation():
             node22_select = st.selectbox(
                 "select the second node",
                 options=node_name_list,
-                key="node22_select"  # can be added
+                key="node22_select",  # can be added
+                on_change=callback4
             )
         
         # Display type of second node for Product 2
@@ -463,17 +521,40 @@ def create_relation():
         product2_visual()
         
         # Display relation information for Product 2
-        st.write(f"{node1_select} is {relation2_name}  {node2_select}")
+        st.write(f"{node11_select} is {relation2_name}  {node22_select}")
 
         # Display stored relations for Product 2 in JSON format
         st.json(st.session_state["p2_list"], expanded=False)
 
+    # Import many relations at once from an edge list
+    with st.expander("Import relations from a table"):
+        st.caption("The table needs a source, a type (or relation) and a target column and may have an id column. "
+                   "Sources and targets are node names.")
+        edge_product = st.radio("Product", options=["Product 1", "Product 2"], horizontal=True,
+                                key="edge_table_product")
+        edge_file = st.file_uploader("CSV or Parquet file", type=["csv", "parquet"], key="edge_table_file")
+        if st.button("Import relations", key="import_relations_button", use_container_width=True,
+                     disabled=edge_file is None):
+            key = edge_product.lower()
+            try:
+                edges, problems = edges_from_table(read_table(edge_file, edge_file.name), store, key)
+            except ValueError as error:
+                st.error(f"The table cannot be imported: {error}")
+            else:
+                if edges:
+                    store.add_edges(key, edges, label=f"Import {len(edges)} {edge_product} relations from "
+                                                      f"{edge_file.name}")
+                st.success(f"{len(edges)} relations have been imported into {edge_product}")
+                if len(problems):
+                    st.warning(f"{problems['Row'].nunique()} rows were not imported")
+                    st.dataframe(problems, hide_index=True, use_container_width=True)
+
 
 def store_graph():
     # Expander to show individual lists
     with st.expander("show individual lists"):
         # Display node list in JSON format
-        st.json(st.session_state["node_list"], expanded=False)
+        st.json(node_dicts(st.session_state["node_list"]), expanded=False)
         # Display relations for Product 1 in JSON format
         st.json(st.session_state["p1_list"], expanded=False)
         # Display relations for Product 2 in JSON format
@@ -490,14 +571,99 @@ def store_graph():
     
     # Expander to show the entire graph data in JSON format
     with st.expander("Show graph JSON"):
-        st.json(st.session_state["graph_dict"])
+        st.json({**st.session_state["graph_dict"], "nodes": node_dicts(st.session_state["graph_dict"]["nodes"])})
+
+    # Save snapshots of the graph and switch between them
+    history = get_version_history()
+    store = get_graph_store()
+    st.subheader("Versions")
+    snapshot_col, switch_col = st.columns(2)
+    with snapshot_col:
+        snapshot_name = st.text_input("Name of the snapshot", key="snapshot_name",
+                                      help="Snapshots without a name are numbered")
+        snapshot_name = snapshot_name or f"version {len(history.snapshots) + 1}"
+        if st.button("Save snapshot", use_container_width=True, type="primary"):
+            history.save(snapshot_name, store)
+            st.success(f"The graph has been saved as snapshot {snapshot_name}")
+
+    with switch_col:
+        snapshot_names = list(history.snapshots)
+        selected_snapshot = st.selectbox("Snapshots", options=snapshot_names, key="snapshot_select",
+                                         index=snapshot_names.index(history.current)
+                                         if history.current in history.snapshots else 0)
+        switch_button_col, delete_snapshot_col = st.columns(2)
+        with switch_button_col:
+            if st.button("Switch", use_container_width=True, disabled=selected_snapshot is None):
+                set_graph_store(history.checkout(selected_snapshot))
+                st.rerun()
+        with delete_snapshot_col:
+            if st.button("Delete snapshot", use_container_width=True, disabled=selected_snapshot is None):
+                history.delete(selected_snapshot)
+                st.rerun()
+
+    if history.snapshots:
+        if not history.is_saved(store):
+            st.warning("The graph has changes that are not saved in a snapshot, switching discards them")
+        st.dataframe([{"name": snapshot.name, "saved_at": snapshot.saved_at, "based on": snapshot.parent,
+                       "nodes": snapshot.node_count, "edges": snapshot.edge_count,
+                       "current": snapshot.name == history.current, "indexed": history.is_indexed(snapshot.name)}
+                      for snapshot in history.snapshots.values()],
+                     hide_index=True, use_container_width=True)
+        stored, total = history.references()
+        st.caption(f"The snapshots hold {stored:,} node and edge references, {total:,} without sharing. The "
+                   f"indexes of the {history.cache_size} most recently used snapshots are kept, so switching to "
+                   f"them is instant; switching to any other snapshot rebuilds its indexes, which takes longer for "
+                   f"large graphs.")
+
+    # Save the graph to the database and load saved graphs
+    database = get_database()
+    st.subheader("Database")
+    save_col, load_col = st.columns(2)
+    with save_col:
+        graph_name = st.text_input("Name of the graph in the database", value="graph", key="database_name")
+        if st.button("Save to database", use_container_width=True, type="primary"):
+            database.save(graph_name, get_graph_store())
+            st.success(f"The graph has been saved as {graph_name}")
+
+    saved_graphs = database.graphs()
+    with load_col:
+        selected_graph = st.selectbox("Saved graphs", options=[graph["name"] for graph in saved_graphs],
+                                      key="database_graph")
+        load_button_col, delete_button_col = st.columns(2)
+        with load_button_col:
+            if st.button("Load", use_container_width=True, disabled=selected_graph is None):
+                set_graph_store(database.load(selected_graph))
+                st.success(f"The graph {selected_graph} has been loaded")
+        with delete_button_col:
+            if st.button("Delete", use_container_width=True, disabled=selected_graph is None):
+                database.delete(selected_graph)
+                st.rerun()
+
+    if saved_graphs:
+        st.dataframe(saved_graphs, hide_index=True, use_container_width=True)
+
+    # Browse a saved graph page by page, reading only the rows of the page
+    if selected_graph is not None:
+        with st.expander(f"Browse {selected_graph}"):
+            type_counts = database.count_by_type(selected_graph)
+            type_col, page_col = st.columns(2)
+            with type_col:
+                browse_type = st.selectbox("Type", options=list(type_counts), key="database_type")
+            page_count = max(1, -(-type_counts.get(browse_type, 0) // 100))
+            with page_col:
+                page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1,
+                                       key="database_page")
+            nodes = database.nodes(selected_graph, browse_type, limit=100, offset=(page - 1) * 100)
+            st.dataframe([{"name": node["name"], "type": node["type"], "id": node["id"]} for node in nodes],
+                         hide_index=True, use_container_width=True)
 
 
 def delete_relation():
     import time
     
-    # Extract relations for Product 1
-    p1_list = st.session_state["p1_list"]
+    # Retrieve the graph store and the relations for Product 1
+    store = get_graph_store()
+    p1_list = store.edges["product 1"]
     
     # UI rendering for Product 1 relations
     with st.expander("Product 1 Relations"):
@@ -514,8 +680,7 @@ def delete_relation():
 
         if delete_relation_button_p1:
             # Remove the selected relation from the list of relations for Product 1
-            st.session_state["p1_list"] = [edge for edge in p1_list if
-                                           (edge["source"], edge["type"], edge["target"]) != relation_to_delete_p1]
+            store.delete_edge("product 1", relation_to_delete_p1)
 
             # Display success message after deleting the relation for Product 1
             st.success(f"Relation '{relation_to_delete_p1[0]} is {relation_to_delete_p1[1]} {relation_to_delete_p1[2]}' "
@@ -528,7 +693,7 @@ def delete_relation():
             st.experimental_rerun()
 
     # Extract relations for Product 2
-    p2_list = st.session_state["p2_list"]
+    p2_list = store.edges["product 2"]
     
     # UI rendering for Product 2 relations
     with st.expander("Product 2 Relations"):
@@ -545,8 +710,7 @@ def delete_relation():
 
         if delete_relation_button_p2:
             # Remove the selected relation from the list of relations for Product 2
-            st.session_state["p2_list"] = [edge for edge in p2_list if
-                                           (edge["source"], edge["type"], edge["target"]) != relation_to_delete_p2]
+            store.delete_edge("product 2", relation_to_delete_p2)
 
             # Display success message after deleting the relation for Product 2
             st.success(f"Relation '{relation_to_delete_p2[0]} is {relation_to_delete_p2[1]} {relation_to_delete_p2[2]}' "
@@ -561,261 +725,31 @@ def delete_relation():
 
 # Define a function to visualize the graph with different views for Product 1 and Product 2
 def visualization_graph():
-    # Function to set color based on node type
-    def set_color(node_type):
-        color = "Red"
-        if node_type == "Product 1":
-            color = "Blue"
-        elif node_type == "Process":
-            color = "Yellow"
-        elif node_type == "Resource":
-            color = "Green"
-        return color
+    store = get_graph_store()
 
     # Visualization of graph for Product 1 and Product 2
-    with st.expander("Visualise the Graph of Product 1"):
-        # Tabs for different views of Product 1
-        tab1, tab2, tab3, tab4 = st.tabs(
-            [
-                "Visualization of PPR for Product 1",
-                "Basic Engineering View",
-                "Electrical View",
-                "Sustainable View"
-            ]
-        )
-
-        # Visualization of PPR for Product 1
-        with tab1:
-            graph = graphviz.Digraph()
-            visual_dict = {
-                "nodes": st.session_state["node_list"],
-                "product 1": st.session_state["p1_list"],
-            }
-            st.session_state["visual_dict"] = visual_dict
-            node_list = visual_dict["nodes"]
-            edge_list = visual_dict["product 1"]
-            product_name = ["Product 2"]
-            for node in node_list:
-                if node["type"] not in product_name:
-                    node_name = node["name"]
-                    graph.node(node_name, node_name, color=set_color(node["type"]))
-            for edge in edge_list:
-                source = edge["source"]
-                target = edge["target"]
-                relation = edge["type"]
-                graph.edge(source, target, relation)
-            st.graphviz_chart(graph)
-
-        # Basic Engineering View of Product 1
-        with tab2:
-            graph = graphviz.Digraph()
-            visual_dict = {
-                "nodes": st.session_state["node_list"],
-                "product 1": st.session_state["p1_list"],
-            }
-            st.session_state["visual_dict"] = visual_dict
-            node_list = visual_dict["nodes"]
-            edge_list = visual_dict["product 1"]
-            product_name = ["Product 2"]
-            for node in node_list:
-                if node["type"] not in product_name:
-                    node_name = node["name"]
-                    graph.node(node_name, node_name,
-                               xlabel=str(node["submodels"]["Engineering"]),
-                               color=set_color(node["type"]))
-            for edge in edge_list:
-                source = edge["source"]
-                target = edge["target"]
-                relation = edge["type"]
-                graph.edge(source, target, relation)
-            st.graphviz_chart(graph)
-
-        # Electrical View of Product 1
-        with tab3:
-            graph = graphviz.Digraph()
-            visual_dict = {
-                "nodes": st.session_state["node_list"],
-                "product 1": st.session_state["p1_list"],
-            }
-            st.session_state["visual_dict"] = visual_dict
-            node_list = visual_dict["nodes"]
-            edge_list = visual_dict["product 1"]
-            product_name = ["Product 2"]
-            for node in node_list:
-                if node["type"] not in product_name:
-                    node_name = node["name"]
-                    graph.node(node_name, node_name,
-                               xlabel=str(node["submodels"]["Electrical"]),
-                               color=set_color(node["type"]))
-            for edge in edge_list:
-                source = edge["source"]
-                target = edge["target"]
-                relation = edge["type"]
-                graph.edge(source, target, relation)
-            st.graphviz_chart(graph)
-
-        # Sustainable View of Product 1
-        with tab4:
-            graph = graphviz.Digraph()
-            visual_dict = {
-                "nodes": st.session_state["node_list"],
-                "product 1": st.session_state["p1_list"],
-            }
-            st.session_state["visual_dict"] = visual_dict
-            node_list = visual_dict["nodes"]
-            edge_list = visual_dict["product 1"]
-            product_name = ["Product 2"]
-            for node in node_list:
-                if node["type"] not in product_name:
-                    node_name = node["name"]
-                    graph.node(node_name, node_name,
-                               xlabel=str(node["submodels"]["Sustainable"]),
-                               color=set_color(node["type"]))
-            for edge in edge_list:
-                source = edge["source"]
-                target = edge["target"]
-                relation = edge["type"]
-                graph.edge(source, target, relation)
-            st.graphviz_chart(graph)
-
-    # Visualization of graph for Product 2
-    with st.expander("Visualise the Graph of Product 2"):
-        # Tabs for different views of Product 2
-        tab1, tab2, tab3, tab4 = st.tabs(
-            [
-                "Visualization of PPR for Product 2",
-                "Basic Engineering View",
-                "Electrical View",
-                "Sustainable View"
-            ]
-        )
-
-        # Visualization of PPR for Product 2
-        with tab1:
-            graph = graphviz.Digraph()
-            visual_dict = {
-                "nodes": st.session_state["node_list"],
-                "product 2": st.session_state["p2_list"],
-            }
-            st.session_state["visual_dict"] = visual_dict
-            node_list = visual_dict["nodes"]
-            edge_list = visual_dict["product 2"]
-            product_name = ["Product 1"]
-            for node in node_list:
-                if node["type"] not in product_name:
-                    node_name = node["name"]
-                    graph.node(node_name, node_name, color=set_color(node["type"]))
-            for edge in edge_list:
-                source = edge["source"]
-                target = edge["target"]
-                relation = edge["type"]
-                graph.edge(source, target, relation)
-            st.graphviz_chart(graph)
-
-        # Basic Engineering View of Product 2
-        with tab2:
-            graph = graphviz.Digraph()
-            visual_dict = {
-                "nodes": st.session_state["node_list"],
-                "product 2": st.session_state["p2_list"],
-            }
-            st.session_state["visual_dict"] = visual_dict
-            node_list = visual_dict["nodes"]
-            edge_list = visual_dict["product 2"]
-            product_name = ["Product 1"]
-            for node in node_list:
-                if node["type"] not in product_name:
-                    node_name = node["name"]
-                    graph.node(node_name, node_name,
-                               xlabel=str(node["submodels"]["Engineering"]),
-                               color=set_color(node["type"]))
-            for edge in edge_list:
-                source = edge["source"]
-                target = edge["target"]
-                relation = edge["type"]
-                graph.edge(source, target, relation)
-            st.graphviz_chart(graph)
-
-        # Electrical View of Product 2
-        with tab3:
-            graph = graphviz.Digraph()
-            visual_dict = {
-                "nodes": st.session_state["node_list"],
-                "product 2": st.session_state["p2_list"],
-            }
-            st.session_state["visual_dict"] = visual_dict
-            node_list = visual_dict["nodes"]
-            edge_list = visual_dict["product 2"]
-            product_name = ["Product 1"]
-            for node in node_list:
-                if node["type"] not in product_name:
-                    node_name = node["name"]
-                    graph.node(node_name, node_name,
-                               xlabel=str(node["submodels"]["Electrical"]),
-                               color=set_color(node["type"]))
-            for edge in edge_list:
-                source = edge["source"]
-                target = edge["target"]
-                relation = edge["type"]
-                graph.edge(source, target, relation)
-            st.graphviz_chart(graph)
-
-        # Sustainable View of Product 2
-        with tab4:
-            graph = graphviz.Digraph()
-            visual_dict = {
-                "nodes": st.session_state["node_list"],
-                "product 2": st.session_state["p2_list"],
-            }
-            st.session_state["visual_dict"] = visual_dict
-            node_list = visual_dict["nodes"]
-            edge_list = visual_dict["product 2"]
-            product_name = ["Product 1"]
-            for node in node_list:
-                if node["type"] not in product_name:
-                    node_name = node["name"]
-                    graph.node(node_name, node_name,
-                               xlabel=str(node["submodels"]["Sustainable"]),
-                               color=set_color(node["type"]))
-            for edge in edge_list:
-                source = edge["source"]
-                target = edge["target"]
-                relation = edge["type"]
-                graph.edge(source, target, relation)
-            st.graphviz_chart(graph)
+    for product, key in (("Product 1", "product 1"), ("Product 2", "product 2")):
+        with st.expander(f"Visualise the Graph of {product}"):
+            # Only the selected view is built, unchanged views come from the render cache
+            view = st.radio(
+                f"View of {product}",
+                options=list(VIEWS),
+                horizontal=True,
+                label_visibility="collapsed",
+                key=f"view_{key}"
+            )
+            show_graph(view_source(store, key, view))
 
 
 def basic_analyze_graph():
-    G = nx.DiGraph()
-
-    # Retrieve node and edge information from session state
-    graph_dict = {
-        "nodes": st.session_state["node_list"],
-        "product 1": st.session_state["p1_list"],
-        "product 2": st.session_state["p2_list"],
-    }
-    st.session_state["graph_dict"] = graph_dict
-
-    node_list = graph_dict["nodes"]
-    p1_list = graph_dict["product 1"]
-    p2_list = graph_dict["product 2"]
-    node_tuple_list = []
-    edge_tuple_list = []
+    # Retrieve node and edge information from the graph store of the session
+    store = get_graph_store()
+    st.session_state["graph_dict"] = store.graph_dict()
 
     # Analyze Product 1 Graph
     with st.expander("Product 1 Graph Analysis"):
-        # Construct nodes and edges for Product 1
-        for node in node_list:
-            node_tuple = (node["name"], node)
-            node_tuple_list.append(node_tuple)
-
-        for edge in p1_list:
-            edge_tuple = (edge["source"], edge["target"], edge)
-            edge_tuple_list.append(edge_tuple)
-
-        # Add nodes and edges to the graph
-        G.add_nodes_from(node_tuple_list)
-        G.add_edges_from(edge_tuple_list)
+        # Graph with all nodes and the edges of Product 1, only rebuilt when the graph has changed
+        G = store.product_graph("product 1", all_nodes=True)
 
         # Provide analysis options for Product 1
         select_functions1 = st.selectbox(label="Select Function",
@@ -826,6 +760,8 @@ def basic_analyze_graph():
                                                   "Specific Edge",
                                                   "Density",
                                                   "Shortest Path",
+                                                  "Alternative Paths",
+                                                  "Weighted Route",
                                                   "Check Path",
                                                   "Check if graph is empty",
                                                   "Is the graph directed"
@@ -845,9 +781,13 @@ def basic_analyze_graph():
         elif select_functions1 == "Density":
             density_graph(G)
         elif select_functions1 == "Shortest Path":
-            shortest_path(G)
+            shortest_path(G, "product 1")
+        elif select_functions1 == "Alternative Paths":
+            shows_shortest_paths(G, "product 1")
+        elif select_functions1 == "Weighted Route":
+            weighted_route(G, "product 1")
         elif select_functions1 == "Check Path":
-            check_path(G)
+            check_path(G, "product 1")
         elif select_functions1 == "Check if graph is empty":
             is_empty(G)
         elif select_functions1 == "Is the graph directed":
@@ -855,18 +795,8 @@ def basic_analyze_graph():
 
     # Analyze Product 2 Graph
     with st.expander("Product 2 Graph Analysis"):
-        # Construct nodes and edges for Product 2
-        for node in node_list:
-            node_tuple = (node["name"], node)
-            node_tuple_list.append(node_tuple)
-
-        for edge in p2_list:
-            edge_tuple = (edge["source"], edge["target"], edge)
-            edge_tuple_list.append(edge_tuple)
-
-        # Add nodes and edges to the graph
-        G.add_nodes_from(node_tuple_list)
-        G.add_edges_from(edge_tuple_list)
+        # Graph with all nodes and the edges of Product 2, only rebuilt when the graph has changed
+        G = store.product_graph("product 2", all_nodes=True)
 
         # Provide analysis options for Product 2
         select_functions = st.selectbox(label="Select Function",
@@ -877,6 +807,8 @@ def basic_analyze_graph():
                                                  "Specific Edge",
                                                  "Density",
                                                  "Shortest Path",
+                                                 "Alternative Paths",
+                                                 "Weighted Route",
                                                  "Check Path",
                                                  "Check if graph is empty",
                                                  "Is the graph directed"
@@ -896,151 +828,111 @@ def basic_analyze_graph():
         elif select_functions == "Density":
             density_graph(G)
         elif select_functions == "Shortest Path":
-            shortest_path(G)
+            shortest_path(G, "product 2")
+        elif select_functions == "Alternative Paths":
+            shows_shortest_paths(G, "product 2")
+        elif select_functions == "Weighted Route":
+            weighted_route(G, "product 2")
         elif select_functions == "Check Path":
-            check_path(G)
+            check_path(G, "product 2")
         elif select_functions == "Check if graph is empty":
             is_empty(G)
         elif select_functions == "Is the graph directed":
             is_directed(G)
 
-def export_graph():
-    # Retrieve graph data from session state
-    graph_dict = {
-        "nodes": st.session_state["node_list"],
-        "product 1": st.session_state["p1_list"],
-        "product 2": st.session_state["p2_list"],
-    }
-    st.session_state["graph_dict"] = graph_dict
-
-    # Convert graph data to JSON format
-    graph_string = json.dumps(st.session_state["graph_dict"])
-
-    # Convert graph data to PPR dictionary format
-    ppr_dict = graph_dict_to_ppr_dict()
-    ppr_json = json.dumps(ppr_dict)
+def performance_panel():
+    # Show the timings of the tabs and analysis functions recorded by this server process
+    rows = summary()
+    if not rows:
+        st.info("No timings have been recorded yet")
+        return
+
+    st.caption(f"Timings since the server was started or reset, also written to {METRICS_FILE}")
+    for kind, title in (("tab", "Tabs"), ("function", "Analysis functions")):
+        kind_rows = [row for row in rows if row["Kind"] == kind]
+        if kind_rows:
+            st.subheader(title)
+            st.dataframe(kind_rows, hide_index=True, use_container_width=True,
+                         column_order=[column for column in kind_rows[0] if column != "Kind"])
+
+    # Slowest tabs and functions by their 90th percentile
+    st.subheader("90th percentile (s)")
+    st.bar_chart({row["Name"]: row["p90 (s)"] for row in rows})
+
+    download_col, reset_col = st.columns(2)
+    with download_col:
+        st.download_button("Download metrics", data=prometheus_text(), file_name="ppr_metrics.prom",
+                           mime="text/plain", use_container_width=True)
+    with reset_col:
+        if st.button("Reset timings", use_container_width=True):
+            reset()
+            st.rerun()
 
-    # Download button for exporting graph data to JSON
-    st.download_button(
-        "Export Graph to JSON",
-        file_name="graph.json",
-        mime="application/json",
-        data=graph_string,
-        use_container_width=True,
-        type="primary"
-    )
-
-    # Download button for exporting graph dictionary to PPR dictionary JSON
-    st.download_button(
-        "Export Graph Dict to PPR Dict",
-        file_name="graph_PPR.json",
-        mime="application/json",
-        data=ppr_json,
-        use_container_width=True,
-        type="primary"
-    )
-def graph_dict_to_ppr_dict():
-    # Initialize lists to store PPR nodes and edges
-    ppr_nodes = []
-    ppr_edges1 = []
-    ppr_edges2 = []
-
-    # Retrieve graph data from session state
-    graph_dict = {
-        "nodes": st.session_state["node_list"],
-        "product 1": st.session_state["p1_list"],
-        "product 2": st.session_state["p2_list"],
-    }
-    st.session_state["graph_dict"] = graph_dict
+def export_graph():
+    # Retrieve graph data from the graph store of the session
+    store = get_graph_store()
+    st.session_state["graph_dict"] = store.graph_dict()
+
+    # Export formats: button label, file name, mime type and the writer streaming the graph into a file
+    export_formats = [
+        ("Export Graph to JSON", "graph.json", "application/json",
+         lambda fileobj: write_chunks(iter_graph_json(store.graph_dict()), fileobj)),
+        ("Export Graph Dict to PPR Dict", "graph_PPR.json", "application/json",
+         lambda fileobj: write_chunks(iter_ppr_json(store.graph_dict()), fileobj)),
+        ("Export Graph to Parquet", "graph_parquet.zip", "application/zip",
+         lambda fileobj: write_parquet_graph(store, fileobj)),
+    ]
+
+    for label, file_name, mime, writer in export_formats:
+        # The export is only generated on request and reused until the graph changes
+        cache_key = ("export", file_name)
+        if not store.is_cached(cache_key):
+            prepare_button = st.button(f"Prepare: {label}", key=f"prepare_{file_name}", use_container_width=True)
+            if not prepare_button:
+                continue
+
+        def build_export(writer=writer):
+            export_file = io.BytesIO()
+            writer(export_file)
+            return export_file.getvalue()
+
+        with st.spinner(f"Preparing {file_name}"):
+            data = store.cached(cache_key, build_export)
+
+        # Download button for the prepared export
+        st.download_button(
+            label,
+            file_name=file_name,
+            mime=mime,
+            data=data,
+            use_container_width=True,
+            type="primary"
+        )
 
-    # Extract node information and construct PPR nodes
-    for node in graph_dict.get("nodes", []):
-        ppr_node = {
-            "id": node.get("id", None),
-            "type": node.get("type", None),
-            "data": {
-                "label": node.get("name", None),
-                "props": {
-                    "views": node.get("submodels", None),
-                },
-                "style": node.get("ui_data", {}).get("style", None),
-            },
-            "position": node.get("ui_data", {}).get("position", None),
-            "width": node.get("ui_data", {}).get("width", None),
-            "height": node.get("ui_data", {}).get("height", None),
-        }
-        ppr_nodes.append(ppr_node)
-
-    # Extract edge information for product 1 and construct PPR edges
-    for edge in graph_dict.get("product 1", []):
-        ppr_edge1 = {
-            "id": edge.get("id", None),
-            "label": edge.get("name", None),
-            "source": edge.get("source", None),
-            "target": edge.get("target", None),
-            "sourceHandle": edge.get("ui_data", {}).get("sourceHandle", None),
-            "targetHandle": edge.get("ui_data", {}).get("targetHandle", None),
-        }
-        ppr_edges1.append(ppr_edge1)
-
-    # Extract edge information for product 2 and construct PPR edges
-    for edge in graph_dict.get("product 2", []):
-        ppr_edge2 = {
-            "id": edge.get("id", None),
-            "label": edge.get("name", None),
-            "source": edge.get("source", None),
-            "target": edge.get("target", None),
-            "sourceHandle": edge.get("ui_data", {}).get("sourceHandle", None),
-            "targetHandle": edge.get("ui_data", {}).get("targetHandle", None),
-        }
-        ppr_edges1.append(ppr_edge2)
+def graph_dict_to_ppr_dict(graph_dict=None):
+    # Retrieve graph data from the graph store of the session if no graph is given
+    if graph_dict is None:
+        graph_dict = get_graph_store().graph_dict()
+        st.session_state["graph_dict"] = graph_dict
 
-    # Construct PPR dictionary containing nodes and edges information
+    # Construct PPR dictionary containing nodes and edges information,
+    # the edges of Product 1 and Product 2 are listed together
     ppr_dict = {
-        "nodes": ppr_nodes,
-        "edges": ppr_edges1 #+ ppr_edges2
+        "nodes": [ppr_node(node) for node in graph_dict.get("nodes", [])],
+        "edges": [ppr_edge(edge) for edge in graph_dict.get("product 1", []) + graph_dict.get("product 2", [])]
     }
 
     return ppr_dict
 
 def adv_analyze_graph():
-    # Initialize a directed graph
-    G = nx.DiGraph()
-
-    # Retrieve graph data from session state
-    graph_dict = {
-        "nodes": st.session_state["node_list"],
-        "product 1": st.session_state["p1_list"],
-        "product 2": st.session_state["p2_list"],
-    }
-    st.session_state["graph_dict"] = graph_dict
-
-    # Extract node and edge lists
-    node_list = graph_dict["nodes"]
-    p1_list = graph_dict["product 1"]
-    p2_list = graph_dict["product 2"]
+    # Retrieve graph data from the graph store of the session
+    store = get_graph_store()
+    st.session_state["graph_dict"] = store.graph_dict()
 
     # Analyze Product 1 graph
     with st.expander("Product 1 Graph Analysis"):
-        node_tuple_list = []
-        edge_tuple_list = []
-
-        product_name = ["Product 2"]
-
-        # Extract nodes not related to Product 2
-        for node in node_list:
-            if node["type"] not in product_name:
-                node_tuple = (node["name"], node)
-                node_tuple_list.append(node_tuple)
-
-        # Add edges for Product 1
-        for edge in p1_list:
-            edge_tuple = (edge["source"], edge["target"], edge)
-            edge_tuple_list.append(edge_tuple)
-
-        # Add nodes and edges to the graph
-        G.add_nodes_from(node_tuple_list)
-        G.add_edges_from(edge_tuple_list)
+        # Graph with the nodes not related to Product 2 and the edges of Product 1 from the versioned cache
+        G = store.product_graph("product 1")
 
         # Select analysis function for Product 1
         select_functions1 = st.selectbox(label="Select Function",
@@ -1059,30 +951,10 @@ def adv_analyze_graph():
         elif select_functions1 == "Impact of Input Product on Process Step":
             input_product_on_process1(G)
 
-        # Clear the graph for the next analysis
-        G.clear()
-
     # Analyze Product 2 graph
     with st.expander("Product 2 Graph Analysis"):
-        node_tuple_list = []
-        edge_tuple_list = []
-
-        product_name = ["Product 1"]
-
-        # Extract nodes not related to Product 1
-        for node in node_list:
-            if node["type"] not in product_name:
-                node_tuple = (node["name"], node)
-                node_tuple_list.append(node_tuple)
-
-        # Add edges for Product 2
-        for edge in p2_list:
-            edge_tuple = (edge["source"], edge["target"], edge)
-            edge_tuple_list.append(edge_tuple)
-
-        # Add nodes and edges to the graph
-        G.add_nodes_from(node_tuple_list)
-        G.add_edges_from(edge_tuple_list)
+        # Graph with the nodes not related to Product 1 and the edges of Product 2 from the versioned cache
+        G = store.product_graph("product 2")
 
         # Select analysis function for Product 2
         select_functions2 = st.selectbox(label="Select Function",
@@ -0,0 +1,70 @@
+# Round trips of graphs through the graph JSON file and the columnar graph archive, e.g.
+#   python -m pytest test_graph_io.py
+import io  # Import io for in-memory files
+import json  # Import JSON library to compare the written graphs
+
+from graph_io import read_json_graph, read_parquet_graph, write_parquet_graph, iter_graph_json, write_chunks  # Import the graph file readers and writers
+from graph_store import GraphStore  # Import the graph store
+from sqlite_store import SQLiteGraphStore  # Import the graph database
+
+# Graph with attribute texts, values that are no text and submodels in other layouts
+GRAPH = {
+    "nodes": [
+        {"name": "Product", "submodels": {"Engineering": {"Cost": "12.50", "OEE": ""}},
+         "id": "0f8fad5b-d9cb-469f-a165-70867728950e", "type": "Product 1", "ui_data": {"position": {"x": 1}}},
+        {"name": "Press", "submodels": {"Engineering": {"Cost": 12, "OEE": 0.85, "MTTR": None},
+                                        "Electrical": {"current": True, "voltage": "230", "power": [1, "2"]}},
+         "id": "press", "type": "Process"},
+        {"name": "Robot", "submodels": None, "id": "robot", "type": "Resource"},
+        {"name": "Crane", "submodels": {"Engineering": "n/a"}, "id": "crane", "type": "Resource"},
+        {"name": "Belt", "submodels": {"Engineering": {"Cost": "12"}}, "id": "belt", "type": "Resource"},
+    ],
+    "product 1": [
+        {"source": "Product", "target": "Press", "type": "consists of", "id": "e1"},
+        {"source": "Press", "target": "Robot", "type": "uses", "id": "e2", "ui_data": {"color": "red"}},
+    ],
+    "product 2": [],
+}
+
+
+def _store(graph):
+    # Read a graph dictionary through the graph JSON reader
+    store = GraphStore()
+    read_json_graph(io.BytesIO(json.dumps(graph).encode("utf-8")), store)
+    return store
+
+
+def _graph_json(store):
+    # Write a store as graph JSON and read it back as a dictionary
+    output = io.BytesIO()
+    write_chunks(iter_graph_json(store.graph_dict()), output)
+    return json.loads(output.getvalue())
+
+
+def test_json_round_trip():
+    assert _graph_json(_store(GRAPH)) == GRAPH
+
+
+def test_parquet_round_trip_keeps_values_that_are_no_text():
+    archive = io.BytesIO()
+    write_parquet_graph(_store(GRAPH), archive)
+    archive.seek(0)
+    store = GraphStore()
+    read_parquet_graph(archive, store)
+
+    assert _graph_json(store) == GRAPH
+    press = store.node("Press")["submodels"]
+    assert press["Engineering"]["Cost"] == 12 and type(press["Engineering"]["Cost"]) is int
+    assert press["Electrical"]["current"] is True
+    assert store.node("Belt")["submodels"]["Engineering"]["Cost"] == "12"
+    assert store.node("Robot")["submodels"] is None
+
+
+def test_sqlite_round_trip(tmp_path):
+    database = SQLiteGraphStore(str(tmp_path / "graphs.sqlite"))
+    database.save("graph", _store(GRAPH))
+    store = database.load("graph")
+
+    assert _graph_json(store) == GRAPH
+    assert store.node("Robot")["submodels"] is None
+    assert store.node("Crane")["submodels"] == {"Engineering": "n/a"}